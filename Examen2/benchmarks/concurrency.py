@@ -0,0 +1,161 @@
+"""
+Benchmark de concurrencia de SQLite: N hilos lectores y M escritores
+Compara el perfil por defecto de SQLite (journal DELETE, BEGIN DEFERRED, sin PRAGMA)
+con el perfil de producción de todos.sqlite (WAL, synchronous=NORMAL, busy_timeout,
+BEGIN IMMEDIATE). Los lectores consultan páginas de todos por usuario; los escritores
+alternan estados y renombran títulos (transacciones que leen y luego escriben).
+Cada perfil usa una copia de la misma base de datos temporal; no toca db.sqlite3.
+
+Uso (desde Examen2/):
+    python -m benchmarks.concurrency --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import django
+
+PROFILES = ('antes', 'después')
+
+
+def build_database(rows):
+    """Crea la base de datos de prueba con migraciones y rows todos"""
+    from django.core.management import call_command
+    from django.db import connections
+    from todos.counters import rebuild_counters
+    from todos.models import Todo, hash_title
+
+    call_command('migrate', verbosity=0)
+    Todo.objects.bulk_create(
+        [
+            Todo(
+                userId=i % 100 + 1, title=f'Pendiente {i}',
+                title_hash=hash_title(f'Pendiente {i}'), completed=i % 3 == 0
+            )
+            for i in range(rows)
+        ],
+        batch_size=5000
+    )
+    rebuild_counters()
+    connections.close_all()
+
+
+def use_profile(db_settings, path, profile, pristine):
+    """Copia la base limpia y configura la conexión para el perfil indicado"""
+    from django.conf import settings
+    from django.db import connections
+    from todos.sqlite import DEFAULT_PRAGMAS
+
+    connections.close_all()
+    shutil.copyfile(pristine, path)
+    if profile == 'antes':
+        # WAL es persistente en el archivo: la copia de la base limpia queda en DELETE
+        db_settings['OPTIONS'] = {}
+        settings.TODOS_SQLITE_PRAGMAS = dict.fromkeys(DEFAULT_PRAGMAS)
+    else:
+        db_settings['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+        settings.TODOS_SQLITE_PRAGMAS = {}
+
+
+def run_workload(readers, writers, seconds, max_id):
+    """Ejecuta los hilos durante seconds segundos; retorna contadores de operaciones y errores"""
+    from django.db import OperationalError, connection
+    from todos.bulk import bulk_update_todos
+    from todos.models import Todo
+    from todos.transitions import toggle_todos
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'reads': 0, 'writes': 0, 'errors': 0}
+
+    def reader():
+        rng = random.Random()
+        done = 0
+        while not stop.is_set():
+            user_id = rng.randint(1, 100)
+            list(Todo.objects.filter(userId=user_id, completed=False).values('id', 'title')[:20])
+            done += 1
+        connection.close()
+        with lock:
+            stats['reads'] += done
+
+    def writer(number):
+        rng = random.Random(number)
+        done = errors = 0
+        while not stop.is_set():
+            todo_id = rng.randint(1, max_id)
+            try:
+                if rng.random() < 0.5:
+                    toggle_todos([todo_id])
+                else:
+                    bulk_update_todos([{'id': todo_id, 'title': f'Renombrado {number}-{done}'}])
+                done += 1
+            except OperationalError:
+                # "database is locked"
+                errors += 1
+        connection.close()
+        with lock:
+            stats['writes'] += done
+            stats['errors'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000, help='Filas de prueba')
+    parser.add_argument('--readers', type=int, default=4, help='Hilos lectores')
+    parser.add_argument('--writers', type=int, default=2, help='Hilos escritores')
+    parser.add_argument('--seconds', type=float, default=5, help='Duración por perfil')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_api_project.settings')
+    django.setup()
+
+    from django.db import connections
+
+    workdir = tempfile.mkdtemp(prefix='todos-bench-')
+    pristine = os.path.join(workdir, 'pristine.sqlite3')
+    path = os.path.join(workdir, 'bench.sqlite3')
+    db_settings = connections.settings['default']
+    db_settings['NAME'] = pristine
+    db_settings['CONN_MAX_AGE'] = 0
+    try:
+        build_database(args.rows)
+        # La base limpia se deja en modo DELETE; el perfil "después" la pasa a WAL
+        with sqlite3.connect(pristine) as conn:
+            conn.execute('PRAGMA journal_mode = DELETE')
+        db_settings['NAME'] = path
+
+        print(
+            f'{args.rows} filas, {args.readers} lector(es), {args.writers} escritor(es), '
+            f'{args.seconds:g} s por perfil\n'
+        )
+        print(f'{"Perfil":<10}{"lecturas/s":>14}{"escrituras/s":>16}{"bloqueos":>12}')
+        for profile in PROFILES:
+            use_profile(db_settings, path, profile, pristine)
+            stats = run_workload(args.readers, args.writers, args.seconds, args.rows)
+            print(
+                f'{profile:<10}{stats["reads"] / args.seconds:>14,.0f}'
+                f'{stats["writes"] / args.seconds:>16,.0f}{stats["errors"]:>12}'
+            )
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
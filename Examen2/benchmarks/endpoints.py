@@ -0,0 +1,376 @@
+"""
+Benchmark de carga de los endpoints de la API de todos
+Siembra una base de datos temporal con generate_todos y lanza peticiones desde
+varios hilos cliente, con el cliente de pruebas de Django (en proceso) o contra un
+servidor WSGI local. Reporta por endpoint peticiones/s, latencia p50/p95/p99 y
+consultas SQL por petición, y guarda los resultados en JSON para comparar ejecuciones.
+/api/sync/ se mide de extremo a extremo (encolar + trabajo terminado) contra una
+API externa simulada (benchmarks.upstream), sin red.
+La caché de respuestas se desactiva salvo con --cache. No toca db.sqlite3.
+
+Uso (desde Examen2/):
+    python -m benchmarks.endpoints --rows 100000 --requests 300 --concurrency 4 --output antes.json
+    python -m benchmarks.endpoints --rows 100000 --client wsgi --compare antes.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import django
+
+# Rutas medidas; {id} y {user} se sustituyen por valores aleatorios en cada petición
+ENDPOINTS = {
+    'list': '/api/todos/',
+    'list_cursor': '/api/todos/?cursor=',
+    'detail': '/api/todos/{id}/',
+    'search': '/api/todos/?search=revisar+proyecto',
+    'completed': '/api/todos/completed/',
+    'summary': '/api/todos/summary/',
+    'ids_only': '/api/todos-ids-only/',
+    'ids_titles': '/api/todos-ids-titles/',
+    'pending_id_title': '/api/todos-pending-id-title/',
+    'ids_users': '/api/todos-ids-users/',
+    'completed_id_user': '/api/todos-completed-id-user/',
+    'stats': '/api/stats/',
+    'user_todos': '/api/users/{user}/todos/',
+}
+SYNC = 'sync'
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, q):
+    """Percentil q (método del rango más cercano) de una lista ordenada"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def summarize(latencies, errors, elapsed, queries=None):
+    """Resultados de un endpoint: peticiones/s y latencias en milisegundos"""
+    latencies = sorted(latencies)
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'queries': queries,
+    }
+    for q in PERCENTILES:
+        value = percentile(latencies, q)
+        result[f'p{q}_ms'] = round(value * 1000, 2) if value is not None else None
+    return result
+
+
+class TestClientTransport:
+    """Peticiones en el mismo proceso con django.test.Client (sin red ni servidor)"""
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client(HTTP_ACCEPT='application/json')
+
+    def request(self, method, path, body=None):
+        if method == 'POST':
+            response = self.client.post(path, body, content_type='application/json')
+        else:
+            response = self.client.get(path)
+        return response.status_code, response.content
+
+    def close(self):
+        from django.db import connections
+        connections.close_all()
+
+
+class WSGITransport:
+    """Peticiones HTTP con keep-alive contra el servidor WSGI local"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.headers['Accept'] = 'application/json'
+
+    def request(self, method, path, body=None):
+        response = self.session.request(method, self.base_url + path, json=body)
+        return response.status_code, response.content
+
+    def close(self):
+        self.session.close()
+
+
+def start_wsgi_server():
+    """Servidor WSGI multihilo de la aplicación en un puerto libre; retorna (servidor, URL base)"""
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=ThreadingWSGIServer, handler_class=QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def expand(path, rng, rows, users):
+    return path.format(id=rng.randint(1, rows), user=rng.randint(1, users))
+
+
+def count_queries(path, rows, users):
+    """Consultas SQL de una petición al endpoint (medidas en este hilo)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    transport = TestClientTransport()
+    with CaptureQueriesContext(connection) as queries:
+        transport.request('GET', expand(path, random.Random(0), rows, users))
+    return len(queries)
+
+
+def run_endpoint(make_transport, path, args):
+    """Lanza args.requests peticiones desde args.concurrency hilos; retorna (latencias, errores, segundos)"""
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def worker(number):
+        rng = random.Random(args.seed + number)
+        transport = make_transport()
+        local, failed = [], 0
+        try:
+            for _ in range(args.warmup):
+                transport.request('GET', expand(path, rng, args.rows, args.users))
+            barrier.wait()
+            while next(counter) < args.requests:
+                url = expand(path, rng, args.rows, args.users)
+                start = time.perf_counter()
+                status, _ = transport.request('GET', url)
+                local.append(time.perf_counter() - start)
+                if status >= 400:
+                    failed += 1
+        finally:
+            transport.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    barrier = threading.Barrier(args.concurrency + 1)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def run_sync(transport, upstream, args):
+    """
+    Sincronizaciones consecutivas de args.sync_limit registros contra la API simulada
+    Cada medición va desde el POST hasta que el trabajo termina; la API cambia entre
+    ejecuciones para que cada una reescriba los registros
+    """
+    from todos.models import SyncJob
+
+    latencies, errors, records = [], 0, 0
+    began = time.perf_counter()
+    for _ in range(args.sync_runs):
+        upstream.mutate()
+        start = time.perf_counter()
+        status, content = transport.request('POST', '/api/sync/', {
+            'api_url': upstream.url, 'limit': args.sync_limit, 'overwrite_existing': True,
+        })
+        if status != 202:
+            errors += 1
+            continue
+        job_id = json.loads(content)['job_id']
+        while True:
+            job = SyncJob.objects.get(id=job_id)
+            if job.status in (SyncJob.STATUS_COMPLETED, SyncJob.STATUS_FAILED):
+                break
+            time.sleep(0.01)
+        latencies.append(time.perf_counter() - start)
+        if job.status == SyncJob.STATUS_FAILED:
+            errors += 1
+        records += job.fetched
+    elapsed = time.perf_counter() - began
+    result = summarize(latencies, errors, elapsed)
+    result['records_per_second'] = round(records / elapsed, 1) if elapsed else None
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def print_results(results, previous=None):
+    header = f'{"Endpoint":<20}{"pet/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"SQL":>6}{"errores":>9}'
+    if previous:
+        header += f'{"Δ p50":>10}{"Δ pet/s":>10}'
+    print(header)
+    for name, result in results.items():
+        line = (
+            f'{name:<20}{result["throughput_rps"] or 0:>10,.1f}{result["p50_ms"] or 0:>10,.2f}'
+            f'{result["p95_ms"] or 0:>10,.2f}{result["p99_ms"] or 0:>10,.2f}'
+            f'{"" if result["queries"] is None else result["queries"]:>6}{result["errors"]:>9}'
+        )
+        old = (previous or {}).get(name)
+        if old and old.get('p50_ms') and result['p50_ms'] and old.get('throughput_rps'):
+            line += (
+                f'{(result["p50_ms"] / old["p50_ms"] - 1) * 100:>+9.1f}%'
+                f'{(result["throughput_rps"] / old["throughput_rps"] - 1) * 100:>+9.1f}%'
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000, help='Todos en la base de prueba')
+    parser.add_argument('--users', type=int, default=100, help='Usuarios en la base de prueba')
+    parser.add_argument('--requests', type=int, default=200, help='Peticiones medidas por endpoint')
+    parser.add_argument('--concurrency', type=int, default=4, help='Hilos cliente')
+    parser.add_argument('--warmup', type=int, default=5, help='Peticiones de calentamiento por hilo')
+    parser.add_argument(
+        '--client', choices=['test', 'wsgi'], default='test',
+        help='test = django.test.Client en proceso; wsgi = HTTP contra un servidor WSGI local'
+    )
+    parser.add_argument(
+        '--endpoints', default=','.join([*ENDPOINTS, SYNC]),
+        help=f'Endpoints separados por comas ({", ".join([*ENDPOINTS, SYNC])})'
+    )
+    parser.add_argument('--sync-runs', type=int, default=3, help='Sincronizaciones medidas')
+    parser.add_argument('--sync-limit', type=int, default=5000, help='Registros por sincronización')
+    parser.add_argument('--cache', action='store_true', help='Mantener la caché de respuestas')
+    parser.add_argument(
+        '--sample-rate', type=float, default=0.0,
+        help='Fracción de peticiones con instrumentación SQL (para medir su coste)'
+    )
+    parser.add_argument('--seed', type=int, default=1, help='Semilla de datos y peticiones')
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--compare', help='Resultados JSON anteriores con los que comparar')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ENDPOINTS and name != SYNC]
+    if unknown:
+        parser.error(f'Endpoints desconocidos: {", ".join(unknown)}')
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_api_project.settings')
+    django.setup()
+
+    from io import StringIO
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    from benchmarks.upstream import FakeUpstream
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    if not args.cache:
+        settings.TODOS_CACHE = {**getattr(settings, 'TODOS_CACHE', {}), 'DEFAULT_TIMEOUT': 0, 'TIMEOUTS': {}}
+    settings.TODOS_INSTRUMENTATION = {
+        **getattr(settings, 'TODOS_INSTRUMENTATION', {}), 'SAMPLE_RATE': args.sample_rate
+    }
+
+    workdir = tempfile.mkdtemp(prefix='todos-bench-')
+    old_name = connection.settings_dict['NAME']
+    # Base de prueba en archivo: los hilos del servidor y de la sincronización la comparten
+    connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    server = None
+    try:
+        print(f'Sembrando {args.rows:,} todos para {args.users} usuario(s)...')
+        call_command('generate_todos', args.rows, users=args.users, seed=args.seed, stdout=StringIO())
+
+        if args.client == 'wsgi':
+            server, base_url = start_wsgi_server()
+
+            def make_transport():
+                return WSGITransport(base_url)
+        else:
+            make_transport = TestClientTransport
+
+        print(
+            f'{args.requests} petición(es) por endpoint, {args.concurrency} hilo(s), '
+            f'cliente {args.client}\n'
+        )
+        results = {}
+        for name in names:
+            if name == SYNC:
+                continue
+            path = ENDPOINTS[name]
+            latencies, errors, elapsed = run_endpoint(make_transport, path, args)
+            results[name] = summarize(
+                latencies, errors, elapsed, count_queries(path, args.rows, args.users)
+            )
+
+        if SYNC in names:
+            transport = make_transport()
+            with FakeUpstream(rows=args.sync_limit, users=args.users) as upstream:
+                results[SYNC] = run_sync(transport, upstream, args)
+            transport.close()
+
+        previous = None
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as fh:
+                previous = json.load(fh)['results']
+        print_results(results, previous)
+
+        if args.output:
+            report = {
+                'meta': {
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'rows': args.rows,
+                    'users': args.users,
+                    'requests': args.requests,
+                    'concurrency': args.concurrency,
+                    'client': args.client,
+                    'cache': args.cache,
+                },
+                'results': results,
+            }
+            with open(args.output, 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2, ensure_ascii=False)
+            print(f'\nResultados guardados en {args.output}')
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de serialización de las vistas de proyección del examen
+Compara filas/segundo entre la ruta anterior (SELECT * + instancias de Todo +
+ModelSerializer) y la ruta actual (values() con las columnas del serializador).
+Se ejecuta sobre una base de datos de prueba temporal, no toca db.sqlite3.
+
+Uso (desde Examen2/):
+    python -m benchmarks.projections --rows 100000 --repeat 3
+"""
+import argparse
+import os
+import time
+
+import django
+
+
+def best_time(func, repeat):
+    """Menor tiempo de ejecución de func en repeat intentos"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000, help='Filas de prueba')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_api_project.settings')
+    django.setup()
+
+    from django.db import connection
+    from rest_framework import serializers
+    from todos.models import Todo
+    from todos.serializers import (
+        TodoIdOnlySerializer, TodoIdTitleSerializer, TodoIdUserSerializer
+    )
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        Todo.objects.bulk_create(
+            [
+                Todo(userId=i % 100 + 1, title=f'Pendiente de prueba {i}', completed=i % 3 == 0)
+                for i in range(args.rows)
+            ],
+            batch_size=5000
+        )
+        print(f'{args.rows} filas, mejor de {args.repeat} intento(s)\n')
+        print(f'{"Serializador":<24}{"antes (filas/s)":>18}{"después (filas/s)":>20}{"mejora":>9}')
+
+        for serializer_class in (TodoIdOnlySerializer, TodoIdTitleSerializer, TodoIdUserSerializer):
+            fields = serializer_class.Meta.fields
+            # ModelSerializer equivalente al anterior (sin ProjectionListSerializer)
+            legacy_class = type('Legacy' + serializer_class.__name__, (serializers.ModelSerializer,), {
+                'Meta': type('Meta', (), {'model': Todo, 'fields': fields}),
+            })
+
+            before = best_time(lambda: legacy_class(Todo.objects.all(), many=True).data, args.repeat)
+            after = best_time(
+                lambda: serializer_class(Todo.objects.values(*fields), many=True).data, args.repeat
+            )
+            print(
+                f'{serializer_class.__name__:<24}{args.rows / before:>18,.0f}'
+                f'{args.rows / after:>20,.0f}{before / after:>8.1f}x'
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
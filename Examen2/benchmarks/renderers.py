@@ -0,0 +1,73 @@
+"""
+Micro-benchmark de los renderers de la API de todos
+Mide el tiempo de renderizar una respuesta paginada de N filas con el formato
+de TodoSerializer usando el JSONRenderer de DRF, FastJSONRenderer, MessagePack y CSV.
+
+Uso (desde Examen2/):
+    python -m benchmarks.renderers --rows 10000 --repeat 5
+"""
+import argparse
+import os
+
+import django
+
+from benchmarks.projections import best_time
+
+
+def build_payload(rows):
+    """Respuesta paginada con filas equivalentes a la salida de TodoSerializer"""
+    return {
+        'count': rows,
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'userId': i % 100 + 1,
+                'title': f'Pendiente de prueba número {i} para Parra\'s Dev',
+                'completed': i % 3 == 0,
+                'status_display': 'Resuelto' if i % 3 == 0 else 'Sin resolver',
+                'user_display': f'Usuario #{i % 100 + 1}',
+                'created_at': '2025-07-19T01:03:00.123456-06:00',
+                'updated_at': '2025-07-19T01:03:00.123456-06:00',
+                'synced_from_api': i % 2 == 0,
+                'last_synced_at': None,
+            }
+            for i in range(1, rows + 1)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000, help='Filas de la respuesta')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_api_project.settings')
+    django.setup()
+
+    from rest_framework.renderers import JSONRenderer
+    from todos import renderers
+
+    payload = build_payload(args.rows)
+    candidates = [
+        ('JSONRenderer (DRF)', JSONRenderer()),
+        ('FastJSONRenderer' + ('' if renderers.orjson else ' (sin orjson)'), renderers.FastJSONRenderer()),
+    ]
+    if renderers.msgpack is not None:
+        candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+    candidates.append(('CSVRenderer', renderers.CSVRenderer()))
+
+    baseline = None
+    print(f'{args.rows} filas, mejor de {args.repeat} intento(s)\n')
+    print(f'{"Renderer":<34}{"ms":>9}{"KB":>10}{"vs DRF":>9}')
+    for name, renderer in candidates:
+        elapsed = best_time(lambda: renderer.render(payload), args.repeat)
+        size = len(renderer.render(payload))
+        baseline = baseline or elapsed
+        print(f'{name:<34}{elapsed * 1000:>9.2f}{size / 1024:>10.0f}{baseline / elapsed:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
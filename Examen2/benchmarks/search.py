@@ -0,0 +1,69 @@
+"""
+Benchmark de búsqueda por título
+Compara title ICONTAINS (LIKE '%término%', recorre toda la tabla) con el índice
+de texto completo de search_todos(), con y sin orden por relevancia.
+Se ejecuta sobre una base de datos de prueba temporal, no toca db.sqlite3.
+
+Uso (desde Examen2/):
+    python -m benchmarks.search --rows 1000000 --repeat 3
+"""
+import argparse
+import os
+
+import django
+
+from benchmarks.projections import best_time
+
+WORDS = [
+    'comprar', 'leche', 'pan', 'llamar', 'banco', 'revisar', 'correo', 'pagar',
+    'renta', 'lavar', 'auto', 'estudiar', 'examen', 'enviar', 'reporte', 'cita',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000, help='Filas de prueba')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición')
+    parser.add_argument('--term', default='reporte', help='Término de búsqueda')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_api_project.settings')
+    django.setup()
+
+    from django.db import connection
+    from todos.models import Todo
+    from todos.search import search_todos
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        count = len(WORDS)
+        Todo.objects.bulk_create(
+            [
+                Todo(
+                    userId=i % 100 + 1,
+                    title=f'{WORDS[i % count]} {WORDS[i * 7 % count]} {i}',
+                    completed=i % 3 == 0
+                )
+                for i in range(args.rows)
+            ],
+            batch_size=5000
+        )
+        print(f'{args.rows} filas, término "{args.term}", mejor de {args.repeat} intento(s)\n')
+        print(f'{"Consulta":<28}{"primeros 20 (ms)":>18}{"conteo (ms)":>14}')
+
+        queries = [
+            ('LIKE (icontains)', lambda: Todo.objects.filter(title__icontains=args.term).order_by('id')),
+            ('FTS sin ranking', lambda: search_todos(Todo.objects.order_by('id'), args.term, ranked=False)),
+            ('FTS con ranking', lambda: search_todos(Todo.objects.all(), args.term)),
+        ]
+        for name, build in queries:
+            page = best_time(lambda: list(build()[:20]), args.repeat)
+            total = best_time(lambda: build().count(), args.repeat)
+            print(f'{name:<28}{page * 1000:>18,.1f}{total * 1000:>14,.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+API externa de todos simulada para benchmarks sin red
+Sirve GET /todos?_start=&_limit= con el formato de jsonplaceholder, con ETag por
+página (responde 304 a If-None-Match mientras no cambie la revisión), latencia
+opcional por petición y errores HTTP inyectados por página (fail()). Se usa desde
+benchmarks.endpoints para medir /api/sync/ y desde las pruebas de la sincronización.
+
+Uso (desde Examen2/), como servidor independiente:
+    python -m benchmarks.upstream --rows 100000 --port 8001
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeUpstream:
+    """
+    Servidor HTTP en un hilo con rows todos (ids 1..rows) repartidos entre users usuarios
+    mutate() cambia los títulos y la revisión, como si la API externa se hubiera actualizado
+    """
+
+    def __init__(self, rows=10000, users=10, latency=0.0, host='127.0.0.1', port=0):
+        self.rows = rows
+        self.users = users
+        self.latency = latency
+        self.revision = 0
+        self.requests = 0
+        self.failures = {}  # _start -> códigos HTTP a responder antes de la página
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/todos'
+
+    def record(self, todo_id):
+        """Registro todo_id en la revisión actual"""
+        return {
+            'userId': (todo_id - 1) % self.users + 1,
+            'id': todo_id,
+            'title': f'Pendiente externo {todo_id} r{self.revision}',
+            'completed': (todo_id + self.revision) % 3 == 0,
+        }
+
+    def page(self, start, limit):
+        """Registros de la página y su ETag"""
+        stop = min(start + limit, self.rows)
+        etag = hashlib.md5(f'{self.revision}:{start}:{limit}'.encode()).hexdigest()
+        return [self.record(todo_id) for todo_id in range(start + 1, stop + 1)], f'"{etag}"'
+
+    def mutate(self):
+        self.revision += 1
+
+    def fail(self, start, *statuses):
+        """Las próximas peticiones de la página _start responden statuses, en orden"""
+        with self._lock:
+            self.failures.setdefault(start, []).extend(statuses)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                params = parse_qs(urlsplit(self.path).query)
+                start = int(params.get('_start', ['0'])[0])
+                limit = int(params.get('_limit', [str(upstream.rows)])[0])
+                with upstream._lock:
+                    failures = upstream.failures.get(start)
+                    status = failures.pop(0) if failures else None
+                if status is not None:
+                    self.send_response(status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                records, etag = upstream.page(start, limit)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps(records).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000, help='Registros servidos')
+    parser.add_argument('--users', type=int, default=10, help='Usuarios distintos')
+    parser.add_argument('--latency', type=float, default=0.0, help='Segundos de espera por petición')
+    parser.add_argument('--port', type=int, default=8001, help='Puerto')
+    args = parser.parse_args()
+
+    upstream = FakeUpstream(args.rows, args.users, args.latency, port=args.port)
+    print(f'API externa simulada en {upstream.url} ({args.rows} registros); Ctrl+C para terminar')
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstream.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
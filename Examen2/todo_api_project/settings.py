@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS debe ir primero
+    'todos.metrics.MetricsMiddleware',  # Métricas por endpoint en /metrics
+    'todos.instrumentation.SQLInstrumentationMiddleware',  # Server-Timing y consultas lentas
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'todos.profiling.ProfilingMiddleware',  # Perfilado bajo demanda (va al final)
 ]
 
 ROOT_URLCONF = 'todo_api_project.urls'
@@ -84,9 +88,26 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,  # Reutilizar la conexión entre peticiones (segundos)
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # BEGIN IMMEDIATE: la transacción toma el bloqueo de escritura al empezar
+            # y espera busy_timeout, en lugar de fallar al pasar de lectura a escritura
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# PRAGMA aplicados a cada conexión SQLite (todos.sqlite, valores por defecto en DEFAULT_PRAGMAS)
+TODOS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # Lecturas concurrentes con una escritura
+    'synchronous': 'NORMAL',  # Seguro con WAL, sin fsync por transacción
+    'busy_timeout': 5000,  # ms de espera por el bloqueo de escritura
+    'cache_size': -65536,  # Caché de páginas en KiB (64 MB)
+    'mmap_size': 268435456,  # Lectura por mmap (256 MB)
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,7 +153,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'todos.renderers.FastJSONRenderer',  # JSONRenderer con orjson si está instalado
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
@@ -169,4 +190,104 @@ CORS_ALLOW_ALL_ORIGINS = True  # Solo para desarrollo
 
 # Configuración adicional para la API
 APPEND_SLASH = True
+
+# Cachés: 'todos' guarda las respuestas de lectura de la API (todos.cache).
+# LocMemCache es LRU y local a cada proceso; para compartirla entre procesos
+# basta con cambiar el BACKEND (por ejemplo Redis o Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'todos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todos-responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Caché de respuestas por endpoint (todos.cache). TTL en segundos, 0 = sin caché;
+# la clave incluye la versión de la tabla, así que una escritura invalida todo al instante
+TODOS_CACHE = {
+    'ALIAS': 'todos',
+    'DEFAULT_TIMEOUT': 60,
+    'TIMEOUTS': {
+        'list': 60,  # TodoViewSet list / completed / pending
+        'detail': 300,  # TodoViewSet retrieve
+        'projection': 120,  # Vistas de proyección del examen
+        'stats': 30,  # api_stats y summary
+        'user_todos': 60,
+    },
+}
+
+# Snapshot columnar en memoria de id / userId / completed / synced_from_api (todos.snapshot)
+# para las proyecciones de IDs y las estadísticas; cada proceso mantiene el suyo.
+# Mientras no está cargado o vigente las vistas usan TodoCounters y la tabla
+TODOS_SNAPSHOT = {
+    'ENABLED': True,
+    'RECONCILE_SECONDS': 300,  # Recarga completa desde la base de datos como máximo cada N segundos
+    'CHUNK_SIZE': 5000,  # Filas leídas por bloque al cargar
+    # Recargas en un hilo en segundo plano; con False solo se carga con TodoSnapshot.load()
+    'BACKGROUND_RELOAD': True,
+}
+
+# Instrumentación SQL por petición (todos.instrumentation): cabecera Server-Timing
+# (db / serialize / render) y log de consultas lentas con su EXPLAIN en 'todos.sql'
+TODOS_INSTRUMENTATION = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.1,  # Fracción de peticiones instrumentadas; 1.0 para medir todas
+    'SERVER_TIMING': True,
+    'SLOW_QUERY_MS': 100,  # Umbral del log de consultas lentas (0 = desactivado)
+    'EXPLAIN': True,
+    'MAX_EXPLAINS': 3,  # EXPLAIN por petición como máximo
+}
+
+# Métricas por endpoint para Prometheus en /metrics (todos.metrics). Con varios procesos
+# WSGI, MULTIPROCESS_DIR es un directorio compartido (p. ej. en tmpfs) donde cada proceso
+# vuelca sus métricas; los archivos de procesos terminados se suman a un archivo acumulado.
+# /metrics solo responde a ALLOWED_IPS (el servidor de Prometheus) y al staff; detrás de
+# un proxy, REMOTE_ADDR es la dirección del proxy
+TODOS_METRICS = {
+    'ENABLED': True,
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),  # segundos
+    'MULTIPROCESS_DIR': os.environ.get('TODOS_METRICS_DIR'),
+    'FLUSH_SECONDS': 5,  # Cada proceso vuelca sus métricas como máximo cada N segundos
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),  # Direcciones o redes CIDR; None = sin restricción
+}
+
+# Perfilado bajo demanda con cProfile (todos.profiling): peticiones con la cabecera firmada
+# X-Todos-Profile (python manage.py profile_token) o de las vistas de ALLOWED_VIEWS.
+# Los perfiles se listan y descargan en /api/profiles/ (staff)
+TODOS_PROFILING = {
+    'ENABLED': True,
+    'HEADER': 'X-Todos-Profile',
+    'TOKEN_MAX_AGE': 3600,  # Segundos de validez de un token
+    'ALLOWED_VIEWS': [],  # p. ej. ['todos:user_todos', 'todos:api_stats']
+    'SAMPLE_RATE': 1.0,  # Fracción perfilada de las peticiones de ALLOWED_VIEWS
+    'DIRECTORY': None,  # None = <directorio temporal>/todos-profiles
+    'MAX_PROFILES': 50,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'todos': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Sincronización con la API externa (todos.sync)
+TODOS_SYNC = {
+    'BATCH_SIZE': 500,  # Registros por lote de escritura (bulk_create/bulk_update)
+    'PAGE_SIZE': 500,  # Registros por página pedida a la API externa (_start/_limit)
+    'MAX_WORKERS': 4,  # Páginas descargadas en paralelo
+    'MAX_RETRIES': 3,  # Reintentos por página ante errores de red o 5xx/429
+    'RETRY_BACKOFF': 0.5,  # Segundos base del backoff exponencial
+    'TIMEOUT': 10,  # Timeout por petición en segundos
+    'JOB_BACKEND': 'thread',  # 'thread' = pool en el proceso, 'command' = manage.py run_sync_jobs
+    'JOB_WORKERS': 2,  # Trabajos de sincronización ejecutados en paralelo
+    'JOB_STALE_AFTER': 3600,  # Segundos tras los que un trabajo activo se da por perdido
+}
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Todo
+from .counters import update_todos
+from .models import SyncJob, Todo
+from .search import search_todos
 
 @admin.register(Todo)
 class TodoAdmin(admin.ModelAdmin):
@@ -28,12 +30,12 @@ class TodoAdmin(admin.ModelAdmin):
             'fields': ('userId', 'title', 'completed')
         }),
         ('Metadatos', {
-            'fields': ('synced_from_api', 'created_at', 'updated_at'),
+            'fields': ('synced_from_api', 'last_synced_at', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'last_synced_at']
     
     # Acciones personalizadas
     actions = ['mark_as_completed', 'mark_as_pending', 'mark_as_synced']
@@ -43,9 +45,24 @@ class TodoAdmin(admin.ModelAdmin):
         return obj.title[:50] + '...' if len(obj.title) > 50 else obj.title
     title_truncated.short_description = 'Título'
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Busca en el índice de texto completo del título en lugar de LIKE '%término%'
+        Un término numérico busca además por userId
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = search_todos(queryset, search_term, ranked=False)
+        if search_term.isdigit():
+            matches = matches | queryset.filter(userId=int(search_term))
+        return matches, False
+    
     def mark_as_completed(self, request, queryset):
         """Acción para marcar todos como completados"""
-        updated = queryset.update(completed=True)
+        # El cambio local invalida el hash de la última sincronización;
+        # update_todos mantiene además los contadores materializados
+        updated = update_todos(queryset, completed=True, content_hash='')
         self.message_user(
             request,
             f'{updated} pendiente(s) marcado(s) como completado(s).'
@@ -54,7 +71,7 @@ class TodoAdmin(admin.ModelAdmin):
     
     def mark_as_pending(self, request, queryset):
         """Acción para marcar todos como pendientes"""
-        updated = queryset.update(completed=False)
+        updated = update_todos(queryset, completed=False, content_hash='')
         self.message_user(
             request,
             f'{updated} pendiente(s) marcado(s) como pendiente(s).'
@@ -63,7 +80,7 @@ class TodoAdmin(admin.ModelAdmin):
     
     def mark_as_synced(self, request, queryset):
         """Acción para marcar todos como sincronizados"""
-        updated = queryset.update(synced_from_api=True)
+        updated = update_todos(queryset, synced_from_api=True)
         self.message_user(
             request,
             f'{updated} pendiente(s) marcado(s) como sincronizado(s).'
@@ -73,3 +90,25 @@ class TodoAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimiza las consultas del admin"""
         return super().get_queryset(request).select_related()
+
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para los trabajos de sincronización
+    Solo lectura: los trabajos se crean desde /api/sync/
+    """
+    list_display = [
+        'id', 'api_url', 'status', 'fetched', 'created', 'updated',
+        'skipped', 'errors_count', 'queued_at', 'started_at', 'finished_at'
+    ]
+    list_filter = ['status', 'queued_at']
+    search_fields = ['api_url']
+    ordering = ['-id']
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class TodosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todos'
+
+    def ready(self):
+        # Registrar las señales del modelo Todo
+        from . import signals  # noqa: F401
+        from .search import ensure_search_index
+        from .sqlite import configure_sqlite_connection
+
+        # PRAGMA de producción en cada conexión SQLite (WAL, busy_timeout, caché)
+        connection_created.connect(
+            configure_sqlite_connection,
+            dispatch_uid='todos.configure_sqlite_connection'
+        )
+
+        # Las migraciones que reconstruyen la tabla en SQLite borran los triggers FTS5
+        post_migrate.connect(
+            lambda using='default', **kwargs: ensure_search_index(using),
+            sender=self, weak=False,
+            dispatch_uid='todos.ensure_search_index'
+        )
@@ -0,0 +1,253 @@
+"""
+Operaciones por lotes sobre todos (/api/todos/bulk/)
+Cada elemento se valida con una sola instancia del serializador y sin consultar la
+base de datos; las comprobaciones que necesitan datos existentes (duplicados por el
+índice único (userId, title_hash), IDs) se hacen con una consulta por lote y el lote
+se aplica en una sola transacción con bulk_create / bulk_update / delete().
+Los elementos inválidos se informan en su resultado y no impiden aplicar los demás.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .counters import batched_counters, query_param_chunks, version_changed
+from .models import DUPLICATE_TITLE_MESSAGE, Todo, hash_title
+from .serializers import TodoCreateSerializer, TodoUpdateSerializer
+from .snapshot import record_rows
+from .sync import sync_setting
+
+# Elementos máximos por petición (las consultas IN (...) se dividen según max_query_params)
+MAX_BULK_ITEMS = 10000
+
+NOT_FOUND_ERROR = 'No existe un todo con este ID.'
+REPEATED_ID_ERROR = 'El ID aparece más de una vez en el lote.'
+CONFLICT_ERROR = 'Otra escritura concurrente creó el mismo título; reintente el elemento.'
+
+# Lecturas de títulos ocupados + INSERT antes de insertar elemento por elemento
+CREATE_ATTEMPTS = 3
+
+BULK_UPDATE_FIELDS = ['title', 'title_hash', 'completed', 'content_hash', 'updated_at']
+
+
+def _error(index, status, errors):
+    return {'index': index, 'status': status, 'errors': errors}
+
+
+def _item_id(item):
+    """ID de un elemento de actualización o borrado (entero o {"id": n}); None si no es válido"""
+    value = item.get('id') if isinstance(item, dict) else item
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        return None
+    return value
+
+
+def _taken_titles(keys):
+    """
+    Pares (userId, title_hash) ya usados, con una consulta sobre el índice único
+    por cada bloque de pares que cabe en los parámetros de una sentencia
+    """
+    taken = set()
+    # Cada par aporta hasta dos parámetros: su userId y su title_hash
+    for chunk in query_param_chunks(keys, per_value=2):
+        taken.update(
+            Todo.objects.filter(
+                userId__in={user_id for user_id, _ in chunk},
+                title_hash__in={title_hash for _, title_hash in chunk},
+            ).values_list('userId', 'title_hash')
+        )
+    return taken
+
+
+def _insert_todos(todos):
+    """INSERT en bloque en su propia transacción (o savepoint), con contadores y snapshot"""
+    with transaction.atomic(), batched_counters() as delta:
+        Todo.objects.bulk_create(todos, batch_size=sync_setting('BATCH_SIZE'))
+        for todo in todos:
+            delta.add_state(todo.counter_state())
+        record_rows(todos)
+
+
+def bulk_create_todos(items):
+    """
+    Crea los todos válidos del lote
+    Los duplicados (mismo userId y título normalizado) se buscan con una sola consulta
+    sobre el índice único, incluidos los repetidos dentro del propio lote.
+    """
+    results = [None] * len(items)
+    valid = []
+    serializer = TodoCreateSerializer()
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as exc:
+            results[index] = _error(index, 400, exc.detail)
+
+    for _, data in valid:
+        data['title_hash'] = hash_title(data['title'])
+
+    # Si otra petición inserta el mismo título entre la consulta y el INSERT,
+    # el índice único lo rechaza y el lote se revisa de nuevo
+    for _ in range(CREATE_ATTEMPTS):
+        taken = _taken_titles({(data['userId'], data['title_hash']) for _, data in valid})
+        todos, indexes = [], []
+        for index, data in valid:
+            key = (data['userId'], data['title_hash'])
+            if key in taken:
+                results[index] = _error(index, 400, {'non_field_errors': [DUPLICATE_TITLE_MESSAGE]})
+                continue
+            taken.add(key)
+            todos.append(Todo(**data))
+            indexes.append(index)
+
+        if not todos:
+            break
+        try:
+            _insert_todos(todos)
+            break
+        except IntegrityError:
+            continue
+    else:
+        # El choque persiste: cada elemento en su propio savepoint y 409 solo para los que chocan
+        created = []
+        with transaction.atomic(), batched_counters():
+            for index, todo in zip(indexes, todos):
+                try:
+                    _insert_todos([todo])
+                except IntegrityError:
+                    results[index] = _error(index, 409, {'title': [CONFLICT_ERROR]})
+                else:
+                    created.append((index, todo))
+        indexes = [index for index, _ in created]
+        todos = [todo for _, todo in created]
+
+    for index, todo in zip(indexes, todos):
+        results[index] = {'index': index, 'status': 201, 'id': todo.id}
+    return results
+
+
+def bulk_update_todos(items):
+    """
+    Actualización parcial (title, completed) de los todos del lote
+    Los todos se leen con una consulta y se escriben en bloque (upsert nativo o bulk_update).
+    """
+    results = [None] * len(items)
+    valid = {}
+    serializer = TodoUpdateSerializer(partial=True)
+    for index, item in enumerate(items):
+        todo_id = _item_id(item) if isinstance(item, dict) else None
+        if todo_id is None:
+            results[index] = _error(index, 400, {'id': ['Se requiere un ID entero positivo.']})
+            continue
+        if todo_id in valid:
+            results[index] = _error(index, 400, {'id': [REPEATED_ID_ERROR]})
+            continue
+        try:
+            valid[todo_id] = (index, serializer.run_validation(item))
+        except ValidationError as exc:
+            results[index] = _error(index, 400, exc.detail)
+
+    with transaction.atomic(), batched_counters() as delta:
+        # in_bulk() ya divide la consulta según max_query_params
+        existing = Todo.objects.in_bulk(list(valid)) if valid else {}
+        pending = []
+        for todo_id, (index, data) in valid.items():
+            todo = existing.get(todo_id)
+            if todo is None:
+                results[index] = _error(index, 404, {'id': [NOT_FOUND_ERROR]})
+            elif any(getattr(todo, field) != value for field, value in data.items()):
+                new_hash = hash_title(data['title']) if 'title' in data else todo.title_hash
+                pending.append((index, todo, data, new_hash))
+            else:
+                results[index] = {'index': index, 'status': 200, 'id': todo_id}
+
+        # Títulos nuevos que chocan con otro todo del usuario o con otro elemento del lote.
+        # Un título que otro elemento del lote deja libre sigue contando como ocupado:
+        # el upsert comprueba el índice fila a fila
+        taken = _taken_titles({
+            (todo.userId, new_hash)
+            for _, todo, _, new_hash in pending if new_hash != todo.title_hash
+        })
+
+        now = timezone.now()
+        changed = []
+        for index, todo, data, new_hash in pending:
+            if new_hash != todo.title_hash:
+                key = (todo.userId, new_hash)
+                if key in taken:
+                    results[index] = _error(index, 400, {'title': [DUPLICATE_TITLE_MESSAGE]})
+                    continue
+                taken.add(key)
+            old_state = todo.counter_state()
+            for field, value in data.items():
+                setattr(todo, field, value)
+            todo.title_hash = new_hash
+            # Igual que Todo.save(): un cambio local invalida el hash de sincronización
+            todo.content_hash = ''
+            todo.updated_at = now
+            changed.append((index, todo, old_state))
+
+        todos = [todo for _, todo, _ in changed]
+        try:
+            with transaction.atomic():
+                _write_updates(todos)
+        except IntegrityError:
+            for index, todo, _ in changed:
+                results[index] = _error(index, 409, {'title': [CONFLICT_ERROR]})
+            changed = []
+
+        for index, todo, old_state in changed:
+            results[index] = {'index': index, 'status': 200, 'id': todo.id}
+            delta.add_state(old_state, -1)
+            delta.add_state(todo.counter_state())
+        if changed:
+            version_changed()
+            record_rows([todo for _, todo, _ in changed])
+    return results
+
+
+def _write_updates(todos):
+    """Escribe en bloque los todos modificados"""
+    if not todos:
+        return
+    batch_size = sync_setting('BATCH_SIZE')
+    if connection.features.supports_update_conflicts_with_target:
+        # Upsert nativo (INSERT ... ON CONFLICT DO UPDATE), como en la sincronización:
+        # mucho más rápido que el UPDATE con CASE WHEN que genera bulk_update
+        Todo.objects.bulk_create(
+            todos, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['id'], update_fields=BULK_UPDATE_FIELDS
+        )
+    else:
+        Todo.objects.bulk_update(todos, BULK_UPDATE_FIELDS, batch_size=batch_size)
+
+
+def bulk_delete_todos(items):
+    """
+    Elimina los todos del lote (IDs enteros u objetos {"id": n})
+    El borrado se hace con filter(id__in=...).delete() por bloques de max_query_params
+    IDs; las señales post_delete acumulan en un solo lote de contadores.
+    """
+    results = [None] * len(items)
+    ids = {}
+    for index, item in enumerate(items):
+        todo_id = _item_id(item)
+        if todo_id is None:
+            results[index] = _error(index, 400, {'id': ['Se requiere un ID entero positivo.']})
+        elif todo_id in ids:
+            results[index] = _error(index, 400, {'id': [REPEATED_ID_ERROR]})
+        else:
+            ids[todo_id] = index
+
+    found = set()
+    with transaction.atomic(), batched_counters():
+        for chunk in query_param_chunks(ids):
+            found.update(Todo.objects.filter(id__in=chunk).values_list('id', flat=True))
+        for chunk in query_param_chunks(found):
+            Todo.objects.filter(id__in=chunk).delete()
+
+    for todo_id, index in ids.items():
+        if todo_id in found:
+            results[index] = {'index': index, 'status': 204, 'id': todo_id}
+        else:
+            results[index] = _error(index, 404, {'id': [NOT_FOUND_ERROR]})
+    return results
@@ -0,0 +1,91 @@
+"""
+Caché de respuestas de las vistas de lectura de todos
+La clave es el mismo hash que el ETag: versión de la tabla (DataVersion) + URL completa
+con query params + Accept. Cada escritura (señales post_save/post_delete, QuerySet.update(),
+acciones del admin, sincronización, lotes) incrementa la versión, así que una respuesta
+en caché nunca sobrevive a una escritura; las entradas anteriores expiran por TTL o LRU.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .versioning import todos_etag
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_CACHE
+DEFAULTS = {
+    'ALIAS': 'default',
+    'DEFAULT_TIMEOUT': 60,
+    'TIMEOUTS': {},
+}
+
+# Cabeceras que no se guardan con la respuesta
+UNCACHED_HEADERS = {'set-cookie', 'x-cache'}
+
+
+def cache_setting(name):
+    """Lee un valor de settings.TODOS_CACHE con su valor por defecto"""
+    return getattr(settings, 'TODOS_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def endpoint_timeout(endpoint):
+    """TTL en segundos de un endpoint (0 = sin caché)"""
+    return cache_setting('TIMEOUTS').get(endpoint, cache_setting('DEFAULT_TIMEOUT'))
+
+
+def response_cache_key(request):
+    return f'todos:response:{todos_etag(request)}'
+
+
+def _cacheable(response):
+    """Solo respuestas 200 completas y que no sean HTML (la API navegable incluye el usuario y CSRF)"""
+    return (
+        response.status_code == 200
+        and not getattr(response, 'streaming', False)
+        and not response.get('Content-Type', '').startswith('text/html')
+    )
+
+
+def cache_response(endpoint):
+    """
+    Decorador de vistas de lectura: sirve la respuesta desde la caché si existe
+    para la versión actual de la tabla; si no, la genera y la guarda tras renderizarla.
+    Se aplica debajo de todos_condition para que un 304 no llegue a consultar la caché.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            timeout = endpoint_timeout(endpoint)
+            if request.method not in ('GET', 'HEAD') or not timeout:
+                return view_func(request, *args, **kwargs)
+
+            cache = caches[cache_setting('ALIAS')]
+            key = response_cache_key(request)
+            entry = cache.get(key)
+            if entry is not None:
+                status, headers, content = entry
+                response = HttpResponse(content, status=status)
+                for name, value in headers:
+                    response[name] = value
+                response['X-Cache'] = 'HIT'
+                return response
+
+            def store(rendered):
+                if _cacheable(rendered):
+                    headers = [
+                        (name, value) for name, value in rendered.items()
+                        if name.lower() not in UNCACHED_HEADERS
+                    ]
+                    cache.set(key, (rendered.status_code, headers, rendered.content), timeout)
+
+            response = view_func(request, *args, **kwargs)
+            if getattr(response, 'is_rendered', True):
+                store(response)
+            else:
+                # Response de DRF: el contenido existe después de renderizar
+                response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,264 @@
+"""
+Mantenimiento incremental de TodoCounters
+Cada escritura sobre Todo traduce su efecto a variaciones por usuario y las
+aplica con UPDATE ... SET total = total + n (F()), sin recorrer la tabla de todos.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+
+from .models import Todo, TodoCounters
+from .versioning import bump_version
+
+GLOBAL_USER_ID = TodoCounters.GLOBAL_USER_ID
+
+# Parámetros por usuario en el UPDATE de contadores (hasta 6 en los CASE y 1 en el IN)
+INCREMENT_PARAMS = 7
+
+# Lote activo del hilo (ver batched_counters)
+_batch = threading.local()
+
+
+def query_param_chunks(values, reserved=0, per_value=1, conn=None):
+    """
+    Divide values en bloques que caben como parámetros de una sentencia
+    (connection.features.max_query_params; sin límite, un solo bloque), junto con otros
+    reserved parámetros y con per_value parámetros por valor
+    """
+    conn = conn or connection
+    values = list(values)
+    limit = conn.features.max_query_params
+    size = max((limit - reserved) // per_value, 1) if limit else max(len(values), 1)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class CounterDelta:
+    """
+    Acumula variaciones de contadores por usuario y las aplica de una vez
+    La fila global recibe la suma de todas las variaciones.
+    """
+
+    def __init__(self):
+        self.users = defaultdict(lambda: [0, 0, 0])
+
+    def add(self, user_id, total=0, completed=0, synced=0):
+        """Suma una variación a los contadores de un usuario"""
+        delta = self.users[user_id]
+        delta[0] += total
+        delta[1] += completed
+        delta[2] += synced
+
+    def add_state(self, state, sign=1):
+        """Suma (sign=1) o resta (sign=-1) un todo con estado (userId, completed, synced_from_api)"""
+        user_id, completed, synced = state
+        self.add(user_id, sign, sign if completed else 0, sign if synced else 0)
+
+    def apply(self):
+        """Aplica las variaciones acumuladas: un solo UPDATE por bloque de usuarios (max_query_params)"""
+        global_delta = [0, 0, 0]
+        deltas = {}
+        for user_id, delta in self.users.items():
+            if any(delta):
+                deltas[user_id] = tuple(delta)
+                for i in range(3):
+                    global_delta[i] += delta[i]
+        if any(global_delta):
+            deltas[GLOBAL_USER_ID] = tuple(global_delta)
+
+        for chunk in query_param_chunks(deltas, per_value=INCREMENT_PARAMS):
+            _increment({user_id: deltas[user_id] for user_id in chunk})
+        self.users.clear()
+
+
+def _increment(deltas):
+    """
+    Incrementa atómicamente las filas de deltas (userId -> (total, completed, synced)),
+    creándolas si no existen. Si las variaciones difieren entre usuarios se eligen
+    con CASE userId WHEN ... en la misma sentencia, en lugar de un UPDATE por variación
+    """
+    user_ids = list(deltas)
+    changes = {}
+    for i, field in enumerate(('total', 'completed', 'synced')):
+        values = {delta[i] for delta in deltas.values()}
+        if len(values) == 1:
+            increment = Value(values.pop())
+        else:
+            increment = Case(
+                *[When(userId=user_id, then=Value(delta[i])) for user_id, delta in deltas.items()],
+                default=Value(0), output_field=IntegerField()
+            )
+        changes[field] = F(field) + increment
+    updated = TodoCounters.objects.filter(userId__in=user_ids).update(**changes)
+    if updated == len(user_ids):
+        return
+
+    existing = set(
+        TodoCounters.objects.filter(userId__in=user_ids).values_list('userId', flat=True)
+    )
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    # ignore_conflicts: otra transacción pudo crear la fila entre tanto
+    TodoCounters.objects.bulk_create(
+        [TodoCounters(userId=user_id) for user_id in missing],
+        ignore_conflicts=True
+    )
+    TodoCounters.objects.filter(userId__in=missing).update(**changes)
+
+
+def _active_batch():
+    """CounterDelta del lote activo en este hilo, o None"""
+    return getattr(_batch, 'delta', None)
+
+
+@contextmanager
+def batched_counters():
+    """
+    Agrupa las variaciones de contadores de muchas escrituras
+    Dentro del bloque las señales de Todo acumulan en un solo CounterDelta y la
+    versión de la tabla se incrementa una vez al salir, en lugar de una vez por fila
+    (por ejemplo al borrar con queryset.delete(), que envía post_delete por cada todo).
+    Usar dentro de transaction.atomic(). Retorna el CounterDelta para sumar variaciones
+    de escrituras que no envían señales (bulk_create, bulk_update).
+    """
+    delta = _active_batch()
+    if delta is not None:
+        # Lote anidado: se aplica con el exterior
+        yield delta
+        return
+
+    delta = _batch.delta = CounterDelta()
+    _batch.changed = False
+    try:
+        yield delta
+        changed = _batch.changed or bool(delta.users)
+    finally:
+        _batch.delta = None
+    delta.apply()
+    if changed:
+        bump_version()
+    # Importación diferida: snapshot importa este módulo
+    from .snapshot import batch_finished
+    batch_finished(delta, changed)
+
+
+def version_changed():
+    """Incrementa la versión de la tabla, o la difiere al final del lote activo"""
+    if _active_batch() is not None:
+        _batch.changed = True
+    else:
+        bump_version()
+
+
+def record_saved(instance, created):
+    """Actualiza los contadores tras guardar un todo (post_save)"""
+    new_state = instance.counter_state()
+    if new_state is None:
+        return
+    delta = _active_batch() or CounterDelta()
+    if created:
+        delta.add_state(new_state)
+    else:
+        old_state = getattr(instance, '_counter_state', None)
+        if old_state is None or old_state == new_state:
+            instance._counter_state = new_state
+            return
+        delta.add_state(old_state, -1)
+        delta.add_state(new_state)
+    if delta is not _active_batch():
+        delta.apply()
+    instance._counter_state = new_state
+
+
+def record_deleted(instance):
+    """Actualiza los contadores tras eliminar un todo (post_delete)"""
+    state = getattr(instance, '_counter_state', None) or instance.counter_state()
+    if state is None:
+        return
+    batch = _active_batch()
+    if batch is not None:
+        batch.add_state(state, -1)
+        return
+    delta = CounterDelta()
+    delta.add_state(state, -1)
+    delta.apply()
+
+
+# Campos de Todo de los que dependen los contadores
+COUNTER_FIELDS = frozenset(('userId', 'completed', 'synced_from_api'))
+
+
+def queryset_update_delta(queryset, values, delta):
+    """
+    Suma a delta el efecto de queryset.update(**values) sobre los contadores, con una
+    agregación por (userId, completed, synced_from_api) de las filas afectadas antes de escribir
+    Retorna False si algún campo de contadores recibe una expresión (F(), Case...), cuyo
+    resultado por fila no se conoce sin releer las filas
+    """
+    changing = {field: value for field, value in values.items() if field in COUNTER_FIELDS}
+    if not changing:
+        return True
+    if any(hasattr(value, 'resolve_expression') for value in changing.values()):
+        return False
+    groups = (
+        queryset.order_by().values('userId', 'completed', 'synced_from_api')
+        .annotate(n=Count('id'))
+    )
+    for row in groups:
+        old_state = (row['userId'], row['completed'], row['synced_from_api'])
+        new_state = (
+            changing.get('userId', old_state[0]),
+            bool(changing.get('completed', old_state[1])),
+            bool(changing.get('synced_from_api', old_state[2])),
+        )
+        if new_state != old_state:
+            delta.add_state(old_state, -row['n'])
+            delta.add_state(new_state, row['n'])
+    return True
+
+
+def counters_unknown():
+    """
+    Recalcula los contadores tras una escritura cuyas variaciones no se conocen
+    Las variaciones pendientes del lote activo se descartan: la reconstrucción ya las incluye.
+    """
+    rebuild_counters()
+    delta = _active_batch()
+    if delta is not None:
+        delta.users.clear()
+
+
+def update_todos(queryset, **values):
+    """
+    Equivalente a queryset.update(): TodoQuerySet.update() ya mantiene los contadores
+    y la versión de la tabla. Se conserva para los llamadores existentes
+    """
+    return queryset.update(**values)
+
+
+def rebuild_counters():
+    """
+    Recalcula todos los contadores desde la tabla de todos (una agregación GROUP BY)
+    Retorna el número de usuarios con contadores
+    """
+    rows = (
+        Todo.objects.order_by().values('userId').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(completed=True)),
+            synced=Count('id', filter=Q(synced_from_api=True)),
+        )
+    )
+    counters = [TodoCounters(userId=GLOBAL_USER_ID)]
+    global_counters = counters[0]
+    for row in rows:
+        counters.append(TodoCounters(**row))
+        global_counters.total += row['total']
+        global_counters.completed += row['completed']
+        global_counters.synced += row['synced']
+
+    with transaction.atomic():
+        TodoCounters.objects.all().delete()
+        TodoCounters.objects.bulk_create(counters, batch_size=1000)
+    return len(counters) - 1
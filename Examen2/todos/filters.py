@@ -0,0 +1,47 @@
+"""
+Filtros por query params compartidos por las vistas de listas de todos
+"""
+from rest_framework.exceptions import ValidationError
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def parse_bool_param(params, name):
+    """Lee un parámetro booleano (true/false/1/0); None si no viene o está vacío"""
+    value = params.get(name, '')
+    if value == '':
+        return None
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValidationError({name: 'Debe ser true o false.'})
+
+
+def parse_int_param(params, name, min_value=1):
+    """Lee un parámetro entero positivo; None si no viene o está vacío"""
+    value = params.get(name, '')
+    if value == '':
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Debe ser un número entero.'})
+    if number < min_value:
+        raise ValidationError({name: f'Debe ser mayor o igual a {min_value}.'})
+    return number
+
+
+def filter_todos(queryset, params):
+    """
+    Aplica ?completed= y ?userId= a un queryset de todos
+    Combinados usan el índice compuesto (userId, completed)
+    """
+    completed = parse_bool_param(params, 'completed')
+    if completed is not None:
+        queryset = queryset.filter(completed=completed)
+    user_id = parse_int_param(params, 'userId')
+    if user_id is not None:
+        queryset = queryset.filter(userId=user_id)
+    return queryset
@@ -0,0 +1,150 @@
+"""
+Instrumentación SQL por petición
+SQLInstrumentationMiddleware envuelve el cursor de cada conexión con
+connection.execute_wrapper en una fracción de las peticiones (SAMPLE_RATE) y mide:
+- db: número y tiempo total de las consultas SQL
+- serialize: tiempo de la vista sin SQL (consultas del ORM aparte, sobre todo serialización)
+- render: tiempo de renderizado de la respuesta (JSON, CSV, API navegable...)
+Lo publica en la cabecera Server-Timing (visible en las herramientas del navegador)
+y registra en el logger 'todos.sql' las consultas que superan SLOW_QUERY_MS junto
+con su plan (EXPLAIN). Las peticiones no muestreadas no pagan nada más que un random().
+"""
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('todos.sql')
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_INSTRUMENTATION
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.1,  # Fracción de peticiones instrumentadas (0 a 1)
+    'SERVER_TIMING': True,
+    'SLOW_QUERY_MS': 100,  # 0 o None = no registrar consultas lentas
+    'EXPLAIN': True,
+    'MAX_EXPLAINS': 3,  # EXPLAIN ejecutados como máximo por petición
+}
+
+
+def instrumentation_setting(name):
+    """Lee un valor de settings.TODOS_INSTRUMENTATION con su valor por defecto"""
+    return getattr(settings, 'TODOS_INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+class RequestTimings:
+    """Tiempos de una petición instrumentada (segundos) y consultas lentas pendientes de registrar"""
+
+    def __init__(self, slow_threshold):
+        self.started = time.perf_counter()
+        self.view_finished = None
+        self.finished = None
+        self.db_time = 0.0
+        self.db_count = 0
+        self.db_time_in_view = 0.0
+        self.slow_threshold = slow_threshold
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: mide cada consulta y guarda las lentas"""
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.db_time += elapsed
+            self.db_count += 1
+            if self.slow_threshold and elapsed >= self.slow_threshold:
+                self.slow_queries.append((context['connection'].alias, sql, params, many, elapsed))
+
+    def mark_view_finished(self):
+        """La vista retornó: lo que sigue es el renderizado"""
+        self.view_finished = time.perf_counter()
+        self.db_time_in_view = self.db_time
+
+    @property
+    def total(self):
+        return self.finished - self.started
+
+    @property
+    def render(self):
+        if self.view_finished is None:
+            return 0.0
+        return max(0.0, self.finished - self.view_finished - (self.db_time - self.db_time_in_view))
+
+    @property
+    def serialize(self):
+        return max(0.0, self.total - self.db_time - self.render)
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing (duraciones en milisegundos)"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} consultas"',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'render;dur={self.render * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+def explain(alias, sql, params):
+    """Plan de una consulta SELECT en la conexión alias, o None si no se puede obtener"""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception as e:  # El plan es informativo: nunca rompe la petición
+        return f'(EXPLAIN no disponible: {e})'
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Middleware de instrumentación SQL muestreada (ver el docstring del módulo)
+    Va al principio de MIDDLEWARE para que el total incluya el resto de middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not instrumentation_setting('ENABLED') or random.random() >= instrumentation_setting('SAMPLE_RATE'):
+            return self.get_response(request)
+
+        slow_ms = instrumentation_setting('SLOW_QUERY_MS')
+        timings = request.todos_timings = RequestTimings(slow_ms / 1000 if slow_ms else None)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        timings.finished = time.perf_counter()
+
+        if instrumentation_setting('SERVER_TIMING'):
+            response['Server-Timing'] = timings.server_timing()
+        if timings.slow_queries:
+            self.log_slow_queries(request, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        """Se llama justo antes de renderizar las respuestas de DRF (Response) y de plantillas"""
+        timings = getattr(request, 'todos_timings', None)
+        if timings is not None:
+            timings.mark_view_finished()
+        return response
+
+    def log_slow_queries(self, request, timings):
+        explains = instrumentation_setting('MAX_EXPLAINS') if instrumentation_setting('EXPLAIN') else 0
+        for alias, sql, params, many, elapsed in timings.slow_queries:
+            plan = None
+            if explains > 0 and not many:
+                plan = explain(alias, sql, params)
+                explains -= plan is not None
+            logger.warning(
+                'Consulta lenta (%.1f ms) en %s %s:\n%s%s',
+                elapsed * 1000, request.method, request.get_full_path(), sql,
+                f'\nPlan:\n{plan}' if plan else ''
+            )
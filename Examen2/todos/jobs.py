@@ -0,0 +1,237 @@
+"""
+Cola de trabajos de sincronización en segundo plano
+Los trabajos se guardan en la tabla SyncJob y los ejecuta un pool de hilos
+dentro del proceso (JOB_BACKEND='thread') o el comando run_sync_jobs (JOB_BACKEND='command')
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import SyncJob, SyncSource, Todo
+from .sync import TodoPageFetcher, TodoSyncWriter, sync_setting
+
+logger = logging.getLogger(__name__)
+
+# Errores por registro que se guardan en el trabajo
+MAX_STORED_ERRORS = 10
+
+# Páginas cuyas filas se cuentan en una misma consulta (3 parámetros por página)
+PRESENCE_CHUNK = 200
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de hilos del proceso para ejecutar trabajos (se crea al primer uso)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=sync_setting('JOB_WORKERS'),
+                thread_name_prefix='todos-sync',
+            )
+        return _executor
+
+
+def expire_stale_jobs(api_url=None):
+    """
+    Marca como fallidos los trabajos activos que superaron JOB_STALE_AFTER
+    (por ejemplo, si el proceso que los ejecutaba se reinició)
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=sync_setting('JOB_STALE_AFTER'))
+    stale = SyncJob.objects.filter(
+        Q(status=SyncJob.STATUS_PENDING, queued_at__lt=cutoff) |
+        Q(status=SyncJob.STATUS_RUNNING, started_at__lt=cutoff)
+    )
+    if api_url is not None:
+        stale = stale.filter(api_url=api_url)
+    return stale.update(
+        status=SyncJob.STATUS_FAILED,
+        finished_at=now,
+        error='El trabajo expiró sin terminar'
+    )
+
+
+def enqueue_sync_job(api_url, limit, overwrite_existing=False, batch_size=None, full_sync=False):
+    """
+    Encola un trabajo de sincronización
+    Retorna (job, created). Si ya hay un trabajo activo para la misma URL
+    se devuelve ese trabajo en lugar de crear uno nuevo.
+    """
+    expire_stale_jobs(api_url)
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                job = SyncJob.objects.create(
+                    api_url=api_url,
+                    limit=limit,
+                    overwrite_existing=overwrite_existing,
+                    batch_size=batch_size,
+                    full_sync=full_sync,
+                )
+        except IntegrityError:
+            # La restricción única por URL activa detectó un duplicado
+            existing = SyncJob.objects.filter(
+                api_url=api_url, status__in=SyncJob.ACTIVE_STATUSES
+            ).first()
+            if existing is not None:
+                return existing, False
+            # El trabajo activo terminó entre el INSERT y la consulta: reintentar
+            continue
+
+        if sync_setting('JOB_BACKEND') == 'thread':
+            transaction.on_commit(lambda: get_executor().submit(run_sync_job_in_thread, job.pk))
+        return job, True
+
+    raise IntegrityError(f'No se pudo encolar la sincronización de {api_url}')
+
+
+def run_sync_job_in_thread(job_id):
+    """Ejecuta un trabajo en un hilo del pool gestionando su conexión a la base de datos"""
+    close_old_connections()
+    try:
+        run_sync_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def _save_progress(job, fetcher, writer, **extra):
+    """Persiste los contadores de progreso del trabajo"""
+    SyncJob.objects.filter(pk=job.pk).update(
+        fetched=fetcher.fetched,
+        created=writer.created,
+        updated=writer.updated,
+        skipped=writer.skipped,
+        errors_count=len(writer.errors),
+        errors=writer.errors[:MAX_STORED_ERRORS],
+        **extra
+    )
+
+
+def _usable_validators(source, job):
+    """
+    Validadores de la sincronización anterior aplicables a este trabajo
+    Una página que se aplicó sin sobrescritura no sirve para omitir una con sobrescritura,
+    ni ninguna página si hay todos sincronizados editados localmente (content_hash vacío):
+    la API respondería 304 y la edición local no se sobrescribiría. Tampoco las páginas
+    con filas sincronizadas borradas localmente (ver _pages_still_present)
+    """
+    if job.full_sync:
+        return {}
+    if job.overwrite_existing and Todo.objects.filter(synced_from_api=True, content_hash='').exists():
+        return {}
+    return _pages_still_present({
+        key: value for key, value in source.validators.items()
+        if value.get('overwrite') or not job.overwrite_existing
+    })
+
+
+def _pages_still_present(validators):
+    """
+    Conserva los validadores de las páginas cuyas filas siguen en la tabla
+    Cuenta las filas sincronizadas en el rango de ids de cada página (una consulta por
+    PRESENCE_CHUNK páginas); si faltan, la página se vuelve a pedir sin cabeceras
+    condicionales. Las páginas vacías no tienen nada que comprobar y las guardadas
+    sin rango de ids se descartan.
+    """
+    usable = {key: value for key, value in validators.items() if not value.get('count')}
+    ranged = [
+        (key, value) for key, value in validators.items()
+        if value.get('count') and value.get('id_range')
+    ]
+    for start in range(0, len(ranged), PRESENCE_CHUNK):
+        chunk = ranged[start:start + PRESENCE_CHUNK]
+        counts = Todo.objects.aggregate(**{
+            f'page_{i}': Count('id', filter=Q(id__range=value['id_range'][:2], synced_from_api=True))
+            for i, (_, value) in enumerate(chunk)
+        })
+        for i, (key, value) in enumerate(chunk):
+            if counts[f'page_{i}'] == value['id_range'][2]:
+                usable[key] = value
+    return usable
+
+
+def _remember_validators(validators, page, job):
+    """Actualiza los validadores de una página ya aplicada"""
+    page_validators = page.validators
+    if page_validators is None:
+        validators.pop(page.key, None)
+        return
+    page_validators['overwrite'] = job.overwrite_existing or (
+        page.not_modified and validators.get(page.key, {}).get('overwrite', False)
+    )
+    validators[page.key] = page_validators
+
+
+def run_sync_job(job_id):
+    """
+    Ejecuta un trabajo en cola
+    El trabajo se reclama con un UPDATE condicional, así que solo un worker lo ejecuta.
+    Cada página se escribe en su propia transacción y el progreso se guarda tras
+    cada una; como la escritura es un upsert por ID, repetir un trabajo fallido es seguro.
+    Los ETag/Last-Modified de las páginas aplicadas se guardan en SyncSource para
+    que la siguiente sincronización de la misma URL use peticiones condicionales.
+    Retorna el trabajo actualizado, o None si otro worker ya lo había reclamado.
+    """
+    claimed = SyncJob.objects.filter(pk=job_id, status=SyncJob.STATUS_PENDING).update(
+        status=SyncJob.STATUS_RUNNING,
+        started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    job = SyncJob.objects.get(pk=job_id)
+    source, _ = SyncSource.objects.get_or_create(api_url=job.api_url)
+    fetcher = TodoPageFetcher(
+        job.api_url, job.limit,
+        validators=_usable_validators(source, job)
+    )
+    writer = TodoSyncWriter(
+        overwrite=job.overwrite_existing,
+        batch_size=job.batch_size,
+        full_sync=job.full_sync
+    )
+    validators = dict(source.validators)
+    error = ''
+
+    try:
+        for page in fetcher.pages():
+            if page.not_modified:
+                writer.skip_unchanged(page.count)
+            else:
+                with transaction.atomic():
+                    writer.write(page.records)
+            _remember_validators(validators, page, job)
+            _save_progress(job, fetcher, writer)
+    except requests.Timeout:
+        error = 'Timeout al conectar con la API externa'
+    except (json.JSONDecodeError, ValueError):
+        error = 'Error al procesar la respuesta JSON de la API externa'
+    except requests.RequestException as e:
+        error = f'Error al conectar con la API externa: {str(e)}'
+    except Exception as e:
+        logger.exception('Error inesperado en el trabajo de sincronización %s', job_id)
+        error = f'Error inesperado: {str(e)}'
+
+    SyncSource.objects.filter(pk=source.pk).update(
+        validators=validators,
+        last_synced_at=timezone.now()
+    )
+    _save_progress(
+        job, fetcher, writer,
+        status=SyncJob.STATUS_FAILED if error else SyncJob.STATUS_COMPLETED,
+        error=error,
+        finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
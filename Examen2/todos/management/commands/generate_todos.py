@@ -0,0 +1,205 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from todos.counters import rebuild_counters
+from todos.models import Todo, hash_title
+from todos.search import SQLITE_TRIGGERS, install_search_index
+from todos.versioning import bump_version
+
+VERBS = [
+    'Revisar', 'Preparar', 'Documentar', 'Implementar', 'Probar', 'Configurar',
+    'Presentar', 'Actualizar', 'Corregir', 'Estudiar', 'Comprar', 'Llamar',
+]
+NOUNS = [
+    'proyecto', 'informe', 'API', 'servidor', 'examen', 'manual', 'presupuesto',
+    'reunión', 'despliegue', 'factura', 'pedido', 'cliente', 'inventario', 'leche',
+]
+
+# Fechas de creación distintas repartidas en el periodo (--days)
+TIMESTAMPS = 10000
+
+# Columnas escritas por el generador (id lo asigna la base de datos)
+COLUMNS = [
+    'userId', 'title', 'title_hash', 'completed', 'synced_from_api', 'content_hash',
+    'created_at', 'updated_at', 'last_synced_at',
+]
+
+
+class Command(BaseCommand):
+    """
+    Generador de datos sintéticos de todos
+    Inserta N todos con INSERT de varias filas (executemany) en transacciones grandes,
+    sin instanciar modelos ni enviar señales; en SQLite los índices secundarios se crean
+    al final. Después recalcula TodoCounters, reconstruye el índice de texto completo
+    e incrementa la versión de la tabla.
+    Uso: python manage.py generate_todos 10000000 --users 1000 --distribution zipf
+    """
+    help = 'Genera todos sintéticos en bloque para pruebas de rendimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Número de todos a generar')
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Número de usuarios (userId de 1 a N)'
+        )
+        parser.add_argument(
+            '--distribution', choices=['uniform', 'zipf'], default='uniform',
+            help='Reparto de todos entre usuarios (zipf: pocos usuarios con muchos todos)'
+        )
+        parser.add_argument(
+            '--zipf-exponent', type=float, default=1.1,
+            help='Exponente de la distribución zipf'
+        )
+        parser.add_argument(
+            '--completed-ratio', type=float, default=0.5,
+            help='Fracción de todos completados (0 a 1)'
+        )
+        parser.add_argument(
+            '--synced-ratio', type=float, default=0.0,
+            help='Fracción de todos marcados como sincronizados desde la API externa (0 a 1)'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Las fechas de creación se reparten en los últimos N días'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Filas por sentencia executemany'
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=500000,
+            help='Filas por transacción'
+        )
+        parser.add_argument('--seed', type=int, default=None, help='Semilla aleatoria')
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='SQLite: mantener los índices secundarios durante la carga en lugar de recrearlos al final'
+        )
+
+    def handle(self, *args, **options):
+        total = options['count']
+        users = options['users']
+        if total < 1 or users < 1:
+            raise CommandError('count y --users deben ser mayores que 0.')
+        for name in ('completed_ratio', 'synced_ratio'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f'--{name.replace("_", "-")} debe estar entre 0 y 1.')
+
+        rng = random.Random(options['seed'])
+        user_ids = range(1, users + 1)
+        cum_weights = None
+        if options['distribution'] == 'zipf':
+            exponent = options['zipf_exponent']
+            cum_weights = list(accumulate(1 / rank ** exponent for rank in user_ids))
+
+        # Los títulos llevan un número de secuencia: únicos por usuario también entre ejecuciones
+        start = (Todo.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        batch_size = max(1, options['batch_size'])
+        transaction_size = max(batch_size, options['transaction_size'])
+
+        meta = Todo._meta
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(meta.get_field(name).column) for name in COLUMNS)
+        sql = (
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(COLUMNS))})'
+        )
+
+        # Fechas de creación ya adaptadas al motor: convertir una por fila cuesta más que insertarla
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        span = max(options['days'], 0) * 86400
+        timestamps = [
+            adapt(now - timedelta(seconds=span * step / TIMESTAMPS))
+            for step in range(TIMESTAMPS, 0, -1)
+        ]
+        synced_at = adapt(now)
+
+        self.stdout.write(
+            f'Generando {total:,} todo(s) para {users:,} usuario(s) '
+            f'({options["distribution"]}, {options["completed_ratio"]:.0%} completados)'
+        )
+        began = time.perf_counter()
+        done = 0
+        deferred = self._defer_sqlite_indexes(options['keep_indexes'])
+        try:
+            while done < total:
+                chunk_end = min(done + transaction_size, total)
+                with transaction.atomic(), connection.cursor() as cursor:
+                    while done < chunk_end:
+                        size = min(batch_size, chunk_end - done)
+                        owners = rng.choices(user_ids, cum_weights=cum_weights, k=size)
+                        rows = []
+                        for number, user_id, verb, noun, created, completed, synced in zip(
+                            range(start + done, start + done + size), owners,
+                            rng.choices(VERBS, k=size), rng.choices(NOUNS, k=size),
+                            rng.choices(timestamps, k=size),
+                            self._flags(rng, options['completed_ratio'], size),
+                            self._flags(rng, options['synced_ratio'], size),
+                        ):
+                            title = f'{verb} {noun} {number}'
+                            rows.append((
+                                user_id, title, hash_title(title), completed, synced, '',
+                                created, created, synced_at if synced else None,
+                            ))
+                        cursor.executemany(sql, rows)
+                        done += size
+                elapsed = time.perf_counter() - began
+                self.stdout.write(
+                    f'  {done:,}/{total:,} ({done / total:.0%}) '
+                    f'{done / elapsed:,.0f} filas/s'
+                )
+        finally:
+            if deferred is not None:
+                self.stdout.write('Creando índices y reconstruyendo el índice de texto completo...')
+                with connection.cursor() as cursor:
+                    for sql in deferred:
+                        cursor.execute(sql)
+                install_search_index(connection)
+
+        rebuild_counters()
+        bump_version()
+        elapsed = time.perf_counter() - began
+        self.stdout.write(self.style.SUCCESS(
+            f'{done:,} todo(s) generados en {elapsed:.1f} s ({done / elapsed:,.0f} filas/s)'
+        ))
+
+    @staticmethod
+    def _flags(rng, ratio, size):
+        """size valores booleanos, True con probabilidad ratio"""
+        if ratio <= 0 or ratio >= 1:
+            return [ratio >= 1] * size
+        return [value < ratio for value in (rng.random() for _ in range(size))]
+
+    def _defer_sqlite_indexes(self, keep_indexes):
+        """
+        En SQLite quita los triggers FTS5 y, salvo keep_indexes, los índices secundarios
+        de la tabla durante la carga: mantenerlos fila a fila (inserciones aleatorias en
+        el árbol B) cuesta más que crearlos y reconstruir el índice de texto al final.
+        Retorna las sentencias CREATE INDEX a ejecutar después, o None fuera de SQLite
+        """
+        if connection.vendor != 'sqlite':
+            return None
+        table = Todo._meta.db_table
+        with connection.cursor() as cursor:
+            for trigger in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            if keep_indexes:
+                return []
+            # sql es NULL en los índices automáticos (clave primaria)
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table]
+            )
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        return [sql for _, sql in indexes]
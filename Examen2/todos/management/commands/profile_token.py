@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from todos.profiling import make_token, profiling_setting
+
+
+class Command(BaseCommand):
+    """
+    Genera un token firmado para perfilar peticiones (todos.profiling)
+    Uso: curl -H "X-Todos-Profile: $(python manage.py profile_token)" http://.../api/stats/
+    """
+    help = 'Imprime un valor firmado para la cabecera de perfilado de peticiones'
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(
+            f'Cabecera {profiling_setting("HEADER")}, válida '
+            f'{profiling_setting("TOKEN_MAX_AGE")} s'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from todos.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    """
+    Recalcula la tabla TodoCounters desde la tabla de todos
+    Uso: python manage.py rebuild_counters
+    """
+    help = 'Recalcula los contadores materializados de todos (global y por usuario)'
+
+    def handle(self, *args, **options):
+        users = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores recalculados: global y {users} usuario(s)'
+        ))
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from todos.jobs import run_sync_job_in_thread, expire_stale_jobs
+from todos.models import SyncJob
+from todos.sync import sync_setting
+
+
+class Command(BaseCommand):
+    """
+    Worker de trabajos de sincronización
+    Toma los trabajos en cola de la tabla SyncJob y los ejecuta en un pool de hilos
+    Uso: python manage.py run_sync_jobs [--workers N] [--once]
+    """
+    help = 'Ejecuta los trabajos de sincronización en cola con la API externa'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=sync_setting('JOB_WORKERS'),
+            help='Número de trabajos ejecutados en paralelo'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Segundos de espera entre consultas a la cola'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Procesa los trabajos en cola y termina'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Worker de sincronización iniciado con {workers} hilo(s)')
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='todos-sync') as executor:
+            while True:
+                expire_stale_jobs()
+                job_ids = list(
+                    SyncJob.objects.filter(status=SyncJob.STATUS_PENDING)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:workers]
+                )
+                if job_ids:
+                    # Cada trabajo se reclama con un UPDATE condicional dentro de run_sync_job
+                    for _ in executor.map(run_sync_job_in_thread, job_ids):
+                        pass
+                    for job in SyncJob.objects.filter(id__in=job_ids):
+                        self.stdout.write(
+                            f'Sync #{job.id} {job.status}: {job.created} creado(s), '
+                            f'{job.updated} actualizado(s), {job.errors_count} error(es)'
+                        )
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Worker de sincronización detenido'))
@@ -0,0 +1,356 @@
+"""
+Métricas por endpoint en formato de texto de Prometheus
+MetricsMiddleware registra en cada petición, por nombre de URL resuelto
+(p. ej. todos:todo-list), método y código de estado: número de peticiones,
+histograma de latencia, tiempo y número de consultas SQL y bytes de respuesta.
+El registro es un diccionario en memoria protegido por un lock (microsegundos por petición).
+
+Con varios procesos WSGI (gunicorn, uWSGI) cada proceso vuelca su registro a un
+archivo JSON en TODOS_METRICS['MULTIPROCESS_DIR'] como máximo cada FLUSH_SECONDS,
+y /metrics suma los archivos de todos los procesos. Sin directorio, /metrics
+muestra solo el proceso que atiende la petición. Los archivos de procesos que ya
+no existen (workers reiniciados) se suman a un archivo acumulado y se eliminan,
+así los contadores no retroceden y el directorio no crece.
+
+/metrics solo responde a las direcciones de ALLOWED_IPS y al staff (403 al resto).
+"""
+import ipaddress
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: los archivos de procesos terminados se conservan
+    fcntl = None
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_METRICS
+DEFAULTS = {
+    'ENABLED': True,
+    # Límites superiores (segundos) de los buckets del histograma de latencia
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'MULTIPROCESS_DIR': None,
+    'FLUSH_SECONDS': 5,
+    # Direcciones o redes (CIDR) que pueden leer /metrics además del staff; None = cualquiera
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+FILE_PREFIX = 'todos-metrics-'
+# Métricas sumadas de los procesos terminados
+ARCHIVE_FILE = f'{FILE_PREFIX}archive.json'
+LOCK_FILE = '.todos-metrics.lock'
+
+# Vista de las peticiones que no resuelven a ninguna URL (404)
+UNRESOLVED = '<unresolved>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_setting(name):
+    """Lee un valor de settings.TODOS_METRICS con su valor por defecto"""
+    return getattr(settings, 'TODOS_METRICS', {}).get(name, DEFAULTS[name])
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas de un proceso
+    Las claves son tuplas de etiquetas; los buckets del histograma se guardan sin
+    acumular y se acumulan al exportar.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.requests = defaultdict(int)  # (view, method, status) -> peticiones
+        self.latency = {}  # (view, method) -> [n por bucket..., +Inf, suma, total]
+        self.db = defaultdict(lambda: [0.0, 0])  # view -> [segundos, consultas]
+        self.bytes = defaultdict(int)  # view -> bytes de respuesta
+        self.next_flush = 0.0
+
+    def record(self, view, method, status, duration, db_time, db_queries, size):
+        """Registra una petición terminada"""
+        bucket = bisect_left(self.buckets, duration)
+        with self.lock:
+            if self.pid != os.getpid():
+                # Proceso hijo tras un fork: no hereda las métricas del padre
+                self.reset()
+            self.requests[view, method, status] += 1
+            histogram = self.latency.get((view, method))
+            if histogram is None:
+                histogram = self.latency[view, method] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[bucket] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+            db = self.db[view]
+            db[0] += db_time
+            db[1] += db_queries
+            self.bytes[view] += size
+
+    def state(self):
+        """Copia serializable a JSON del registro"""
+        with self.lock:
+            return {
+                'buckets': list(self.buckets),
+                'requests': [[*key, value] for key, value in self.requests.items()],
+                'latency': [[*key, list(value)] for key, value in self.latency.items()],
+                'db': [[view, *value] for view, value in self.db.items()],
+                'bytes': [[view, value] for view, value in self.bytes.items()],
+            }
+
+    def flush(self, directory, force=False):
+        """Vuelca el registro al archivo del proceso en directory (como máximo cada FLUSH_SECONDS)"""
+        now = time.monotonic()
+        if not force and now < self.next_flush:
+            return
+        self.next_flush = now + metrics_setting('FLUSH_SECONDS')
+        _write_state(os.path.join(directory, f'{FILE_PREFIX}{os.getpid()}.json'), self.state())
+
+
+def _write_state(path, state):
+    """Escritura atómica: quien lea en /metrics nunca ve un archivo a medias"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.todos-metrics-')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(state, tmp)
+    os.replace(tmp_path, path)
+
+
+def merge_states(states):
+    """Suma los registros de varios procesos (con los mismos buckets)"""
+    requests = defaultdict(int)
+    latency = {}
+    db = defaultdict(lambda: [0.0, 0])
+    size = defaultdict(int)
+    buckets = DEFAULTS['BUCKETS']
+    for state in states:
+        buckets = state['buckets']
+        for view, method, status, value in state['requests']:
+            requests[view, method, status] += value
+        for view, method, values in state['latency']:
+            current = latency.setdefault((view, method), [0] * len(values))
+            for i, value in enumerate(values):
+                current[i] += value
+        for view, seconds, queries in state['db']:
+            db[view][0] += seconds
+            db[view][1] += queries
+        for view, value in state['bytes']:
+            size[view] += value
+    return buckets, requests, latency, db, size
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """Etiquetas en formato Prometheus: {nombre="valor",...}"""
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def exposition(states):
+    """Texto de /metrics a partir de los registros de uno o más procesos"""
+    buckets, requests, latency, db, size = merge_states(states)
+    lines = [
+        '# HELP todos_http_requests_total Peticiones HTTP por vista, método y código de estado',
+        '# TYPE todos_http_requests_total counter',
+    ]
+    for (view, method, status), value in sorted(requests.items()):
+        lines.append(f'todos_http_requests_total{_labels(view=view, method=method, status=status)} {value}')
+
+    lines += [
+        '# HELP todos_http_request_duration_seconds Latencia de las peticiones HTTP',
+        '# TYPE todos_http_request_duration_seconds histogram',
+    ]
+    for (view, method), values in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip([*buckets, '+Inf'], values):
+            cumulative += count
+            labels = _labels(view=view, method=method, le=bound)
+            lines.append(f'todos_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(view=view, method=method)
+        lines.append(f'todos_http_request_duration_seconds_sum{labels} {values[-2]:.6f}')
+        lines.append(f'todos_http_request_duration_seconds_count{labels} {values[-1]}')
+
+    lines += [
+        '# HELP todos_http_db_seconds_total Tiempo en consultas SQL por vista',
+        '# TYPE todos_http_db_seconds_total counter',
+    ]
+    lines += [f'todos_http_db_seconds_total{_labels(view=view)} {seconds:.6f}' for view, (seconds, _) in sorted(db.items())]
+    lines += [
+        '# HELP todos_http_db_queries_total Consultas SQL por vista',
+        '# TYPE todos_http_db_queries_total counter',
+    ]
+    lines += [f'todos_http_db_queries_total{_labels(view=view)} {queries}' for view, (_, queries) in sorted(db.items())]
+    lines += [
+        '# HELP todos_http_response_bytes_total Bytes de respuesta por vista (sin las respuestas en streaming)',
+        '# TYPE todos_http_response_bytes_total counter',
+    ]
+    lines += [f'todos_http_response_bytes_total{_labels(view=view)} {value}' for view, value in sorted(size.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def combine_states(states):
+    """Un solo registro serializado con la suma de states"""
+    buckets, requests, latency, db, size = merge_states(states)
+    return {
+        'buckets': list(buckets),
+        'requests': [[*key, value] for key, value in requests.items()],
+        'latency': [[*key, value] for key, value in latency.items()],
+        'db': [[view, *value] for view, value in db.items()],
+        'bytes': [[view, value] for view, value in size.items()],
+    }
+
+
+def _file_pid(name):
+    """PID del proceso dueño de un archivo de métricas, o None (archivo acumulado)"""
+    pid = name[len(FILE_PREFIX):-len('.json')]
+    return int(pid) if pid.isdigit() else None
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, pero es de otro usuario
+    return True
+
+
+def _read_state(path):
+    """Registro de un archivo, o None si se está escribiendo o ya no existe"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def reap_dead_processes(directory):
+    """
+    Suma al archivo acumulado los archivos de procesos terminados y los elimina
+    El directorio es local a la máquina (los PID no valen entre máquinas). Un lock de
+    archivo evita que dos procesos sumen el mismo archivo a la vez.
+    """
+    if fcntl is None:
+        return
+    dead = []
+    for name in os.listdir(directory):
+        if not (name.startswith(FILE_PREFIX) and name.endswith('.json')):
+            continue
+        pid = _file_pid(name)
+        if pid is not None and pid != os.getpid() and not _process_alive(pid):
+            dead.append(name)
+    if not dead:
+        return
+
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        states = []
+        if os.path.exists(archive_path):
+            archive = _read_state(archive_path)
+            if archive is None:
+                return  # Ilegible: mejor conservar los archivos que perder lo acumulado
+            states.append(archive)
+        reaped = []
+        for name in dead:
+            state = _read_state(os.path.join(directory, name))
+            if state is not None:  # Si no, otro proceso ya lo sumó
+                states.append(state)
+                reaped.append(name)
+        if not reaped:
+            return
+        _write_state(archive_path, combine_states(states))
+        for name in reaped:
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """Registros de todos los procesos (o del actual si no hay MULTIPROCESS_DIR)"""
+    directory = metrics_setting('MULTIPROCESS_DIR')
+    if not directory:
+        return [registry.state()]
+    registry.flush(directory, force=True)
+    reap_dead_processes(directory)
+    states = []
+    for name in os.listdir(directory):
+        if not (name.startswith(FILE_PREFIX) and name.endswith('.json')):
+            continue
+        state = _read_state(os.path.join(directory, name))
+        if state is not None:  # Proceso escribiendo o archivo eliminado entre tanto
+            states.append(state)
+    return states
+
+
+def metrics_allowed(request):
+    """El cliente está en ALLOWED_IPS o es staff"""
+    allowed = metrics_setting('ALLOWED_IPS')
+    if allowed is None:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        address = None
+    if address is not None and any(
+        address in ipaddress.ip_network(network, strict=False) for network in allowed
+    ):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_active and user.is_staff)
+
+
+registry = MetricsRegistry(metrics_setting('BUCKETS'))
+
+
+class MetricsMiddleware:
+    """
+    Registra cada petición en el registro del proceso (ver el docstring del módulo)
+    Va al principio de MIDDLEWARE para que la latencia incluya el resto de middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_setting('ENABLED'):
+            return self.get_response(request)
+
+        db = [0.0, 0]
+
+        def count_query(execute, sql, params, many, context):
+            began = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db[0] += time.perf_counter() - began
+                db[1] += 1
+
+        began = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        duration = time.perf_counter() - began
+
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else UNRESOLVED, request.method, response.status_code,
+            duration, db[0], db[1],
+            0 if response.streaming else len(response.content),
+        )
+        directory = metrics_setting('MULTIPROCESS_DIR')
+        if directory:
+            registry.flush(directory)
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('api_url', models.URLField(help_text='URL de la API externa a sincronizar')),
+                ('limit', models.PositiveIntegerField(help_text='Número máximo de todos a sincronizar')),
+                ('overwrite_existing', models.BooleanField(default=False, help_text='Si es True, sobrescribe los registros existentes')),
+                ('batch_size', models.PositiveIntegerField(blank=True, help_text='Tamaño de lote para las escrituras (vacío = valor de settings)', null=True)),
+                ('status', models.CharField(choices=[('pending', 'En cola'), ('running', 'En ejecución'), ('completed', 'Completado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=10)),
+                ('fetched', models.PositiveIntegerField(default=0, help_text='Registros descargados')),
+                ('created', models.PositiveIntegerField(default=0, help_text='Registros creados')),
+                ('updated', models.PositiveIntegerField(default=0, help_text='Registros actualizados')),
+                ('errors_count', models.PositiveIntegerField(default=0, help_text='Registros con errores')),
+                ('errors', models.JSONField(blank=True, default=list, help_text='Primeros errores por registro')),
+                ('error', models.TextField(blank=True, help_text='Error que detuvo el trabajo')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora de encolado')),
+                ('started_at', models.DateTimeField(blank=True, help_text='Inicio de la ejecución', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Fin de la ejecución', null=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de sincronización',
+                'verbose_name_plural': 'Trabajos de sincronización',
+                'ordering': ['-id'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('api_url',), name='todos_syncjob_one_active_per_url')],
+            },
+        ),
+    ]
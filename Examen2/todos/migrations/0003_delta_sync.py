@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0002_syncjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('api_url', models.URLField(help_text='URL de la API externa', unique=True)),
+                ('validators', models.JSONField(blank=True, default=dict, help_text="Validadores por página: {'inicio:límite': {'etag', 'last_modified', 'count', 'overwrite'}}")),
+                ('last_synced_at', models.DateTimeField(blank=True, help_text='Fecha y hora de la última sincronización', null=True)),
+            ],
+            options={
+                'verbose_name': 'Origen de sincronización',
+                'verbose_name_plural': 'Orígenes de sincronización',
+            },
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='full_sync',
+            field=models.BooleanField(default=False, help_text='Si es True, ignora ETag/Last-Modified y hashes y reescribe todo'),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='skipped',
+            field=models.PositiveIntegerField(default=0, help_text='Registros omitidos por no tener cambios'),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='Hash del contenido recibido en la última sincronización (vacío si se modificó localmente)', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora de la última escritura desde la API externa', null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_counters(apps, schema_editor):
+    """Calcula los contadores iniciales a partir de los todos existentes"""
+    Todo = apps.get_model('todos', 'Todo')
+    TodoCounters = apps.get_model('todos', 'TodoCounters')
+    rows = Todo.objects.order_by().values('userId').annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(completed=True)),
+        synced=Count('id', filter=Q(synced_from_api=True)),
+    )
+    counters = [TodoCounters(userId=0)]
+    for row in rows:
+        counters.append(TodoCounters(**row))
+        counters[0].total += row['total']
+        counters[0].completed += row['completed']
+        counters[0].synced += row['synced']
+    TodoCounters.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0003_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('userId', models.IntegerField(help_text='ID del usuario (0 = contadores globales)', unique=True)),
+                ('total', models.BigIntegerField(default=0, help_text='Total de todos')),
+                ('completed', models.BigIntegerField(default=0, help_text='Todos completados')),
+                ('synced', models.BigIntegerField(default=0, help_text='Todos sincronizados desde API externa')),
+            ],
+            options={
+                'verbose_name': 'Contadores de pendientes',
+                'verbose_name_plural': 'Contadores de pendientes',
+                'ordering': ['userId'],
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_todos_version(apps, schema_editor):
+    """Crea la versión inicial de la tabla de todos"""
+    DataVersion = apps.get_model('todos', 'DataVersion')
+    DataVersion.objects.get_or_create(name='todos', defaults={'changed_at': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0004_todocounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Nombre del conjunto de datos', max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0, help_text='Número de versión')),
+                ('changed_at', models.DateTimeField(help_text='Fecha y hora del último cambio')),
+            ],
+            options={
+                'verbose_name': 'Versión de datos',
+                'verbose_name_plural': 'Versiones de datos',
+            },
+        ),
+        migrations.RunPython(create_todos_version, migrations.RunPython.noop),
+    ]
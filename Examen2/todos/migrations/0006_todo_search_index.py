@@ -0,0 +1,59 @@
+from django.db import migrations
+
+FTS_TABLE = 'todos_todo_fts'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content='todos_todo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF id, title ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS todos_todo_title_tsv ON todos_todo "
+    "USING GIN ((to_tsvector('simple', title)))",
+]
+POSTGRES_REVERSE = ['DROP INDEX IF EXISTS todos_todo_title_tsv']
+
+
+def run_statements(schema_editor, statements):
+    """Ejecuta las sentencias del motor actual (los demás motores no tienen índice)"""
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    """Crea el índice de texto completo de títulos e indexa los todos existentes"""
+    run_statements(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    run_statements(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
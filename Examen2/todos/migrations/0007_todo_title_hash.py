@@ -0,0 +1,89 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:06
+
+import hashlib
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Filas por bloque del relleno en motores distintos de SQLite
+BACKFILL_CHUNK = 2000
+
+
+def hash_title(title):
+    """Copia de todos.models.hash_title en el momento de la migración"""
+    normalized = ' '.join(unicodedata.normalize('NFC', title).split()).casefold()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def backfill_title_hash(apps, schema_editor):
+    """
+    Calcula title_hash de los todos existentes por bloques
+    Si un usuario ya tenía títulos duplicados, solo el de menor ID recibe el hash;
+    los demás quedan en NULL y no participan en la restricción única
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # Dos sentencias con hash_title registrada como función SQL
+        connection.ensure_connection()
+        connection.connection.create_function('todos_hash_title', 1, hash_title, deterministic=True)
+        schema_editor.execute('UPDATE todos_todo SET title_hash = todos_hash_title(title)')
+        schema_editor.execute(
+            'UPDATE todos_todo SET title_hash = NULL WHERE id NOT IN '
+            '(SELECT MIN(id) FROM todos_todo GROUP BY userId, title_hash)'
+        )
+        return
+
+    Todo = apps.get_model('todos', 'Todo')
+    # 1) Hash de cada todo, por bloques de ID
+    last_id = 0
+    while True:
+        rows = list(
+            Todo.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'title')[:BACKFILL_CHUNK]
+        )
+        if not rows:
+            break
+        Todo.objects.bulk_update(
+            [Todo(id=todo_id, title_hash=hash_title(title)) for todo_id, title in rows],
+            ['title_hash'], batch_size=500
+        )
+        last_id = rows[-1][0]
+
+    # 2) Duplicados: recorrido ordenado por (userId, title_hash, id) que solo recuerda
+    # el par anterior; memoria acotada a BACKFILL_CHUNK IDs sin importar el tamaño de la tabla
+    rows = (
+        Todo.objects.order_by('userId', 'title_hash', 'id')
+        .values_list('id', 'userId', 'title_hash').iterator(chunk_size=BACKFILL_CHUNK)
+    )
+    previous = None
+    duplicates = []
+    for todo_id, user_id, title_hash in rows:
+        if (user_id, title_hash) == previous:
+            duplicates.append(todo_id)
+            if len(duplicates) >= BACKFILL_CHUNK:
+                Todo.objects.filter(id__in=duplicates).update(title_hash=None)
+                duplicates = []
+        previous = (user_id, title_hash)
+    if duplicates:
+        Todo.objects.filter(id__in=duplicates).update(title_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0006_todo_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='title_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash del título normalizado; NULL en duplicados previos a la restricción única', max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_title_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='todo',
+            constraint=models.UniqueConstraint(condition=models.Q(('title_hash__isnull', False)), fields=('userId', 'title_hash'), name='todos_todo_unique_user_title', violation_error_message='Ya existe un todo con este título para este usuario.'),
+        ),
+    ]
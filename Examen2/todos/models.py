@@ -1,6 +1,56 @@
+import hashlib
+import unicodedata
+
 from django.db import models
 from django.core.validators import MinValueValidator
 
+DUPLICATE_TITLE_MESSAGE = "Ya existe un todo con este título para este usuario."
+
+
+def normalize_title(title):
+    """Título para detectar duplicados: Unicode NFC, espacios colapsados y sin distinguir mayúsculas"""
+    return ' '.join(unicodedata.normalize('NFC', title).split()).casefold()
+
+
+def hash_title(title):
+    """Hash del título normalizado (índice único junto con userId)"""
+    return hashlib.blake2b(normalize_title(title).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TodoQuerySet(models.QuerySet):
+    """
+    QuerySet de Todo
+    update() mantiene TodoCounters cuando cambia userId, completed o synced_from_api
+    (variaciones agregadas antes de escribir, o reconstrucción si el valor es una expresión),
+    e invalida la versión de la tabla (ETag y caché de respuestas) y el snapshot en memoria
+    """
+
+    def update(self, **kwargs):
+        from django.db import transaction
+        from .counters import (
+            COUNTER_FIELDS, batched_counters, counters_unknown, queryset_update_delta,
+            version_changed,
+        )
+        from .snapshot import record_unknown
+        if COUNTER_FIELDS.isdisjoint(kwargs):
+            rows = super().update(**kwargs)
+            if rows:
+                version_changed()
+                record_unknown()
+            return rows
+
+        with transaction.atomic(using=self.db):
+            with batched_counters() as delta:
+                exact = queryset_update_delta(self, kwargs, delta)
+                rows = super().update(**kwargs)
+                if rows:
+                    version_changed()
+                    record_unknown()
+                if rows and not exact:
+                    counters_unknown()
+        return rows
+
+
 class Todo(models.Model):
     """
     Modelo para representar un pendiente (ToDo) según los requerimientos de Parra's Dev
@@ -39,6 +89,26 @@ class Todo(models.Model):
         default=False,
         help_text="Indica si el registro fue sincronizado desde API externa"
     )
+    content_hash = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        help_text="Hash del contenido recibido en la última sincronización (vacío si se modificó localmente)"
+    )
+    last_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fecha y hora de la última escritura desde la API externa"
+    )
+    title_hash = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Hash del título normalizado; NULL en duplicados previos a la restricción única"
+    )
+    
+    objects = TodoQuerySet.as_manager()
     
     class Meta:
         ordering = ['id']
@@ -48,11 +118,78 @@ class Todo(models.Model):
             models.Index(fields=['userId', 'completed']),  # Índice compuesto para consultas comunes
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            # Un título (normalizado) por usuario; también sirve de índice para buscar duplicados.
+            # La condición lo crea como índice parcial (en SQLite sin reconstruir la tabla)
+            models.UniqueConstraint(
+                fields=['userId', 'title_hash'],
+                condition=models.Q(title_hash__isnull=False),
+                name='todos_todo_unique_user_title',
+                violation_error_message=DUPLICATE_TITLE_MESSAGE,
+            ),
+        ]
     
     def __str__(self):
         status = "Resuelto" if self.completed else "Sin resolver"
         return f"#{self.id} - {self.title[:50]}... ({status})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Recuerda el estado cargado para calcular la variación de TodoCounters al guardar"""
+        instance = super().from_db(db, field_names, values)
+        instance._counter_state = instance.counter_state()
+        instance._loaded_title = instance.__dict__.get('title')
+        return instance
+    
+    def counter_state(self):
+        """
+        Estado relevante para TodoCounters: (userId, completed, synced_from_api)
+        None si algún campo está diferido (only/defer) y no se puede conocer sin consultar
+        """
+        values = self.__dict__
+        if 'userId' not in values or 'completed' not in values or 'synced_from_api' not in values:
+            return None
+        return (values['userId'], values['completed'], values['synced_from_api'])
+    
+    def refresh_title_hash(self):
+        """
+        Recalcula title_hash si el todo es nuevo o su título cambió
+        Un duplicado previo a la restricción (title_hash NULL) lo conserva mientras no cambie el título.
+        Retorna True si se recalculó
+        """
+        if 'title' not in self.__dict__:
+            return False
+        if not self._state.adding and self.title == getattr(self, '_loaded_title', None):
+            return False
+        self.title_hash = hash_title(self.title)
+        return True
+    
+    def validate_constraints(self, exclude=None):
+        """Valida el título único por usuario también en formularios (title_hash no es editable)"""
+        exclude = set(exclude or ())
+        if 'title' not in exclude and 'userId' not in exclude:
+            self.refresh_title_hash()
+            exclude.discard('title_hash')
+        super().validate_constraints(exclude=exclude)
+    
+    def save(self, *args, **kwargs):
+        """
+        Guarda el todo; cualquier cambio local invalida el hash de sincronización
+        para que la siguiente sincronización con sobrescritura no lo omita
+        Un título duplicado para el mismo usuario lanza IntegrityError (restricción única)
+        """
+        update_fields = kwargs.get('update_fields')
+        extra_fields = set()
+        if self.content_hash:
+            self.content_hash = ''
+            extra_fields.add('content_hash')
+        if (update_fields is None or 'title' in update_fields) and self.refresh_title_hash():
+            extra_fields.add('title_hash')
+        if update_fields is not None and extra_fields:
+            kwargs['update_fields'] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+        self._loaded_title = self.__dict__.get('title')
+    
     @property
     def status_display(self):
         """Propiedad para mostrar el estado en español"""
@@ -64,14 +201,21 @@ class Todo(models.Model):
         return f"Usuario #{self.userId}"
     
     def mark_completed(self):
-        """Método para marcar el todo como completado"""
-        self.completed = True
-        self.save(update_fields=['completed', 'updated_at'])
+        """Método para marcar el todo como completado (UPDATE atómico, ver todos.transitions)"""
+        self._set_status(True)
     
     def mark_pending(self):
-        """Método para marcar el todo como pendiente"""
-        self.completed = False
-        self.save(update_fields=['completed', 'updated_at'])
+        """Método para marcar el todo como pendiente (UPDATE atómico, ver todos.transitions)"""
+        self._set_status(False)
+    
+    def _set_status(self, completed):
+        """Fija el estado con un solo UPDATE y copia a la instancia los valores resultantes"""
+        from .transitions import change_status
+        for todo in change_status([self.pk], completed):
+            self.updated_at = todo.updated_at
+            self.content_hash = todo.content_hash
+            self._counter_state = todo._counter_state
+        self.completed = completed
     
     @classmethod
     def get_completed_todos(cls):
@@ -87,3 +231,163 @@ class Todo(models.Model):
     def get_user_todos(cls, user_id):
         """Método de clase para obtener todos los todos de un usuario específico"""
         return cls.objects.filter(userId=user_id)
+
+
+class SyncJob(models.Model):
+    """
+    Trabajo de sincronización con la API externa ejecutado en segundo plano
+    Guarda los parámetros de la sincronización, su estado y los contadores de progreso
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En cola'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_COMPLETED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    # Parámetros de la sincronización
+    api_url = models.URLField(help_text="URL de la API externa a sincronizar")
+    limit = models.PositiveIntegerField(help_text="Número máximo de todos a sincronizar")
+    overwrite_existing = models.BooleanField(
+        default=False,
+        help_text="Si es True, sobrescribe los registros existentes"
+    )
+    batch_size = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Tamaño de lote para las escrituras (vacío = valor de settings)"
+    )
+    full_sync = models.BooleanField(
+        default=False,
+        help_text="Si es True, ignora ETag/Last-Modified y hashes y reescribe todo"
+    )
+
+    # Estado y progreso
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True
+    )
+    fetched = models.PositiveIntegerField(default=0, help_text="Registros descargados")
+    created = models.PositiveIntegerField(default=0, help_text="Registros creados")
+    updated = models.PositiveIntegerField(default=0, help_text="Registros actualizados")
+    skipped = models.PositiveIntegerField(default=0, help_text="Registros omitidos por no tener cambios")
+    errors_count = models.PositiveIntegerField(default=0, help_text="Registros con errores")
+    errors = models.JSONField(default=list, blank=True, help_text="Primeros errores por registro")
+    error = models.TextField(blank=True, help_text="Error que detuvo el trabajo")
+
+    # Tiempos
+    queued_at = models.DateTimeField(auto_now_add=True, help_text="Fecha y hora de encolado")
+    started_at = models.DateTimeField(null=True, blank=True, help_text="Inicio de la ejecución")
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="Fin de la ejecución")
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Trabajo de sincronización'
+        verbose_name_plural = 'Trabajos de sincronización'
+        constraints = [
+            # Un solo trabajo activo por URL: deduplica sincronizaciones concurrentes
+            models.UniqueConstraint(
+                fields=['api_url'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='todos_syncjob_one_active_per_url',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Sync #{self.id} - {self.api_url} ({self.status})"
+
+    @property
+    def is_active(self):
+        """Indica si el trabajo sigue en cola o en ejecución"""
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def queue_seconds(self):
+        """Segundos que el trabajo esperó en cola"""
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.queued_at).total_seconds(), 3)
+
+    @property
+    def duration_seconds(self):
+        """Segundos de ejecución del trabajo"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at).total_seconds(), 3)
+
+
+class SyncSource(models.Model):
+    """
+    Validadores HTTP de una URL de la API externa (ETag / Last-Modified)
+    Se guardan por página pedida para enviar peticiones condicionales en la siguiente sincronización
+    """
+    api_url = models.URLField(unique=True, help_text="URL de la API externa")
+    validators = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Validadores por página: {'inicio:límite': {'etag', 'last_modified', 'count', 'overwrite'}}"
+    )
+    last_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fecha y hora de la última sincronización"
+    )
+
+    class Meta:
+        verbose_name = 'Origen de sincronización'
+        verbose_name_plural = 'Orígenes de sincronización'
+
+    def __str__(self):
+        return self.api_url
+
+
+class TodoCounters(models.Model):
+    """
+    Contadores materializados de todos
+    Una fila global (userId=0) y una fila por usuario con total, completados y
+    sincronizados. Se mantienen con incrementos atómicos F() en cada escritura
+    (ver todos.counters) y se recalculan con: python manage.py rebuild_counters
+    """
+    GLOBAL_USER_ID = 0
+
+    userId = models.IntegerField(
+        unique=True,
+        help_text="ID del usuario (0 = contadores globales)"
+    )
+    total = models.BigIntegerField(default=0, help_text="Total de todos")
+    completed = models.BigIntegerField(default=0, help_text="Todos completados")
+    synced = models.BigIntegerField(default=0, help_text="Todos sincronizados desde API externa")
+
+    class Meta:
+        ordering = ['userId']
+        verbose_name = 'Contadores de pendientes'
+        verbose_name_plural = 'Contadores de pendientes'
+
+    def __str__(self):
+        scope = 'Global' if self.userId == self.GLOBAL_USER_ID else f'Usuario #{self.userId}'
+        return f"{scope}: {self.total} total, {self.completed} completados"
+
+
+class DataVersion(models.Model):
+    """
+    Versión de un conjunto de datos (p. ej. 'todos')
+    Se incrementa en cada escritura; sirve como validador barato para
+    peticiones condicionales (ETag / Last-Modified) sin recorrer la tabla
+    """
+    name = models.CharField(max_length=50, unique=True, help_text="Nombre del conjunto de datos")
+    version = models.BigIntegerField(default=0, help_text="Número de versión")
+    changed_at = models.DateTimeField(help_text="Fecha y hora del último cambio")
+
+    class Meta:
+        verbose_name = 'Versión de datos'
+        verbose_name_plural = 'Versiones de datos'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,108 @@
+"""
+Paginación para las vistas de listas de todos
+"""
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TodoKeysetPagination(PageNumberPagination):
+    """
+    Paginación por número de página (por defecto) con modo keyset opcional
+    Con ?cursor= la página se obtiene con WHERE id > cursor ORDER BY id LIMIT n,
+    sin OFFSET ni COUNT(*), así que una página profunda cuesta lo mismo que la primera.
+    El cursor es el último ID de la página anterior (?cursor= vacío = primera página).
+    El cursor solo recorre la tabla por id: ?ordering= con otro orden responde 400.
+    Con keyset_only = True siempre se pagina por cursor, aunque no venga ?cursor=.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+    invalid_ordering_message = (
+        'La paginación por cursor solo admite el orden por id; quite ?ordering= o use ?page=.'
+    )
+
+    keyset_only = False
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.keyset_only and self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.keyset = True
+        self.request = request
+        self.check_ordering(request)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(id__gt=cursor)
+
+        # Se pide una fila extra para saber si existe una página siguiente
+        rows = list(queryset.order_by('id')[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        self.next_cursor = self.row_id(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def check_ordering(self, request):
+        """El orden pedido debe ser el del cursor (id ascendente)"""
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '')
+        if ordering not in ('', 'id'):
+            raise ValidationError({api_settings.ORDERING_PARAM: [self.invalid_ordering_message]})
+
+    def decode_cursor(self, request):
+        """Cursor de la petición como entero, o None para la primera página"""
+        value = request.query_params.get(self.cursor_query_param, '')
+        if value == '':
+            return None
+        try:
+            cursor = int(value)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    @staticmethod
+    def row_id(row):
+        """ID de una fila, sea instancia del modelo o diccionario de valores"""
+        return row['id'] if isinstance(row, dict) else row.id
+
+    def get_next_cursor_link(self):
+        """URL de la siguiente página en modo keyset"""
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_cursor_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data)
+        ]))
+
+    def get_html_context(self):
+        if self.keyset:
+            return {'previous_url': None, 'next_url': self.get_next_cursor_link(), 'page_links': []}
+        return super().get_html_context()
+
+
+class UserTodosPagination(TodoKeysetPagination):
+    """
+    Paginación de los todos de un usuario: siempre por cursor
+    Admite ?page_size= con un máximo para acotar la respuesta
+    """
+    keyset_only = True
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,30 @@
+"""
+Parsers adicionales para las vistas de todos
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    JSON delimitado por líneas (un objeto por línea), como el que genera /api/todos/export/
+    Retorna la lista de objetos; las líneas vacías se ignoran
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f'Error de NDJSON en la línea {number}: {exc}')
+        return items
@@ -0,0 +1,162 @@
+"""
+Perfilado de peticiones bajo demanda
+ProfilingMiddleware ejecuta el resto de la petición (process_view de los demás
+middlewares, la vista y el renderizado de las respuestas de DRF) dentro de cProfile
+cuando la petición trae la cabecera firmada X-Todos-Profile
+(python manage.py profile_token) o cuando su nombre de URL está en
+TODOS_PROFILING['ALLOWED_VIEWS'] (muestreado con SAMPLE_RATE). Cada perfil se
+guarda como <fecha>-<id de petición>-<vista>.prof en DIRECTORY, conservando los
+MAX_PROFILES más recientes; se abre con pstats, snakeviz o flameprof (flamegraph)
+y se descarga desde la vista de administración /api/profiles/.
+"""
+import cProfile
+import os
+import random
+import re
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.urls import Resolver404, resolve
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_PROFILING
+DEFAULTS = {
+    'ENABLED': True,
+    'HEADER': 'X-Todos-Profile',
+    'TOKEN_MAX_AGE': 3600,  # Segundos de validez de un token firmado
+    'ALLOWED_VIEWS': [],  # Nombres de URL perfilados sin cabecera, p. ej. 'todos:user_todos'
+    'SAMPLE_RATE': 1.0,  # Fracción de las peticiones de ALLOWED_VIEWS perfiladas
+    'DIRECTORY': None,  # None = <directorio temporal>/todos-profiles
+    'MAX_PROFILES': 50,
+}
+
+SIGNING_SALT = 'todos.profiling'
+TOKEN_VALUE = 'profile'
+
+# Ids de petición aceptados de X-Request-ID (se usan en el nombre del archivo)
+REQUEST_ID = re.compile(r'^[\w-]{1,64}$')
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+
+
+def profiling_setting(name):
+    """Lee un valor de settings.TODOS_PROFILING con su valor por defecto"""
+    return getattr(settings, 'TODOS_PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def profile_directory():
+    directory = profiling_setting('DIRECTORY') or os.path.join(tempfile.gettempdir(), 'todos-profiles')
+    return str(directory)
+
+
+def make_token():
+    """Valor firmado de la cabecera de perfilado (válido TOKEN_MAX_AGE segundos)"""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(token):
+    try:
+        value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=profiling_setting('TOKEN_MAX_AGE')
+        )
+    except signing.BadSignature:  # Incluye SignatureExpired
+        return False
+    return value == TOKEN_VALUE
+
+
+def should_profile(request, view_name):
+    """La petición trae un token válido o su vista está en la lista de permitidas (muestreada)"""
+    if not profiling_setting('ENABLED'):
+        return False
+    token = request.headers.get(profiling_setting('HEADER'))
+    if token:
+        return valid_token(token)
+    return (
+        view_name in profiling_setting('ALLOWED_VIEWS')
+        and random.random() < profiling_setting('SAMPLE_RATE')
+    )
+
+
+def request_id(request):
+    """X-Request-ID del balanceador si es seguro como nombre de archivo, o uno nuevo"""
+    value = request.headers.get('X-Request-ID', '')
+    return value if REQUEST_ID.match(value) else uuid.uuid4().hex
+
+
+def save_profile(profiler, req_id, view_name):
+    """Guarda el perfil en DIRECTORY, elimina los más antiguos y retorna el nombre del archivo"""
+    directory = profile_directory()
+    os.makedirs(directory, exist_ok=True)
+    safe_view = re.sub(r'[^\w-]', '_', view_name)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{req_id}-{safe_view}.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+    for old in recent_profiles()[profiling_setting('MAX_PROFILES'):]:
+        try:
+            os.remove(os.path.join(directory, old['name']))
+        except FileNotFoundError:
+            pass  # Otro proceso lo eliminó primero
+    return name
+
+
+def recent_profiles():
+    """Perfiles guardados, del más reciente al más antiguo"""
+    directory = profile_directory()
+    try:
+        entries = [entry for entry in os.scandir(directory) if PROFILE_NAME.match(entry.name)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        profiles.append({'name': entry.name, 'size': stat.st_size, 'modified': stat.st_mtime})
+    profiles.sort(key=lambda profile: profile['modified'], reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """Ruta de un perfil guardado por su nombre, o None si el nombre no es válido o no existe"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(profile_directory(), name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Perfilado opcional de la petición (ver el docstring del módulo)
+    Va al final de MIDDLEWARE y perfila get_response: el orden de los hooks del resto
+    de middlewares (process_view, process_template_response) no cambia.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        view_name = self.profiled_view(request)
+        if view_name is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        finally:
+            name = save_profile(profiler, request_id(request), view_name)
+        response['X-Profile-Id'] = name
+        return response
+
+    def profiled_view(self, request):
+        """Nombre de URL de la vista si la petición se perfila, o None"""
+        if not profiling_setting('ENABLED'):
+            return None
+        if not request.headers.get(profiling_setting('HEADER')) and not profiling_setting('ALLOWED_VIEWS'):
+            # Sin cabecera ni vistas permitidas no hace falta resolver la URL
+            return None
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return None
+        return match.view_name if should_profile(request, match.view_name) else None
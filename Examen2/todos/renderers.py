@@ -0,0 +1,138 @@
+"""
+Renderers de la API de todos
+- FastJSONRenderer: JSON con orjson si está instalado (respaldo: JSONRenderer de DRF)
+- MessagePackRenderer: MessagePack binario si msgpack está instalado
+- CSVRenderer: CSV de las filas de la respuesta (resultados paginados, listas o un objeto)
+"""
+import csv
+import io
+import json
+import operator
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Dependencia opcional
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer acelerado con orjson
+    Produce la misma salida compacta en UTF-8 que el renderer de DRF. Si orjson no
+    está instalado, si se pide indentación (p. ej. ?format=api) o si orjson no puede
+    codificar algún valor, se usa el JSONRenderer estándar.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # Fechas y horas con el encoder de DRF (p. ej. 'Z' en lugar de '+00:00')
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: escapar U+2028/U+2029 para que la salida sea JavaScript válido
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer MessagePack (Accept: application/msgpack o ?format=msgpack)
+    Requiere el paquete opcional msgpack
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        encoder = JSONRenderer.encoder_class()
+        return msgpack.packb(data, default=encoder.default, use_bin_type=True)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer CSV (Accept: text/csv o ?format=csv)
+    En respuestas paginadas se exportan solo las filas de 'results'; los
+    valores anidados se escriben como JSON
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            rows = data['results']
+        elif isinstance(data, list):
+            rows = data
+        else:
+            rows = [data]
+
+        # Encabezado: unión de las claves en orden de aparición
+        columns = {}
+        for row in rows:
+            if isinstance(row, dict):
+                columns.update(dict.fromkeys(row))
+        header = list(columns) or ['value']
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        if all(isinstance(row, dict) and len(row) == len(header) for row in rows) and not any(
+            isinstance(value, (dict, list)) for value in (rows[0].values() if rows else ())
+        ):
+            # Filas planas y homogéneas (listas de todos): itemgetter por fila
+            getter = operator.itemgetter(*header)
+            if len(header) == 1:
+                writer.writerows((getter(row),) for row in rows)
+            else:
+                writer.writerows(map(getter, rows))
+        else:
+            for row in rows:
+                if not isinstance(row, dict):
+                    row = {'value': row}
+                writer.writerow([self.format_value(row.get(key)) for key in header])
+        return output.getvalue().encode(self.charset)
+
+    @staticmethod
+    def format_value(value):
+        """Convierte un valor a celda CSV"""
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, cls=JSONRenderer.encoder_class)
+        return value
+
+
+def todo_renderer_classes():
+    """
+    Renderers de las vistas de listas de todos: los de settings más MessagePack
+    (si msgpack está instalado) y CSV, seleccionados por negociación de contenido
+    """
+    renderers = list(api_settings.DEFAULT_RENDERER_CLASSES)
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    renderers.append(CSVRenderer)
+    return renderers
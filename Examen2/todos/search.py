@@ -0,0 +1,164 @@
+"""
+Búsqueda de texto completo sobre los títulos de los todos
+SQLite: tabla virtual FTS5 (todos_todo_fts) con contenido externo, sincronizada por
+triggers, así que también la mantienen bulk_create, upserts y queryset.update().
+PostgreSQL: índice GIN sobre to_tsvector('simple', title).
+Otros motores: se recurre a title ICONTAINS.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+
+FTS_TABLE = 'todos_todo_fts'
+
+SQLITE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content='todos_todo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF id, title ON todos_todo BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+]
+SQLITE_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+POSTGRES_INDEX = 'todos_todo_title_tsv'
+POSTGRES_VECTOR = "to_tsvector('simple', todos_todo.title)"
+POSTGRES_FTS_SQL = [
+    f"CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON todos_todo "
+    f"USING GIN ((to_tsvector('simple', title)))",
+]
+
+# Términos de búsqueda: palabras, sin operadores del lenguaje de consulta
+TOKEN_RE = re.compile(r'\w+')
+
+
+def search_tokens(term):
+    """Palabras del término de búsqueda (máximo 16)"""
+    return TOKEN_RE.findall(term or '')[:16]
+
+
+def fts_query(tokens, vendor):
+    """
+    Consulta de texto completo con todas las palabras como prefijos
+    ("ir super" encuentra "ir al supermercado")
+    """
+    if vendor == 'postgresql':
+        return ' & '.join(f'{token}:*' for token in tokens)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def install_search_index(connection, rebuild=True):
+    """Crea el índice de búsqueda del motor (idempotente) y opcionalmente lo reconstruye"""
+    if connection.vendor == 'sqlite':
+        statements = list(SQLITE_FTS_SQL)
+        if rebuild:
+            statements.append(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_FTS_SQL
+    else:
+        return False
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    return True
+
+
+def ensure_search_index(using='default'):
+    """
+    Reinstala los triggers FTS5 si faltan
+    Las migraciones que reconstruyen todos_todo en SQLite (copiar y renombrar la tabla)
+    eliminan sus triggers; en ese caso se recrean y se reindexa la tabla.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    tables = connection.introspection.table_names()
+    if 'todos_todo' not in tables:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'todos_todo'"
+        )
+        triggers = {row[0] for row in cursor.fetchall()}
+    if FTS_TABLE in tables and triggers.issuperset(SQLITE_TRIGGERS):
+        return False
+    return install_search_index(connection)
+
+
+def search_todos(queryset, term, ranked=True):
+    """
+    Filtra un queryset de todos por texto completo en el título
+    Con ranked=True se anota search_rank (menor = más relevante) y se ordena por él.
+    """
+    tokens = search_tokens(term)
+    if not tokens:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    query = fts_query(tokens, vendor)
+
+    if vendor == 'sqlite':
+        if not ranked:
+            return queryset.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (query,)
+            ))
+        # Join con la tabla FTS5; "rank" es bm25 (negativo, más relevante primero)
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = todos_todo.id', f'{FTS_TABLE} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+        )
+    elif vendor == 'postgresql':
+        match = f"{POSTGRES_VECTOR} @@ to_tsquery('simple', %s)"
+        if not ranked:
+            return queryset.extra(where=[match], params=[query])
+        queryset = queryset.extra(
+            where=[match],
+            params=[query],
+            select={'search_rank': f"-ts_rank({POSTGRES_VECTOR}, to_tsquery('simple', %s))"},
+            select_params=[query],
+        )
+    else:
+        condition = Q()
+        for token in tokens:
+            condition &= Q(title__icontains=token)
+        return queryset.filter(condition)
+
+    return queryset.order_by('search_rank', 'id')
+
+
+class TodoSearchFilter(BaseFilterBackend):
+    """
+    ?search= con el índice de texto completo, ordenado por relevancia
+    Debe ir después de OrderingFilter: un ?ordering= explícito tiene prioridad sobre la relevancia.
+    El parámetro es SEARCH_PARAM de REST_FRAMEWORK, como en SearchFilter de DRF.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        ordering_param = OrderingFilter.ordering_param
+        if request.query_params.get(ordering_param):
+            return search_todos(queryset, term, ranked=False)
+        return search_todos(queryset, term)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Búsqueda de texto completo en el título',
+            'schema': {'type': 'string'},
+        }]
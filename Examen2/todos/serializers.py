@@ -1,5 +1,6 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Todo
+from .models import DUPLICATE_TITLE_MESSAGE, SyncJob, Todo
 
 class TodoSerializer(serializers.ModelSerializer):
     """
@@ -14,9 +15,9 @@ class TodoSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'userId', 'title', 'completed', 
             'status_display', 'user_display',
-            'created_at', 'updated_at', 'synced_from_api'
+            'created_at', 'updated_at', 'synced_from_api', 'last_synced_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'status_display', 'user_display']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'status_display', 'user_display', 'last_synced_at']
     
     def validate_title(self, value):
         """Validación del título"""
@@ -38,6 +39,21 @@ class TodoSerializer(serializers.ModelSerializer):
             )
         return value
 
+class ProjectionListSerializer(serializers.ListSerializer):
+    """
+    Serializador de listas para las vistas de proyección
+    Si las filas ya son diccionarios (queryset.values() con las columnas del
+    serializador) se devuelven tal cual, sin instanciar modelos ni recorrer
+    los campos de DRF; si son instancias se usa la serialización normal.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, 'all') else data
+        child = self.child
+        return [
+            row if isinstance(row, dict) else child.to_representation(row)
+            for row in iterable
+        ]
+
 class TodoIdOnlySerializer(serializers.ModelSerializer):
     """
     Serializador para mostrar solo IDs
@@ -46,6 +62,7 @@ class TodoIdOnlySerializer(serializers.ModelSerializer):
     class Meta:
         model = Todo
         fields = ['id']
+        list_serializer_class = ProjectionListSerializer
 
 class TodoIdTitleSerializer(serializers.ModelSerializer):
     """
@@ -58,6 +75,7 @@ class TodoIdTitleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Todo
         fields = ['id', 'title']
+        list_serializer_class = ProjectionListSerializer
 
 class TodoIdUserSerializer(serializers.ModelSerializer):
     """
@@ -70,6 +88,14 @@ class TodoIdUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = Todo
         fields = ['id', 'userId']
+        list_serializer_class = ProjectionListSerializer
+
+# Proyecciones de los endpoints del examen reutilizables por otras vistas (?fields=)
+PROJECTION_SERIALIZERS = {
+    'ids': TodoIdOnlySerializer,
+    'ids_titles': TodoIdTitleSerializer,
+    'ids_users': TodoIdUserSerializer,
+}
 
 class TodoCreateSerializer(serializers.ModelSerializer):
     """
@@ -79,25 +105,17 @@ class TodoCreateSerializer(serializers.ModelSerializer):
         model = Todo
         fields = ['userId', 'title', 'completed']
     
-    def validate(self, data):
-        """Validación general al crear un todo"""
-        if 'title' in data and 'userId' in data:
-            # Verificar si ya existe un todo igual para el mismo usuario
-            existing_todo = Todo.objects.filter(
-                userId=data['userId'],
-                title=data['title']
-            ).first()
-            
-            if existing_todo:
-                raise serializers.ValidationError(
-                    "Ya existe un todo con este título para este usuario."
-                )
-        
-        return data
-    
     def create(self, validated_data):
-        """Crear nuevo todo"""
-        return Todo.objects.create(**validated_data)
+        """
+        Crear nuevo todo
+        El duplicado (mismo título para el usuario) lo detecta el índice único
+        (userId, title_hash) al insertar, sin consulta previa y sin carreras
+        """
+        try:
+            with transaction.atomic():
+                return Todo.objects.create(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'non_field_errors': [DUPLICATE_TITLE_MESSAGE]})
 
 class TodoUpdateSerializer(serializers.ModelSerializer):
     """
@@ -111,7 +129,11 @@ class TodoUpdateSerializer(serializers.ModelSerializer):
         """Actualizar todo existente"""
         instance.title = validated_data.get('title', instance.title)
         instance.completed = validated_data.get('completed', instance.completed)
-        instance.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            raise serializers.ValidationError({'title': [DUPLICATE_TITLE_MESSAGE]})
         return instance
 
 class TodoSummarySerializer(serializers.ModelSerializer):
@@ -135,13 +157,23 @@ class ApiSyncSerializer(serializers.Serializer):
     limit = serializers.IntegerField(
         default=20,
         min_value=1,
-        max_value=200,
-        help_text="Número máximo de todos a sincronizar (1-200)"
+        max_value=100000,
+        help_text="Número máximo de todos a sincronizar (1-100000), se descargan en páginas"
     )
     overwrite_existing = serializers.BooleanField(
         default=False,
         help_text="Si es True, sobrescribe los registros existentes"
     )
+    full_sync = serializers.BooleanField(
+        default=False,
+        help_text="Si es True, ignora ETag/Last-Modified y hashes de contenido y reescribe todos los registros"
+    )
+    batch_size = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=5000,
+        help_text="Tamaño de lote para las escrituras en base de datos (por defecto TODOS_SYNC['BATCH_SIZE'])"
+    )
     
     def validate_api_url(self, value):
         """Validar que la URL sea correcta"""
@@ -151,6 +183,23 @@ class ApiSyncSerializer(serializers.Serializer):
             )
         return value
 
+class SyncJobSerializer(serializers.ModelSerializer):
+    """
+    Serializador del estado de un trabajo de sincronización
+    Incluye contadores de progreso y tiempos de ejecución
+    """
+    queue_seconds = serializers.ReadOnlyField()
+    duration_seconds = serializers.ReadOnlyField()
+
+    class Meta:
+        model = SyncJob
+        fields = [
+            'id', 'api_url', 'limit', 'overwrite_existing', 'full_sync', 'batch_size',
+            'status', 'fetched', 'created', 'updated', 'skipped', 'errors_count', 'errors', 'error',
+            'queued_at', 'started_at', 'finished_at', 'queue_seconds', 'duration_seconds'
+        ]
+        read_only_fields = fields
+
 class TodoStatsSerializer(serializers.Serializer):
     """
     Serializador para estadísticas de todos
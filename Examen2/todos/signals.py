@@ -0,0 +1,29 @@
+"""
+Señales del modelo Todo
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, snapshot
+from .models import Todo
+
+
+@receiver(post_save, sender=Todo)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Mantiene TodoCounters, el snapshot en memoria y la versión de la tabla al crear o modificar un todo"""
+    if raw:
+        # loaddata: los contadores se recalculan con rebuild_counters
+        snapshot.record_saved(instance, raw=True)
+        return
+    counters.record_saved(instance, created)
+    counters.version_changed()
+    # Después de incrementar la versión: fuera de una transacción on_commit se ejecuta al instante
+    snapshot.record_saved(instance)
+
+
+@receiver(post_delete, sender=Todo)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Mantiene TodoCounters, el snapshot en memoria y la versión de la tabla al eliminar un todo"""
+    counters.record_deleted(instance)
+    counters.version_changed()
+    snapshot.record_deleted(instance)
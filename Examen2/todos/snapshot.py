@@ -0,0 +1,474 @@
+"""
+Snapshot columnar en memoria de los todos (id, userId, completed, synced_from_api)
+Las proyecciones de IDs / userId y las estadísticas solo leen estas cuatro columnas:
+se guardan en arreglos compactos (array('q') para id y userId, un byte de banderas por
+fila), unos 17 bytes por todo en lugar de un objeto de Python por fila, junto con los
+contadores globales y por usuario.
+Las escrituras conocidas se aplican al confirmar la transacción: las señales
+post_save/post_delete fila a fila y los lotes (bulk, sincronización, cambios de estado)
+con record_rows() en un solo paso, junto con el incremento de versión del lote.
+Si la versión de la tabla no coincide (UPDATE sin filas conocidas, otros procesos) o
+pasan RECONCILE_SECONDS, la tabla se vuelve a leer en un hilo en segundo plano: una
+petición nunca recarga el snapshot, mientras tanto las vistas usan TodoCounters y la tabla.
+Con NumPy instalado los filtros se evalúan vectorizados sobre los mismos arreglos.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .counters import _active_batch
+from .models import Todo
+from .stats import completion_rate
+from .versioning import get_version, request_version
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - dependencia opcional
+    numpy = None
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_SNAPSHOT
+DEFAULTS = {
+    'ENABLED': True,
+    'RECONCILE_SECONDS': 300,
+    'CHUNK_SIZE': 5000,
+    'BACKGROUND_RELOAD': True,
+}
+
+# Filas insertadas o eliminadas fuera del final de las columnas que un lote aplica en
+# su lugar (cada una desplaza los arreglos); con más, el lote se recarga en segundo plano
+MAX_INCREMENTAL_MOVES = 32
+
+logger = logging.getLogger(__name__)
+
+# Columnas que el snapshot puede devolver
+SNAPSHOT_FIELDS = ('id', 'userId')
+
+COMPLETED = 1
+SYNCED = 2
+
+
+def snapshot_setting(name):
+    """Lee un valor de settings.TODOS_SNAPSHOT con su valor por defecto"""
+    return getattr(settings, 'TODOS_SNAPSHOT', {}).get(name, DEFAULTS[name])
+
+
+def _flags(completed, synced):
+    return (COMPLETED if completed else 0) | (SYNCED if synced else 0)
+
+
+class TodoSnapshot:
+    """
+    Columnas de todos ordenadas por id y contadores [total, completados, sincronizados]
+    Todas las lecturas y escrituras se hacen bajo un mismo candado.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.loaded_at = None
+        self.reload_thread = None
+        self._reset()
+
+    def _reset(self):
+        self.ids = array('q')
+        self.users = array('q')
+        self.flags = bytearray()
+        self.totals = [0, 0, 0]
+        self.user_counts = {}
+
+    def memory_bytes(self):
+        """Bytes ocupados por las columnas"""
+        return (
+            len(self.ids) * self.ids.itemsize + len(self.users) * self.users.itemsize
+            + len(self.flags)
+        )
+
+    def current(self, version):
+        """
+        Retorna el snapshot si corresponde a version, o None
+        Si no corresponde o está vencido programa una recarga en segundo plano
+        """
+        with self.lock:
+            fresh = self.version == tuple(version)
+            expired = (
+                self.loaded_at is None
+                or time.monotonic() - self.loaded_at > snapshot_setting('RECONCILE_SECONDS')
+            )
+        if not fresh or expired:
+            self.reload_in_background()
+        return self if fresh else None
+
+    def reload_in_background(self):
+        """Lanza load() en un hilo si no hay otra recarga en curso"""
+        if not snapshot_setting('BACKGROUND_RELOAD'):
+            return
+        with self.lock:
+            if self.reload_thread is not None:
+                return
+            self.reload_thread = threading.Thread(
+                target=self._reload, name='todos-snapshot-reload', daemon=True
+            )
+        self.reload_thread.start()
+
+    def _reload(self):
+        try:
+            self.load(get_version())
+        except Exception:
+            logger.exception('No se pudo recargar el snapshot de todos')
+        finally:
+            with self.lock:
+                self.reload_thread = None
+            # El hilo abrió su propia conexión
+            connection.close()
+
+    def load(self, version):
+        """
+        Lee las cuatro columnas de la tabla completa (una consulta por bloques)
+        Las columnas nuevas se construyen sin el candado y se sustituyen al final
+        """
+        ids, users, flags = array('q'), array('q'), bytearray()
+        totals, user_counts = [0, 0, 0], {}
+        rows = (
+            Todo.objects.order_by('id')
+            .values_list('id', 'userId', 'completed', 'synced_from_api')
+            .iterator(chunk_size=snapshot_setting('CHUNK_SIZE'))
+        )
+        for todo_id, user_id, completed, synced in rows:
+            ids.append(todo_id)
+            users.append(user_id)
+            flags.append(_flags(completed, synced))
+            counts = user_counts.get(user_id)
+            if counts is None:
+                counts = user_counts[user_id] = [0, 0, 0]
+            for target in (counts, totals):
+                target[0] += 1
+                target[1] += completed
+                target[2] += synced
+        with self.lock:
+            self.ids, self.users, self.flags = ids, users, flags
+            self.totals, self.user_counts = totals, user_counts
+            self.version = tuple(version)
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Deja de servir el snapshot hasta la próxima recarga"""
+        with self.lock:
+            self.version = None
+
+    def _count(self, user_id, sign, completed, synced):
+        counts = self.user_counts.get(user_id)
+        if counts is None:
+            counts = self.user_counts[user_id] = [0, 0, 0]
+        for totals in (counts, self.totals):
+            totals[0] += sign
+            totals[1] += sign if completed else 0
+            totals[2] += sign if synced else 0
+        if not counts[0]:
+            del self.user_counts[user_id]
+
+    def _position(self, todo_id):
+        """Posición de un id en las columnas, o None"""
+        pos = bisect_left(self.ids, todo_id)
+        if pos < len(self.ids) and self.ids[pos] == todo_id:
+            return pos
+        return None
+
+    def apply_saved(self, todo_id, user_id, completed, synced):
+        """Inserta o reemplaza una fila (idempotente)"""
+        with self.lock:
+            pos = self._position(todo_id)
+            if pos is not None:
+                old_flags = self.flags[pos]
+                self._count(self.users[pos], -1, old_flags & COMPLETED, old_flags & SYNCED)
+                self.users[pos] = user_id
+                self.flags[pos] = _flags(completed, synced)
+            else:
+                pos = bisect_left(self.ids, todo_id)
+                self.ids.insert(pos, todo_id)
+                self.users.insert(pos, user_id)
+                self.flags.insert(pos, _flags(completed, synced))
+            self._count(user_id, 1, completed, synced)
+
+    def apply_deleted(self, todo_id):
+        """Elimina una fila si existe (idempotente)"""
+        with self.lock:
+            pos = self._position(todo_id)
+            if pos is None:
+                return
+            old_flags = self.flags[pos]
+            self._count(self.users[pos], -1, old_flags & COMPLETED, old_flags & SYNCED)
+            del self.ids[pos]
+            del self.users[pos]
+            del self.flags[pos]
+
+    def apply_changes(self, changes):
+        """
+        Aplica un lote de cambios [(id, (userId, completed, synced) o None si se eliminó)]
+        Retorna False sin aplicar nada si desplazaría las columnas más de
+        MAX_INCREMENTAL_MOVES veces (el lote se deja para una recarga)
+        """
+        # Estado final de cada id, en orden de id: los nuevos al final solo se añaden
+        final = sorted(dict(changes).items())
+        with self.lock:
+            last = self.ids[-1] if self.ids else 0
+            moves = 0
+            for todo_id, state in final:
+                exists = self._position(todo_id) is not None
+                if (state is None and exists) or (state is not None and not exists and todo_id < last):
+                    moves += 1
+            if moves > MAX_INCREMENTAL_MOVES:
+                return False
+            for todo_id, state in final:
+                if state is None:
+                    self.apply_deleted(todo_id)
+                else:
+                    self.apply_saved(todo_id, *state)
+            return True
+
+    def advance(self, expected, version):
+        """
+        Adopta version si es la que sigue a la del snapshot tras una escritura local;
+        si entre tanto escribió otro proceso o hilo, el snapshot se recargará
+        """
+        with self.lock:
+            if self.version is not None and self.version[0] == expected and version[0] == expected + 1:
+                self.version = tuple(version)
+            else:
+                self.version = None
+
+    def statistics(self, user_id=None, unique_users=False):
+        """Mismo formato que stats.counter_statistics, sin consultar la base de datos"""
+        with self.lock:
+            if user_id is None:
+                total, completed, synced = self.totals
+            else:
+                total, completed, synced = self.user_counts.get(user_id, (0, 0, 0))
+            stats = {'total': total, 'completed': completed, 'synced': synced}
+            if unique_users and user_id is None:
+                stats['unique_users'] = len(self.user_counts)
+        stats['pending'] = total - completed
+        stats['completion_rate'] = completion_rate(completed, total)
+        return stats
+
+    def count(self, completed=None, user_id=None, after=None):
+        """Filas que cumplen los filtros; O(1) sin cursor"""
+        with self.lock:
+            if after is not None:
+                return len(self.positions(completed, user_id, after))
+            if user_id is None:
+                total, done, _ = self.totals
+            else:
+                total, done, _ = self.user_counts.get(user_id, (0, 0, 0))
+        if completed is None:
+            return total
+        return done if completed else total - done
+
+    def positions(self, completed=None, user_id=None, after=None, start=0, stop=None):
+        """Posiciones [start:stop] de las filas que cumplen los filtros, en orden de id"""
+        with self.lock:
+            begin = bisect_right(self.ids, after) if after is not None else 0
+            end = len(self.ids)
+            if completed is None and user_id is None:
+                first = min(begin + start, end)
+                last = end if stop is None else min(begin + stop, end)
+                return range(first, last)
+            if numpy is not None:
+                return self._numpy_positions(completed, user_id, begin, start, stop)
+
+            wanted = None if stop is None else stop - start
+            found = []
+            skip = start
+            users, flags = self.users, self.flags
+            for pos in range(begin, end):
+                if user_id is not None and users[pos] != user_id:
+                    continue
+                if completed is not None and bool(flags[pos] & COMPLETED) != completed:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                found.append(pos)
+                if wanted is not None and len(found) >= wanted:
+                    break
+            return found
+
+    def _numpy_positions(self, completed, user_id, begin, start, stop):
+        # Vistas sin copia sobre los arreglos; se liberan antes de soltar el candado
+        mask = numpy.ones(len(self.ids) - begin, dtype=bool)
+        if user_id is not None:
+            mask &= numpy.frombuffer(self.users, dtype=numpy.int64)[begin:] == user_id
+        if completed is not None:
+            flags = numpy.frombuffer(self.flags, dtype=numpy.uint8)[begin:]
+            mask &= ((flags & COMPLETED) != 0) == completed
+        return (numpy.flatnonzero(mask)[start:stop] + begin).tolist()
+
+    def rows(self, fields, completed=None, user_id=None):
+        """Filas filtradas con la interfaz de queryset que usan los paginadores"""
+        return SnapshotRows(self, fields, completed, user_id)
+
+
+class SnapshotRows:
+    """
+    Resultado filtrado del snapshot, ordenado por id
+    Implementa lo que usan Paginator y TodoKeysetPagination: count(), slicing,
+    filter(id__gt=...) y order_by('id'); las filas son diccionarios como values().
+    """
+    model = Todo
+    ordered = True
+
+    def __init__(self, snapshot, fields, completed=None, user_id=None, after=None):
+        self.snapshot = snapshot
+        self.fields = list(fields)
+        self.completed = completed
+        self.user_id = user_id
+        self.after = after
+
+    def filter(self, id__gt):
+        return SnapshotRows(self.snapshot, self.fields, self.completed, self.user_id, id__gt)
+
+    def order_by(self, *fields):
+        return self
+
+    def count(self):
+        return self.snapshot.count(self.completed, self.user_id, self.after)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            rows = self[index:index + 1]
+            if not rows:
+                raise IndexError(index)
+            return rows[0]
+        if index.step is not None:
+            raise ValueError('SnapshotRows no admite paso en el slicing.')
+        start, stop = index.start or 0, index.stop
+        snapshot = self.snapshot
+        with snapshot.lock:
+            positions = snapshot.positions(self.completed, self.user_id, self.after, start, stop)
+            columns = {'id': snapshot.ids, 'userId': snapshot.users}
+            columns = [(field, columns[field]) for field in self.fields]
+            return [{field: column[pos] for field, column in columns} for pos in positions]
+
+
+_snapshot = TodoSnapshot()
+
+
+def current_snapshot(request=None):
+    """
+    Snapshot vigente, o None si está deshabilitado
+    Con request se reutiliza la versión que ya leyeron ETag / caché de respuestas
+    """
+    if not snapshot_setting('ENABLED'):
+        return None
+    version = request_version(request) if request is not None else get_version()
+    return _snapshot.current(version)
+
+
+def record_saved(instance, raw=False):
+    """Actualiza el snapshot tras guardar un todo (post_save)"""
+    state = None if raw else instance.counter_state()
+    if state is None:
+        # loaddata o campos diferidos
+        record_unknown()
+    else:
+        _schedule([(instance.pk, state)])
+
+
+def record_deleted(instance):
+    """Actualiza el snapshot tras eliminar un todo (post_delete)"""
+    _schedule([(instance.pk, None)])
+
+
+def record_rows(todos):
+    """
+    Registra filas escritas sin señales (bulk_create, bulk_update, UPDATE ... RETURNING)
+    Dentro de un lote de contadores se aplican con el resto del lote al confirmar
+    """
+    changes = []
+    for todo in todos:
+        state = todo.counter_state()
+        if todo.pk is None or state is None:
+            # Sin id (bulk_create sin RETURNING) no se puede ubicar la fila
+            record_unknown()
+            return
+        changes.append((todo.pk, state))
+    if changes:
+        _schedule(changes)
+
+
+def record_unknown():
+    """Escritura cuyas filas no se conocen (p. ej. QuerySet.update()): el snapshot se recargará"""
+    pending = _batch_pending()
+    if pending is not None:
+        pending.complete = False
+    else:
+        _snapshot.invalidate()
+
+
+# Cambios del lote de contadores activo en este hilo (ver batch_finished)
+_pending = threading.local()
+
+
+def _batch_pending():
+    """Cambios acumulados del lote de contadores activo, o None fuera de un lote"""
+    batch = _active_batch()
+    if batch is None:
+        return None
+    if getattr(_pending, 'batch', None) is not batch:
+        # Primer cambio del lote; lo que quedara de un lote fallido se descarta
+        _pending.batch = batch
+        _pending.changes = []
+        _pending.complete = True
+    return _pending
+
+
+def _schedule(changes):
+    """Aplica changes al confirmar la transacción, o los acumula en el lote activo"""
+    pending = _batch_pending()
+    if pending is not None:
+        pending.changes.extend(changes)
+        return
+    _apply_on_commit(changes)
+
+
+def batch_finished(batch, changed):
+    """
+    Fin de un lote de contadores, tras incrementar la versión una sola vez
+    Programa sus cambios como una única escritura, o marca el snapshot para recarga
+    si el lote escribió filas que no registró
+    """
+    pending = _pending if getattr(_pending, 'batch', None) is batch else None
+    _pending.batch = None
+    if not changed:
+        return
+    if pending is None or not pending.complete or not pending.changes:
+        _snapshot.invalidate()
+        return
+    _apply_on_commit(pending.changes)
+
+
+def _apply_on_commit(changes):
+    snapshot = _snapshot
+    version = snapshot.version
+    if version is None:
+        # Sin cargar o pendiente de recarga: nada que mantener
+        return
+
+    def apply():
+        if not snapshot.apply_changes(changes):
+            snapshot.invalidate()
+            return
+        # Una escritura suelta o un lote incrementan la versión exactamente una vez
+        snapshot.advance(version[0], get_version())
+
+    transaction.on_commit(apply)
@@ -0,0 +1,35 @@
+"""
+Perfil de SQLite para producción
+Cada conexión nueva recibe los PRAGMA de settings.TODOS_SQLITE_PRAGMAS (señal
+connection_created): WAL para que las lecturas no esperen a las escrituras,
+synchronous=NORMAL (seguro con WAL), busy_timeout para esperar el bloqueo de
+escritura en lugar de fallar con "database is locked", y caché / mmap más grandes.
+Las transacciones de escritura usan BEGIN IMMEDIATE (OPTIONS['transaction_mode'])
+y las conexiones persisten entre peticiones (CONN_MAX_AGE).
+"""
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -65536,  # negativo = KiB (64 MB)
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    """PRAGMA configurados (settings.TODOS_SQLITE_PRAGMAS sobre los valores por defecto)"""
+    return {**DEFAULT_PRAGMAS, **getattr(settings, 'TODOS_SQLITE_PRAGMAS', {})}
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Aplica los PRAGMA a cada conexión SQLite nueva (receptor de connection_created)"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            if value is None:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,95 @@
+"""
+Estadísticas de todos
+Se leen de los contadores materializados (TodoCounters) cuando es posible y, si no,
+se calculan en una sola consulta de agregación condicional
+"""
+from django.db.models import Count, Q, Sum
+
+from .models import Todo, TodoCounters
+
+
+def completion_rate(completed, total):
+    """Porcentaje de todos completados redondeado a 2 decimales"""
+    return round((completed / total * 100) if total > 0 else 0, 2)
+
+
+def todo_statistics(queryset=None, unique_users=False, synced=False):
+    """
+    Calcula total, completados, pendientes y porcentaje de avance de un queryset
+    Opcionalmente incluye usuarios distintos y registros sincronizados.
+    Todo se resuelve con un único SELECT usando Count(..., filter=...);
+    los pendientes se derivan como total - completados.
+    """
+    if queryset is None:
+        queryset = Todo.objects.all()
+
+    aggregates = {
+        'total': Count('id'),
+        'completed': Count('id', filter=Q(completed=True)),
+    }
+    if unique_users:
+        aggregates['unique_users'] = Count('userId', distinct=True)
+    if synced:
+        aggregates['synced'] = Count('id', filter=Q(synced_from_api=True))
+
+    # order_by() evita que el ordenamiento por defecto entre en la agregación
+    stats = queryset.order_by().aggregate(**aggregates)
+    stats['pending'] = stats['total'] - stats['completed']
+    stats['completion_rate'] = completion_rate(stats['completed'], stats['total'])
+    return stats
+
+
+def counter_statistics(user_id=None, unique_users=False):
+    """
+    Estadísticas globales (user_id=None) o de un usuario leídas de TodoCounters
+    Mismo formato que todo_statistics (incluye 'synced'); una sola consulta.
+    Retorna None si no existe la fila de contadores del usuario o la global.
+    """
+    if user_id is not None:
+        counters = TodoCounters.objects.filter(userId=user_id).values(
+            'total', 'completed', 'synced'
+        ).first()
+        if counters is None:
+            return None
+    else:
+        # Alias distintos a los nombres de campo para poder filtrar por total__gt
+        global_row = Q(userId=TodoCounters.GLOBAL_USER_ID)
+        aggregates = {
+            'sum_total': Sum('total', filter=global_row),
+            'sum_completed': Sum('completed', filter=global_row),
+            'sum_synced': Sum('synced', filter=global_row),
+        }
+        if unique_users:
+            aggregates['unique_users'] = Count(
+                'id', filter=Q(userId__gt=TodoCounters.GLOBAL_USER_ID, total__gt=0)
+            )
+        result = TodoCounters.objects.aggregate(**aggregates)
+        if result['sum_total'] is None:
+            return None
+        counters = {
+            key.replace('sum_', ''): value for key, value in result.items()
+        }
+
+    stats = dict(counters)
+    stats['pending'] = stats['total'] - stats['completed']
+    stats['completion_rate'] = completion_rate(stats['completed'], stats['total'])
+    return stats
+
+
+def global_statistics(unique_users=False):
+    """Estadísticas globales desde TodoCounters, con respaldo en la agregación sobre Todo"""
+    stats = counter_statistics(unique_users=unique_users)
+    if stats is None:
+        stats = todo_statistics(unique_users=unique_users, synced=True)
+    return stats
+
+
+def user_statistics(user_id):
+    """
+    Estadísticas de un usuario desde TodoCounters, con respaldo en la agregación sobre
+    sus todos si falta su fila (contadores sin reconstruir tras cargar datos por fuera)
+    """
+    stats = counter_statistics(user_id)
+    if stats is None:
+        stats = todo_statistics(Todo.objects.filter(userId=user_id), synced=True)
+    return stats
@@ -0,0 +1,428 @@
+"""
+Sincronización por lotes de todos desde la API externa de Parra's Dev
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .counters import batched_counters, version_changed
+from .models import Todo, hash_title
+from .snapshot import record_rows
+
+# Valores por defecto, sobrescribibles desde settings.TODOS_SYNC
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+    'PAGE_SIZE': 500,
+    'MAX_WORKERS': 4,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 0.5,
+    'TIMEOUT': 10,
+    'JOB_BACKEND': 'thread',
+    'JOB_WORKERS': 2,
+    'JOB_STALE_AFTER': 3600,
+}
+
+# Códigos HTTP que justifican reintentar una página
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+REQUIRED_FIELDS = ['id', 'userId', 'title', 'completed']
+
+# Campos que se sobrescriben cuando overwrite_existing=True
+SYNC_UPDATE_FIELDS = [
+    'userId', 'title', 'title_hash', 'completed', 'synced_from_api',
+    'content_hash', 'last_synced_at', 'updated_at'
+]
+
+
+def sync_setting(name):
+    """Obtiene un parámetro de sincronización desde settings.TODOS_SYNC"""
+    return getattr(settings, 'TODOS_SYNC', {}).get(name, DEFAULTS[name])
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Sesión HTTP compartida por proceso (keep-alive)
+    El pool de conexiones se dimensiona según MAX_WORKERS
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = sync_setting('MAX_WORKERS')
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+class UpstreamPage:
+    """
+    Página descargada de la API externa
+    Si la API respondió 304 (not_modified), records está vacío y count e id_range
+    son los de la página en la sincronización anterior.
+    """
+
+    def __init__(self, start, size, records=None, count=None, not_modified=False,
+                 etag='', last_modified='', id_range=None):
+        self.start = start
+        self.size = size
+        self.records = records or []
+        self.count = len(self.records) if count is None else count
+        self.not_modified = not_modified
+        self.etag = etag
+        self.last_modified = last_modified
+        self._id_range = id_range
+
+    @property
+    def key(self):
+        """Clave de la página en SyncSource.validators"""
+        return f'{self.start}:{self.size}'
+
+    @property
+    def validators(self):
+        """Validadores HTTP a recordar para esta página, o None si la API no los envía"""
+        if not self.etag and not self.last_modified:
+            return None
+        return {
+            'etag': self.etag, 'last_modified': self.last_modified, 'count': self.count,
+            'id_range': self.id_range,
+        }
+
+    @property
+    def id_range(self):
+        """
+        [primer id, último id, ids] de los registros de la página, o None si no tiene ids válidos
+        Permite comprobar antes de confiar en un 304 que sus filas siguen en la tabla
+        """
+        if self.not_modified:
+            return self._id_range
+        ids = [
+            record['id'] for record in self.records
+            if isinstance(record, dict) and isinstance(record.get('id'), int)
+            and not isinstance(record['id'], bool)
+        ]
+        if not ids:
+            return None
+        return [min(ids), max(ids), len(set(ids))]
+
+
+class TodoPageFetcher:
+    """
+    Descarga los todos de la API externa en páginas (_start/_limit)
+    Las páginas se piden en paralelo sobre un pool acotado de hilos y se
+    entregan en cuanto llegan, para que el escritor las procese sin esperar al resto.
+    Con validators (ETag/Last-Modified por página) se envían peticiones condicionales.
+    """
+
+    def __init__(self, api_url, limit, page_size=None, max_workers=None,
+                 max_retries=None, retry_backoff=None, timeout=None, session=None,
+                 validators=None):
+        self.api_url = api_url
+        self.limit = limit
+        self.page_size = page_size or sync_setting('PAGE_SIZE')
+        self.max_workers = max_workers or sync_setting('MAX_WORKERS')
+        self.max_retries = sync_setting('MAX_RETRIES') if max_retries is None else max_retries
+        self.retry_backoff = sync_setting('RETRY_BACKOFF') if retry_backoff is None else retry_backoff
+        self.timeout = timeout or sync_setting('TIMEOUT')
+        self.session = session or get_session()
+        self.validators = validators or {}
+        self.fetched = 0
+
+    def _conditional_headers(self, start, size):
+        """Cabeceras If-None-Match / If-Modified-Since de la sincronización anterior"""
+        previous = self.validators.get(f'{start}:{size}')
+        headers = {}
+        if previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        return headers
+
+    def fetch_page(self, start, size):
+        """Descarga una página, reintentando con backoff exponencial"""
+        headers = self._conditional_headers(start, size)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(
+                    self.api_url,
+                    params={'_start': start, '_limit': size},
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+                if response.status_code == 304 and headers:
+                    previous = self.validators[f'{start}:{size}']
+                    return UpstreamPage(
+                        start, size,
+                        count=previous.get('count', 0),
+                        not_modified=True,
+                        etag=previous.get('etag', ''),
+                        last_modified=previous.get('last_modified', ''),
+                        id_range=previous.get('id_range'),
+                    )
+                response.raise_for_status()
+                records = response.json()
+                if not isinstance(records, list):
+                    raise ValueError('La API externa no devolvió una lista de registros')
+                return UpstreamPage(
+                    start, size, records,
+                    etag=response.headers.get('ETag', ''),
+                    last_modified=response.headers.get('Last-Modified', ''),
+                )
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                retryable = not isinstance(e, requests.HTTPError) or (
+                    e.response is not None and e.response.status_code in RETRY_STATUS_CODES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt))
+                attempt += 1
+
+    def pages(self):
+        """
+        Generador de páginas (UpstreamPage) en orden de llegada
+        La primera página se pide sola: si la API ignora la paginación y
+        devuelve más registros de los pedidos, se recorta al límite y se termina.
+        """
+        first_size = min(self.page_size, self.limit)
+        page = self.fetch_page(0, first_size)
+        if page.count > first_size and not page.not_modified:
+            page.records = page.records[:self.limit]
+            page.count = len(page.records)
+        self.fetched += len(page.records)
+        yield page
+        if page.count != first_size:
+            return
+
+        next_start = first_size
+        exhausted = False
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+        try:
+            while pending or (not exhausted and next_start < self.limit):
+                # Mantener como máximo dos páginas en vuelo por hilo
+                while not exhausted and next_start < self.limit and len(pending) < self.max_workers * 2:
+                    size = min(self.page_size, self.limit - next_start)
+                    pending[executor.submit(self.fetch_page, next_start, size)] = size
+                    next_start += size
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    size = pending.pop(future)
+                    page = future.result()
+                    if page.count < size:
+                        # Se alcanzó el final de los datos remotos
+                        exhausted = True
+                    page.records = page.records[:size]
+                    page.count = min(page.count, size)
+                    self.fetched += len(page.records)
+                    yield page
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def records(self):
+        """Itera registro a registro sobre todas las páginas descargadas"""
+        for page in self.pages():
+            yield from page.records
+
+
+def content_hash(record):
+    """Hash estable del contenido sincronizable de un registro ya validado"""
+    payload = json.dumps(
+        [record['userId'], record['title'], record['completed']],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def clean_record(todo_data):
+    """
+    Valida y normaliza un registro de la API externa
+    Lanza KeyError si falta un campo y ValueError si algún valor no es válido
+    """
+    if not isinstance(todo_data, dict):
+        raise ValueError("El registro no es un objeto JSON")
+
+    for field in REQUIRED_FIELDS:
+        if field not in todo_data:
+            raise KeyError(f"Campo requerido '{field}' no encontrado")
+
+    todo_id = int(todo_data['id'])
+    user_id = int(todo_data['userId'])
+    title = str(todo_data['title'])
+    if todo_id <= 0 or user_id <= 0:
+        raise ValueError("Los campos 'id' y 'userId' deben ser positivos")
+    if not isinstance(todo_data['completed'], bool):
+        raise ValueError("El campo 'completed' debe ser booleano")
+    if len(title) > 255:
+        raise ValueError("El título no puede exceder 255 caracteres")
+
+    return {
+        'id': todo_id,
+        'userId': user_id,
+        'title': title,
+        'completed': todo_data['completed'],
+    }
+
+
+class TodoSyncWriter:
+    """
+    Escribe los registros sincronizados por lotes
+    Por cada lote: una consulta de IDs existentes, bulk_create para los nuevos
+    y bulk_update (o upsert nativo si el backend lo soporta) para los existentes.
+    Los existentes cuyo hash de contenido no cambió se omiten (salvo full_sync).
+    Debe ejecutarse dentro de transaction.atomic() para aplicar todo en una transacción.
+    """
+
+    def __init__(self, overwrite=False, batch_size=None, full_sync=False):
+        self.overwrite = overwrite
+        self.full_sync = full_sync
+        self.batch_size = batch_size or sync_setting('BATCH_SIZE')
+        self.use_native_upsert = connection.features.supports_update_conflicts_with_target
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.processed = 0
+        self.errors = []
+
+    def skip_unchanged(self, count):
+        """Contabiliza registros de una página que la API reportó sin cambios (304)"""
+        self.processed += count
+        self.skipped += count
+
+    def write(self, todos_data):
+        """Procesa un iterable de registros de la API externa en lotes"""
+        batch = {}
+        for todo_data in todos_data:
+            self.processed += 1
+            record_id = todo_data.get('id', 'desconocido') if isinstance(todo_data, dict) else 'desconocido'
+            try:
+                record = clean_record(todo_data)
+            except KeyError as e:
+                self.errors.append(f"Registro {record_id}: Campo faltante {str(e)}")
+                continue
+            except (TypeError, ValueError) as e:
+                self.errors.append(f"Registro {record_id}: {str(e)}")
+                continue
+
+            # Si el mismo ID llega repetido, prevalece el último registro
+            record['content_hash'] = content_hash(record)
+            batch[record['id']] = record
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = {}
+
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """
+        Escribe un lote de registros ya validados
+        TodoCounters y la versión de la tabla se actualizan una sola vez por lote
+        """
+        with batched_counters() as delta:
+            self._write_batch(batch, delta)
+
+    def _write_batch(self, batch, delta):
+        """Inserta los registros nuevos y, con overwrite, reescribe los existentes que cambiaron"""
+        existing = {
+            todo_id: (todo_hash, (user_id, completed, synced))
+            for todo_id, todo_hash, user_id, completed, synced in
+            Todo.objects.filter(id__in=list(batch)).values_list(
+                'id', 'content_hash', 'userId', 'completed', 'synced_from_api'
+            )
+        }
+        now = timezone.now()
+        new_todos = [
+            Todo(synced_from_api=True, last_synced_at=now, **record)
+            for todo_id, record in batch.items() if todo_id not in existing
+        ]
+        for todo in new_todos:
+            delta.add_state((todo.userId, todo.completed, True))
+
+        if not self.overwrite:
+            self._assign_title_hashes(new_todos)
+            Todo.objects.bulk_create(new_todos, batch_size=self.batch_size)
+            if new_todos:
+                version_changed()
+                record_rows(new_todos)
+            self.created += len(new_todos)
+            self.skipped += len(existing)
+            return
+
+        existing_todos = [
+            Todo(synced_from_api=True, last_synced_at=now, updated_at=now, **record)
+            for todo_id, record in batch.items()
+            if todo_id in existing and (
+                self.full_sync or existing[todo_id][0] != record['content_hash']
+            )
+        ]
+        for todo in existing_todos:
+            delta.add_state(existing[todo.id][1], -1)
+            delta.add_state((todo.userId, todo.completed, True))
+
+        self._assign_title_hashes(new_todos + existing_todos)
+        if self.use_native_upsert:
+            # INSERT ... ON CONFLICT (id) DO UPDATE en una sola sentencia
+            Todo.objects.bulk_create(
+                new_todos + existing_todos,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=SYNC_UPDATE_FIELDS,
+            )
+        else:
+            Todo.objects.bulk_create(new_todos, batch_size=self.batch_size)
+            Todo.objects.bulk_update(existing_todos, SYNC_UPDATE_FIELDS, batch_size=self.batch_size)
+        if new_todos or existing_todos:
+            version_changed()
+            record_rows(new_todos + existing_todos)
+
+        self.created += len(new_todos)
+        self.updated += len(existing_todos)
+        self.skipped += len(existing) - len(existing_todos)
+
+    def _assign_title_hashes(self, todos):
+        """
+        Calcula title_hash de los todos a escribir
+        La API externa no está sujeta a la restricción de título único: si otro todo del
+        usuario (en la base o antes en el lote) ya usa el título, se guarda con title_hash NULL
+        """
+        if not todos:
+            return
+        for todo in todos:
+            todo.title_hash = hash_title(todo.title)
+        owners = {
+            (user_id, title_hash): todo_id
+            for todo_id, user_id, title_hash in Todo.objects.filter(
+                userId__in={todo.userId for todo in todos},
+                title_hash__in={todo.title_hash for todo in todos},
+            ).values_list('id', 'userId', 'title_hash')
+        }
+        for todo in todos:
+            if owners.setdefault((todo.userId, todo.title_hash), todo.id) != todo.id:
+                todo.title_hash = None
+
+    def results(self):
+        """Resumen de la sincronización en el formato de la respuesta de la API"""
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'total_processed': self.processed,
+            'errors_count': len(self.errors),
+        }
@@ -1,3 +1,2029 @@
-from django.test import TestCase
+"""
+Pruebas de la aplicación todos
+- Presupuesto de consultas SQL: cada petición se mide con la caché de respuestas vacía y
+  debe quedar dentro de QUERY_BUDGETS (todos/urls.py), con una tabla pequeña y con una
+  grande, para detectar N+1 y regresiones. Las lecturas se miden con el snapshot en memoria
+  sin cargar (el peor caso) y cargado; en ambos casos se comprueba que la petición no lo
+  recarga, porque esa lectura completa de la tabla sería una sola consulta de coste lineal.
+- Snapshot en memoria, instrumentación, métricas y perfilado.
+"""
+import csv
+import json
+import os
+import pstats
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import (
+    IntegrityError, OperationalError, close_old_connections, connection, connections, transaction,
+)
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Case, F, Value, When
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+import requests
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from benchmarks import endpoints as benchmark
+from benchmarks.upstream import FakeUpstream
+
+from . import bulk, metrics, profiling, urls
+from .cache import cache_setting
+from .counters import batched_counters, rebuild_counters, update_todos
+from .models import DUPLICATE_TITLE_MESSAGE, SyncJob, Todo, TodoCounters, hash_title
+from .renderers import CSVRenderer, FastJSONRenderer, MessagePackRenderer, msgpack
+from .search import TodoSearchFilter
+from .serializers import PROJECTION_SERIALIZERS, TodoIdTitleSerializer
+from .snapshot import MAX_INCREMENTAL_MOVES, _snapshot, current_snapshot
+from .stats import todo_statistics
+from .jobs import enqueue_sync_job, run_sync_job, run_sync_job_in_thread
+from .sync import TodoPageFetcher, TodoSyncWriter, content_hash, get_session
+from .transitions import STATUS_PARAMS, change_status, supports_update_returning, toggle_todos
+from .urls import QUERY_BUDGETS
+from .versioning import get_version
+
+# Sentencias de los bloques atomic anidados: no son consultas de la vista
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+USERS = 5
+
+
+@override_settings(TODOS_SNAPSHOT={'BACKGROUND_RELOAD': False})
+class TodoTestCase(TestCase):
+    """
+    Base de las pruebas: caché de respuestas vacía y snapshot en memoria sin cargar
+    El snapshot no se recarga en segundo plano (el hilo no vería los datos de la
+    transacción de la prueba); se carga con load_snapshot()
+    """
+
+    def setUp(self):
+        caches[cache_setting('ALIAS')].clear()
+        _snapshot.invalidate()
+
+    def load_snapshot(self):
+        _snapshot.load(get_version())
+
+    def counters(self):
+        # Un usuario sin todos conserva su fila a cero; rebuild_counters() no la crea
+        rows = TodoCounters.objects.order_by('userId').values_list('userId', 'total', 'completed', 'synced')
+        return [row for row in rows if row[1] or row[0] == TodoCounters.GLOBAL_USER_ID]
+
+    def assertCountersMatchRebuild(self):
+        """Los contadores incrementales coinciden con recalcularlos desde la tabla"""
+        counters = self.counters()
+        rebuild_counters()
+        self.assertEqual(counters, self.counters())
+
+    @contextmanager
+    def max_query_params(self, limit):
+        """Reduce max_query_params a limit y comprueba que ninguna sentencia lo supere"""
+        sizes = []
+
+        def record(execute, sql, params, many, context):
+            if not many:
+                sizes.append(len(params or ()))
+            return execute(sql, params, many, context)
+
+        with mock.patch.object(connection.features, 'max_query_params', limit), \
+                connection.execute_wrapper(record):
+            yield
+        self.assertLessEqual(max(sizes), limit)
+
+
+def route_names(patterns):
+    """Nombres de todas las rutas de una lista de urlpatterns (incluidas las del router)"""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class QueryBudgetMixin:
+    """Pruebas comunes; las subclases fijan el tamaño de la tabla y de los lotes"""
+    rows = None
+    bulk_items = None
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', cls.rows, users=USERS, seed=1, stdout=StringIO())
+        cls.job = SyncJob.objects.create(api_url='http://127.0.0.1:1/todos', limit=10)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.ids = list(Todo.objects.values_list('id', flat=True))
+
+    def assertWithinBudget(self, name, method, url=None, data=None, kwargs=None, warm=False):
+        """
+        Ejecuta la petición y comprueba el código de estado y el presupuesto de la ruta
+        warm=True la mide con el snapshot ya cargado; en ambos casos la petición no debe recargarlo
+        """
+        url = url or reverse(f'todos:{name}', kwargs=kwargs)
+        budget = QUERY_BUDGETS[name][method]
+        caches[cache_setting('ALIAS')].clear()
+        if warm:
+            self.load_snapshot()
+        else:
+            _snapshot.invalidate()
+        loaded_at = _snapshot.loaded_at
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method.lower())(url, data, format='json')
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].startswith(SAVEPOINT_PREFIXES)
+        ]
+        self.assertLess(response.status_code, 400, f'{method} {url}: {body[:300]!r}')
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{method} {url}: {len(queries)} consultas, presupuesto {budget}\n' + '\n'.join(queries)
+        )
+        self.assertEqual(_snapshot.loaded_at, loaded_at, f'{method} {url}: la petición recargó el snapshot')
+        if not warm:
+            self.assertIsNone(_snapshot.version, f'{method} {url}: la petición cargó el snapshot')
+        return response
+
+    def test_read_endpoints(self):
+        todo_id = self.ids[len(self.ids) // 2]
+        cases = [
+            ('api-root', None, None),
+            ('todo-list', None, None),
+            ('todo-list', '/api/todos/?cursor=', None),
+            ('todo-list', '/api/todos/?search=revisar', None),
+            ('todo-list', '/api/todos/?ordering=-id&completed=true', None),
+            ('todo-detail', None, {'pk': todo_id}),
+            ('todo-completed', None, None),
+            ('todo-pending', None, None),
+            ('todo-summary', None, None),
+            ('todos_ids_only', None, None),
+            ('todos_ids_only', '/api/todos-ids-only/?cursor=', None),
+            ('todos_ids_titles', None, None),
+            ('todos_pending_id_title', None, None),
+            ('todos_completed_id_title', None, None),
+            ('todos_completed_id_title', '/api/todos-completed-id-title/?cursor=', None),
+            ('todos_ids_users', '/api/todos-ids-users/?userId=1&completed=false', None),
+            ('todos_completed_id_user', None, None),
+            ('todos_pending_id_user', None, None),
+            ('api_stats', None, None),
+            ('user_todos', None, {'user_id': 1}),
+            ('user_todos', '/api/users/2/todos/?fields=ids_titles&completed=true', None),
+            ('export_todos', '/api/todos/export/?format=ndjson&fields=ids_users', None),
+            ('export_todos', '/api/todos/export/?format=json&fields=ids_titles', None),
+            ('sync_from_api', None, None),
+            ('sync_job_detail', None, {'pk': self.job.pk}),
+            ('api_documentation', None, None),
+            ('metrics', None, None),
+            ('profile_index', None, None),
+        ]
+        for name, url, kwargs in cases:
+            for warm in (False, True):
+                with self.subTest(name=name, url=url, warm=warm):
+                    self.assertWithinBudget(name, 'GET', url=url, kwargs=kwargs, warm=warm)
+
+    def test_single_writes(self):
+        response = self.assertWithinBudget(
+            'todo-list', 'POST', data={'userId': 1, 'title': 'Presupuesto nuevo', 'completed': False}
+        )
+        self.assertEqual(response.status_code, 201)
+        todo_id = Todo.objects.get(userId=1, title='Presupuesto nuevo').id
+        detail = {'pk': todo_id}
+        self.assertWithinBudget(
+            'todo-detail', 'PUT', kwargs=detail, data={'title': 'Presupuesto editado', 'completed': True}
+        )
+        self.assertWithinBudget('todo-detail', 'PATCH', kwargs=detail, data={'completed': False})
+        self.assertWithinBudget('todo-toggle-status', 'POST', kwargs=detail)
+        self.assertWithinBudget('todo-detail', 'DELETE', kwargs=detail)
+
+    def test_bulk_writes(self):
+        created = self.assertWithinBudget('todo-bulk', 'POST', data=[
+            {'userId': i % USERS + 1, 'title': f'Lote {i}', 'completed': i % 2 == 0}
+            for i in range(self.bulk_items)
+        ]).json()
+        self.assertEqual(created['succeeded'], self.bulk_items)
+        ids = [result['id'] for result in created['results']]
+        self.assertWithinBudget('todo-bulk', 'PATCH', data=[
+            {'id': todo_id, 'title': f'Lote editado {todo_id}'} for todo_id in ids
+        ])
+        self.assertWithinBudget('todo-bulk-status', 'POST', data={'ids': ids, 'completed': True})
+        self.assertWithinBudget('todo-bulk-status', 'POST', data={'ids': self.ids[:self.bulk_items]})
+        deleted = self.assertWithinBudget('todo-bulk', 'DELETE', data=ids).json()
+        self.assertEqual(deleted['succeeded'], self.bulk_items)
+        self.assertCountersMatchRebuild()
+
+    @override_settings(TODOS_SYNC={'JOB_BACKEND': 'command'})
+    def test_sync_enqueue(self):
+        response = self.assertWithinBudget(
+            'sync_from_api', 'POST', data={'api_url': 'http://127.0.0.1:2/todos', 'limit': 10}
+        )
+        self.assertEqual(response.status_code, 202)
+
+
+class SnapshotTests(TodoTestCase):
+    """El snapshot se mantiene con las escrituras conocidas y nunca se recarga en una petición"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 40, users=USERS, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def assertSnapshotMatchesTable(self):
+        snapshot = _snapshot.current(get_version())
+        self.assertIsNotNone(snapshot, 'El snapshot dejó de estar vigente')
+        rows = list(Todo.objects.order_by('id').values_list('id', 'userId', 'completed'))
+        self.assertEqual(
+            [(todo_id, user_id, bool(flags & 1)) for todo_id, user_id, flags in
+             zip(snapshot.ids, snapshot.users, snapshot.flags)],
+            rows
+        )
+        self.assertEqual(snapshot.statistics()['total'], len(rows))
+        self.assertEqual(snapshot.statistics()['completed'], sum(completed for _, _, completed in rows))
+
+    def test_request_does_not_load_snapshot(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('todos:api_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(_snapshot.version)
+        self.assertIsNone(current_snapshot())
+
+    def test_known_writes_keep_snapshot_fresh(self):
+        self.load_snapshot()
+        ids = list(Todo.objects.values_list('id', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.client.post(reverse('todos:todo-bulk'), [
+                {'userId': 1, 'title': f'Snapshot {i}', 'completed': i % 2 == 0} for i in range(3)
+            ], format='json').json()
+        self.assertSnapshotMatchesTable()
+        new_ids = [result['id'] for result in created['results']]
+        cases = [
+            ('PATCH', 'todo-bulk', [{'id': todo_id, 'userId': 2, 'completed': True} for todo_id in new_ids]),
+            ('POST', 'todo-bulk-status', {'ids': ids[:5], 'completed': True}),
+            ('POST', 'todo-bulk-status', {'ids': ids[3:8]}),
+            ('DELETE', 'todo-bulk', [ids[0], new_ids[0]]),
+        ]
+        for method, name, data in cases:
+            with self.subTest(method=method, name=name):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = getattr(self.client, method.lower())(reverse(f'todos:{name}'), data, format='json')
+                self.assertLess(response.status_code, 400, response.content[:300])
+                self.assertSnapshotMatchesTable()
+
+    def test_sync_batch_keeps_snapshot_fresh(self):
+        self.load_snapshot()
+        last = Todo.objects.order_by('-id').values_list('id', flat=True)[0]
+        records = [
+            {'id': last + i, 'userId': 3, 'title': f'Externo {i}', 'completed': i % 2 == 0}
+            for i in range(1, 4)
+        ] + [{'id': 1, 'userId': 4, 'title': 'Externo sobrescrito', 'completed': True}]
+        with self.captureOnCommitCallbacks(execute=True):
+            TodoSyncWriter(overwrite=True).write(records)
+        self.assertSnapshotMatchesTable()
+
+    def test_unknown_writes_invalidate_snapshot(self):
+        self.load_snapshot()
+        Todo.objects.filter(userId=1).update(completed=True)
+        self.assertIsNone(_snapshot.version)
+
+    def test_many_moves_invalidate_snapshot(self):
+        self.load_snapshot()
+        ids = list(Todo.objects.order_by('id').values_list('id', flat=True))[:MAX_INCREMENTAL_MOVES + 1]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('todos:todo-bulk'), ids, format='json')
+        self.assertIsNone(_snapshot.version)
+
+
+@override_settings(TODOS_SNAPSHOT={'BACKGROUND_RELOAD': True})
+class SnapshotBackgroundReloadTests(TransactionTestCase):
+    """La recarga se hace en un hilo: la petición que la dispara responde sin esperarla"""
+
+    def setUp(self):
+        _snapshot.invalidate()
+        Todo.objects.create(userId=1, title='Recarga en segundo plano')
+
+    def test_reload_in_background(self):
+        self.assertIsNone(current_snapshot())
+        thread = _snapshot.reload_thread
+        self.assertIsNotNone(thread)
+        thread.join(timeout=10)
+        snapshot = current_snapshot()
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot.statistics()['total'], 1)
+        _snapshot.invalidate()
+
+
+class BulkTests(TodoTestCase):
+    """/api/todos/bulk/: resultados por elemento, títulos duplicados y límites del lote"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse('todos:todo-bulk')
+        self.first = Todo.objects.create(userId=1, title='Comprar pan')
+        self.second = Todo.objects.create(userId=1, title='Lavar ropa')
+
+    def bulk(self, method, data, **kwargs):
+        kwargs.setdefault('format', 'json')
+        response = getattr(self.client, method)(self.url, data, **kwargs)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response.json()
+
+    def statuses(self, body):
+        return [result['status'] for result in body['results']]
+
+    def test_ndjson_input(self):
+        lines = '\n'.join([
+            '{"userId": 2, "title": "Primera línea"}',
+            '',
+            '{"userId": 2, "title": "Segunda línea", "completed": true}',
+        ])
+        body = self.bulk('post', lines, content_type='application/x-ndjson', format=None)
+        self.assertEqual(self.statuses(body), [201, 201])
+        self.assertTrue(Todo.objects.get(userId=2, title='Segunda línea').completed)
+
+        response = self.client.post(self.url, '{"userId": 2}\n{roto', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('línea 2', response.json()['detail'])
+
+    def test_per_item_errors(self):
+        body = self.bulk('post', [
+            {'userId': 2, 'title': 'Válido'},
+            {'userId': 2},
+            {'userId': 0, 'title': 'Usuario inválido'},
+            'no es un objeto',
+        ])
+        self.assertEqual(self.statuses(body), [201, 400, 400, 400])
+        self.assertEqual((body['succeeded'], body['failed'], body['success']), (1, 3, False))
+        self.assertIn('title', body['results'][1]['errors'])
+        self.assertEqual([result['index'] for result in body['results']], [0, 1, 2, 3])
+
+        body = self.bulk('patch', [
+            {'id': self.first.id, 'completed': True},
+            {'id': 999999, 'completed': True},
+            {'id': self.first.id, 'title': 'Repetido'},
+            {'title': 'Sin id'},
+            {'id': self.second.id, 'title': ''},
+        ])
+        self.assertEqual(self.statuses(body), [200, 404, 400, 400, 400])
+        self.assertTrue(Todo.objects.get(id=self.first.id).completed)
+
+        body = self.bulk('delete', [self.first.id, {'id': 999999}, self.first.id, 'x'])
+        self.assertEqual(self.statuses(body), [204, 404, 400, 400])
+        self.assertFalse(Todo.objects.filter(id=self.first.id).exists())
+
+    def test_duplicate_titles_ignore_case_and_whitespace(self):
+        body = self.bulk('post', [
+            {'userId': 1, 'title': '  COMPRAR   pan '},
+            {'userId': 2, 'title': 'Comprar pan'},
+            {'userId': 2, 'title': 'comprar PAN'},
+        ])
+        self.assertEqual(self.statuses(body), [400, 201, 400])
+        self.assertIn('non_field_errors', body['results'][0]['errors'])
+
+        body = self.bulk('patch', [{'id': self.second.id, 'title': 'comprar  PAN'}])
+        self.assertEqual(self.statuses(body), [400])
+        self.assertEqual(Todo.objects.get(id=self.second.id).title, 'Lavar ropa')
+
+    def test_rejects_swap_renames(self):
+        body = self.bulk('patch', [
+            {'id': self.first.id, 'title': 'Lavar ropa'},
+            {'id': self.second.id, 'title': 'Comprar pan'},
+        ])
+        self.assertEqual(self.statuses(body), [400, 400])
+        self.assertEqual(Todo.objects.get(id=self.first.id).title, 'Comprar pan')
+        self.assertEqual(Todo.objects.get(id=self.second.id).title, 'Lavar ropa')
+
+    def test_integrity_error_retry(self):
+        taken_titles = bulk._taken_titles
+        calls = []
+
+        def stale_first_read(keys):
+            # Simula otra petición que insertó el título después de la consulta
+            calls.append(keys)
+            return set() if len(calls) == 1 else taken_titles(keys)
+
+        with mock.patch('todos.bulk._taken_titles', stale_first_read):
+            body = self.bulk('post', [
+                {'userId': 1, 'title': 'Comprar pan'},
+                {'userId': 1, 'title': 'Nuevo tras el reintento'},
+            ])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.statuses(body), [400, 201])
+        self.assertEqual(Todo.objects.filter(userId=1).count(), 3)
+        self.assertCountersMatchRebuild()
+
+    def test_persistent_conflict(self):
+        # La consulta nunca ve el título ocupado: tras CREATE_ATTEMPTS se inserta elemento
+        # por elemento y solo el que choca con el índice único se informa con 409
+        with mock.patch('todos.bulk._taken_titles', side_effect=lambda keys: set()) as taken_titles:
+            body = self.bulk('post', [
+                {'userId': 1, 'title': 'Nuevo antes'},
+                {'userId': 1, 'title': 'comprar PAN'},
+                {'userId': 2, 'title': 'Nuevo después'},
+            ])
+        self.assertEqual(taken_titles.call_count, bulk.CREATE_ATTEMPTS)
+        self.assertEqual(self.statuses(body), [201, 409, 201])
+        self.assertIn('title', body['results'][1]['errors'])
+        self.assertEqual(
+            [Todo.objects.get(id=result['id']).title for result in body['results'][::2]],
+            ['Nuevo antes', 'Nuevo después']
+        )
+        self.assertCountersMatchRebuild()
+
+    def test_chunked_ids(self):
+        items = [{'userId': i % 3 + 1, 'title': f'Bloque {i}'} for i in range(12)]
+        with self.max_query_params(10):
+            body = self.bulk('post', items + [{'userId': 1, 'title': 'comprar pan'}])
+            self.assertEqual(self.statuses(body), [201] * 12 + [400])
+            ids = [result['id'] for result in body['results'][:12]]
+            body = self.bulk('delete', ids + [999999])
+        self.assertEqual(self.statuses(body), [204] * 12 + [404])
+        self.assertEqual(Todo.objects.count(), 2)
+        self.assertCountersMatchRebuild()
+
+    def test_max_bulk_items(self):
+        with mock.patch('todos.views.MAX_BULK_ITEMS', 2):
+            for method in ('post', 'patch', 'delete'):
+                with self.subTest(method=method):
+                    response = getattr(self.client, method)(self.url, [1, 2, 3], format='json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('2 elementos', response.json()['error'])
+            response = self.client.post(
+                reverse('todos:todo-bulk-status'), {'ids': [1, 2, 3]}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Todo.objects.count(), 2)
+
+
+class UniqueTitleTests(TodoTestCase):
+    """Restricción única (userId, title_hash): un título normalizado por usuario"""
+
+    def setUp(self):
+        super().setUp()
+        self.todo = Todo.objects.create(userId=1, title='Comprar pan')
+
+    def test_duplicate_title_rejected(self):
+        self.assertEqual(self.todo.title_hash, hash_title(' comprar  PAN'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Todo.objects.create(userId=1, title=' comprar  PAN')
+        # Otro usuario puede usar el mismo título
+        Todo.objects.create(userId=2, title='Comprar pan')
+
+        with self.assertRaisesMessage(ValidationError, DUPLICATE_TITLE_MESSAGE):
+            Todo(userId=1, title='COMPRAR PAN').validate_constraints()
+
+    def test_rename_updates_hash(self):
+        self.todo.title = 'Comprar leche'
+        self.todo.save(update_fields=['title'])
+        self.assertEqual(Todo.objects.get(id=self.todo.id).title_hash, hash_title('Comprar leche'))
+        # El título anterior queda libre
+        Todo.objects.create(userId=1, title='Comprar pan')
+
+    def test_null_hash_not_constrained(self):
+        # Duplicados previos a la restricción o de la API externa: title_hash NULL
+        TodoSyncWriter().write([upstream_record(100, 'Comprar pan'), upstream_record(101, 'comprar pan')])
+        self.assertEqual(
+            list(Todo.objects.filter(id__in=[100, 101]).values_list('title_hash', flat=True)), [None, None]
+        )
+
+
+class TitleHashMigrationTests(TransactionTestCase):
+    """Relleno de title_hash de la migración 0007: con duplicados solo el menor ID recibe el hash"""
+    before = ('todos', '0006_todo_search_index')
+    after = ('todos', '0007_todo_title_hash')
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([self.before])
+        self.executor.loader.build_graph()
+        self.apps = self.executor.loader.project_state([self.before]).apps
+        Todo = self.apps.get_model('todos', 'Todo')
+        self.ids = [
+            Todo.objects.create(userId=user_id, title=title).id for user_id, title in [
+                (1, 'Comprar pan'), (1, 'Lavar ropa'), (1, '  comprar   PAN '),
+                (2, 'Comprar pan'), (1, 'COMPRAR PAN'), (2, 'Lavar ropa'),
+            ]
+        ]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def expected_hashes(self):
+        keep = [True, True, False, True, False, True]
+        titles = ['Comprar pan', 'Lavar ropa', None, 'Comprar pan', None, 'Lavar ropa']
+        return {
+            todo_id: hash_title(title) if kept else None
+            for todo_id, kept, title in zip(self.ids, keep, titles)
+        }
+
+    def test_sqlite_backfill(self):
+        self.executor.migrate([self.after])
+        self.assertEqual(dict(Todo.objects.values_list('id', 'title_hash')), self.expected_hashes())
+
+    def test_python_backfill(self):
+        # Camino por bloques de los motores distintos de SQLite, sobre la tabla ya migrada
+        self.executor.migrate([self.after])
+        Todo.objects.update(title_hash=None)
+        self.executor.loader.build_graph()
+        apps = self.executor.loader.project_state([self.after]).apps
+        migration = import_module('todos.migrations.0007_todo_title_hash')
+        # En la migración el relleno corre antes de crear la restricción única
+        model = apps.get_model('todos', 'Todo')
+        constraint, = model._meta.constraints
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(model, constraint)
+        # Bloques de 2 filas: varios bloques de hash y de duplicados por anular
+        with mock.patch.object(migration, 'BACKFILL_CHUNK', 2):
+            migration.backfill_title_hash(apps, SimpleNamespace(connection=SimpleNamespace(vendor='other')))
+        with connection.schema_editor() as editor:
+            editor.add_constraint(model, constraint)
+        self.assertEqual(dict(Todo.objects.values_list('id', 'title_hash')), self.expected_hashes())
+
+
+class KeysetPaginationTests(TodoTestCase):
+    """Paginación por cursor: recorre por id y rechaza otro orden"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 30, users=3, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_cursor_walks_by_id(self):
+        ids = []
+        url = reverse('todos:todos_ids_only') + '?cursor=&page_size=7'
+        while url:
+            body = self.client.get(url).json()
+            ids += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(ids, list(Todo.objects.order_by('id').values_list('id', flat=True)))
+        self.assertIn('cursor', self.client.get(reverse('todos:api_documentation')).json()['pagination'])
+
+    def test_cursor_rejects_ordering(self):
+        for name in ('todos_ids_only', 'todos_ids_titles'):
+            with self.subTest(name=name):
+                url = reverse(f'todos:{name}')
+                response = self.client.get(url, {'cursor': '', 'ordering': '-id'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.json())
+                # El orden por id es el del cursor; sin cursor se admite cualquier orden
+                self.assertEqual(self.client.get(url, {'cursor': '', 'ordering': 'id'}).status_code, 200)
+                self.assertEqual(self.client.get(url, {'ordering': '-id'}).status_code, 200)
+
+
+class UserTodosTests(TodoTestCase):
+    """/api/users/{id}/todos/: estadísticas, cursor, filtro por estado y proyecciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 30, users=3, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse('todos:user_todos', kwargs={'user_id': 1})
+        self.todos = Todo.objects.filter(userId=1).order_by('id')
+
+    def walk(self, url, **params):
+        """Recorre todas las páginas siguiendo next; retorna (primera respuesta, filas)"""
+        first = body = self.client.get(url, {'page_size': 4, **params}).json()
+        rows = list(body['todos'])
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            rows += body['todos']
+        return first, rows
+
+    def assertStatistics(self, body, queryset):
+        expected = todo_statistics(queryset)
+        self.assertEqual(body['statistics'], {
+            'total': expected['total'],
+            'completed': expected['completed'],
+            'pending': expected['pending'],
+            'completion_rate_percentage': expected['completion_rate'],
+        })
+
+    def test_cursor_paging(self):
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot):
+                if snapshot:
+                    self.load_snapshot()
+                body, rows = self.walk(self.url)
+                self.assertEqual(body['user_id'], 1)
+                self.assertEqual(len(body['todos']), 4)
+                self.assertEqual([row['id'] for row in rows], list(self.todos.values_list('id', flat=True)))
+                self.assertStatistics(body, self.todos)
+
+    def test_completed_filter(self):
+        for completed in (True, False):
+            with self.subTest(completed=completed):
+                _, rows = self.walk(self.url, completed=str(completed).lower())
+                expected = self.todos.filter(completed=completed)
+                self.assertTrue(expected.exists())
+                self.assertEqual([row['id'] for row in rows], list(expected.values_list('id', flat=True)))
+                self.assertTrue(all(row['completed'] is completed for row in rows))
+
+    def test_projections(self):
+        for snapshot in (False, True):
+            if snapshot:
+                self.load_snapshot()
+            for projection, serializer_class in PROJECTION_SERIALIZERS.items():
+                with self.subTest(snapshot=snapshot, fields=projection):
+                    fields = serializer_class.Meta.fields
+                    _, rows = self.walk(self.url, fields=projection, completed='false')
+                    self.assertEqual(
+                        rows, list(self.todos.filter(completed=False).values(*fields))
+                    )
+
+    def test_unknown_projection(self):
+        response = self.client.get(self.url, {'fields': 'titles'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], list(PROJECTION_SERIALIZERS))
+
+    def test_unknown_user(self):
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot):
+                if snapshot:
+                    self.load_snapshot()
+                response = self.client.get(reverse('todos:user_todos', kwargs={'user_id': 99}))
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['total'], 0)
+
+    def test_missing_counter_row(self):
+        # Contadores sin reconstruir: las estadísticas salen de una agregación sobre la tabla
+        TodoCounters.objects.filter(userId=1).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertStatistics(response.json(), self.todos)
+        self.assertEqual(
+            self.client.get(reverse('todos:user_todos', kwargs={'user_id': 99})).status_code, 404
+        )
+
+
+class ExportTests(TodoTestCase):
+    """Exportación en streaming: el cuerpo completo coincide con la tabla en orden de id"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 40, users=3, seed=1, stdout=StringIO())
+        Todo.objects.create(userId=2, title='Café "con" leche, ñandú\ny más')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def export(self, export_format, **params):
+        """Cuerpo de la exportación ya decodificado a lista de filas"""
+        response = self.client.get(reverse('todos:export_todos'), {'format': export_format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode('utf-8')
+        if export_format == 'json':
+            return json.loads(body)
+        self.assertTrue(body == '' or body.endswith('\n'))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_export_body(self):
+        # Bloques pequeños para cruzar varias veces el límite entre bloques
+        with mock.patch('todos.views.EXPORT_CHUNK_SIZE', 7):
+            for export_format in ('ndjson', 'json'):
+                for projection, serializer_class in PROJECTION_SERIALIZERS.items():
+                    with self.subTest(format=export_format, fields=projection):
+                        fields = serializer_class.Meta.fields
+                        self.assertEqual(
+                            self.export(export_format, fields=projection),
+                            list(Todo.objects.order_by('id').values(*fields))
+                        )
+
+    def test_export_filters(self):
+        for export_format in ('ndjson', 'json'):
+            with self.subTest(format=export_format):
+                self.assertEqual(
+                    self.export(export_format, fields='ids_users', userId=2, completed='true'),
+                    list(Todo.objects.filter(userId=2, completed=True).order_by('id').values('id', 'userId'))
+                )
+                self.assertEqual(self.export(export_format, userId=99), [])
+
+    def test_export_errors(self):
+        url = reverse('todos:export_todos')
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'fields': 'titles'}).status_code, 400)
+
+
+class RendererTests(TodoTestCase):
+    """FastJSONRenderer, MessagePackRenderer y CSVRenderer sobre respuestas reales de la API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 12, users=3, seed=1, stdout=StringIO())
+        Todo.objects.create(userId=2, title='Café, "comillas"\u2028 y salto\nde línea', completed=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def response_data(self, name='todo-list'):
+        """Datos (antes de renderizar) de una respuesta de la API"""
+        response = self.client.get(reverse(f'todos:{name}'), {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_fast_json_matches_drf(self):
+        samples = [
+            self.response_data(),
+            self.response_data('todos_ids_titles'),
+            {
+                'decimal': Decimal('1.50'), 'fecha': timezone.now(), 'dia': timezone.now().date(),
+                'hora': timezone.now().time(), 'lazy': _('Título'), 'vacío': [],
+            },
+        ]
+        for data in samples:
+            with self.subTest(data=type(data).__name__):
+                expected = JSONRenderer().render(data)
+                self.assertEqual(FastJSONRenderer().render(data), expected)
+                with mock.patch('todos.renderers.orjson', None):
+                    self.assertEqual(FastJSONRenderer().render(data), expected)
+        # Con indentación (API navegable) se usa el renderer de DRF
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(samples[0], renderer_context=context),
+            JSONRenderer().render(samples[0], renderer_context=context)
+        )
+
+    @skipUnless(msgpack, 'msgpack no está instalado')
+    def test_msgpack_round_trip(self):
+        response = self.client.get(reverse('todos:todo-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        expected = json.loads(JSONRenderer().render(response.data))
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), expected)
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+    def test_csv(self):
+        response = self.client.get(reverse('todos:todos_ids_titles'), {'format': 'csv', 'page_size': 100})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(StringIO(response.content.decode('utf-8'))))
+        self.assertEqual(rows[0], ['id', 'title'])
+        self.assertEqual(rows[1:], [
+            [str(todo_id), title] for todo_id, title in Todo.objects.order_by('id').values_list('id', 'title')
+        ])
+
+    def test_csv_irregular_rows(self):
+        # Claves distintas por fila y valores anidados: unión de columnas y celdas JSON
+        content = CSVRenderer().render([{'id': 1, 'tags': ['a', 'ñ']}, {'id': 2, 'extra': None}])
+        self.assertEqual(list(csv.reader(StringIO(content.decode('utf-8')))), [
+            ['id', 'tags', 'extra'], ['1', '["a", "ñ"]', ''], ['2', '', ''],
+        ])
+        content = CSVRenderer().render({'total': 3})
+        self.assertEqual(content.decode('utf-8').splitlines(), ['total', '3'])
+
+
+class StatisticsTests(TodoTestCase):
+    """Estadísticas en una sola agregación y sus tres fuentes: tabla, contadores y snapshot"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 40, users=4, seed=3, stdout=StringIO())
+        Todo.objects.filter(id__lte=6).update(synced_from_api=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def expected(self, queryset):
+        todos = list(queryset.values_list('userId', 'completed', 'synced_from_api'))
+        total = len(todos)
+        completed = sum(1 for _, done, _ in todos if done)
+        return {
+            'total': total,
+            'completed': completed,
+            'pending': total - completed,
+            'completion_rate': round(completed / total * 100, 2) if total else 0,
+            'unique_users': len({user_id for user_id, _, _ in todos}),
+            'synced': sum(1 for _, _, synced in todos if synced),
+        }
+
+    def test_single_aggregate(self):
+        for user_id in (None, 2, 99):
+            queryset = Todo.objects.filter(userId=user_id) if user_id else Todo.objects.all()
+            with self.subTest(user_id=user_id):
+                with self.assertNumQueries(1):
+                    stats = todo_statistics(queryset, unique_users=True, synced=True)
+                self.assertEqual(stats, self.expected(queryset))
+        self.assertEqual(set(todo_statistics()), {'total', 'completed', 'pending', 'completion_rate'})
+
+    def test_endpoints_agree_across_sources(self):
+        expected = self.expected(Todo.objects.all())
+        sources = {
+            'tabla': lambda: TodoCounters.objects.all().delete(),
+            'contadores': rebuild_counters,
+            'snapshot': self.load_snapshot,
+        }
+        for source, prepare in sources.items():
+            with self.subTest(source=source):
+                caches[cache_setting('ALIAS')].clear()
+                prepare()
+                stats = self.client.get(reverse('todos:api_stats')).json()['statistics']
+                self.assertEqual(stats, {
+                    'total_todos': expected['total'],
+                    'completed_todos': expected['completed'],
+                    'pending_todos': expected['pending'],
+                    'unique_users': expected['unique_users'],
+                    'synced_from_external_api': expected['synced'],
+                    'completion_rate_percentage': expected['completion_rate'],
+                })
+                summary = self.client.get(reverse('todos:todo-summary')).json()
+                self.assertEqual(summary, {
+                    key: expected[key] for key in ('total', 'completed', 'pending', 'completion_rate')
+                })
+
+
+class ProjectionViewTests(TodoTestCase):
+    """Las siete vistas de proyección: solo las columnas del serializador, leídas con values()"""
+    VIEWS = {
+        'todos_ids_only': ({}, ['id']),
+        'todos_ids_titles': ({}, ['id', 'title']),
+        'todos_pending_id_title': ({'completed': False}, ['id', 'title']),
+        'todos_completed_id_title': ({'completed': True}, ['id', 'title']),
+        'todos_ids_users': ({}, ['id', 'userId']),
+        'todos_completed_id_user': ({'completed': True}, ['id', 'userId']),
+        'todos_pending_id_user': ({'completed': False}, ['id', 'userId']),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 30, users=3, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def rows(self, name, **params):
+        """Filas de todas las páginas (cursor)"""
+        response = self.client.get(reverse(f'todos:{name}'), {'cursor': '', **params})
+        rows = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            rows += body['results']
+            if not body['next']:
+                return rows
+            response = self.client.get(body['next'])
+
+    def test_projection_rows(self):
+        for snapshot in (False, True):
+            if snapshot:
+                self.load_snapshot()
+            for name, (filters, fields) in self.VIEWS.items():
+                with self.subTest(snapshot=snapshot, view=name):
+                    expected = Todo.objects.filter(**filters).order_by('id').values(*fields)
+                    self.assertEqual(self.rows(name), list(expected))
+                    self.assertEqual(
+                        self.rows(name, userId=2), list(expected.filter(userId=2))
+                    )
+
+    def test_selects_only_serializer_columns(self):
+        title_column = connection.ops.quote_name('title')
+        for name, (_, fields) in self.VIEWS.items():
+            with self.subTest(view=name):
+                caches[cache_setting('ALIAS')].clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.rows(name, ordering='id')
+                columns = [
+                    query['sql'].split(' FROM ')[0] for query in queries if 'FROM "todos_todo"' in query['sql']
+                ]
+                self.assertTrue(columns)
+                for selected in columns:
+                    self.assertEqual(title_column in selected, 'title' in fields)
+                    self.assertNotIn(connection.ops.quote_name('created_at'), selected)
+
+    def test_list_serializer_passes_rows_through(self):
+        rows = list(Todo.objects.order_by('id').values('id', 'title')[:3])
+        data = TodoIdTitleSerializer(rows, many=True).data
+        self.assertEqual(data, rows)
+        self.assertTrue(all(row is original for row, original in zip(data, rows)))
+        # Con instancias se usa la serialización normal de DRF
+        todos = list(Todo.objects.order_by('id')[:3])
+        self.assertEqual(
+            TodoIdTitleSerializer(todos, many=True).data, [{'id': t.id, 'title': t.title} for t in todos]
+        )
+
+
+class GenerateTodosTests(TodoTestCase):
+    """generate_todos: filas válidas, reproducibles con --seed y con índices, contadores y versión al día"""
+
+    def generate(self, count, **options):
+        call_command('generate_todos', count, stdout=StringIO(), **options)
+
+    def sqlite_objects(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT type, name FROM sqlite_master WHERE tbl_name = 'todos_todo' ORDER BY name"
+            )
+            return cursor.fetchall()
+
+    def test_generated_rows(self):
+        version = get_version()[0]
+        self.generate(
+            50, users=5, seed=7, completed_ratio=1, synced_ratio=1, batch_size=7, transaction_size=20
+        )
+        todos = list(Todo.objects.values_list('userId', 'title', 'title_hash', 'completed', 'last_synced_at'))
+        self.assertEqual(len(todos), 50)
+        self.assertTrue(all(1 <= user_id <= 5 for user_id, *_ in todos))
+        self.assertTrue(all(title_hash == hash_title(title) for _, title, title_hash, *_ in todos))
+        self.assertTrue(all(completed and synced_at for *_, completed, synced_at in todos))
+        self.assertEqual(get_version()[0], version + 1)
+        self.assertCountersMatchRebuild()
+
+        # Una segunda carga continúa la numeración de títulos: sin duplicados por usuario
+        self.generate(30, users=5, seed=7, completed_ratio=0)
+        self.assertEqual(Todo.objects.count(), 80)
+        self.assertEqual(Todo.objects.filter(completed=False).count(), 30)
+        self.assertCountersMatchRebuild()
+
+    def test_seed_is_reproducible(self):
+        runs = []
+        for _ in range(2):
+            self.generate(40, users=4, seed=11, distribution='zipf')
+            runs.append(list(Todo.objects.order_by('id').values_list('userId', 'title', 'completed')))
+            Todo.objects.all().delete()
+        self.assertEqual(runs[0], runs[1])
+        # Con zipf el primer usuario concentra más todos que el último
+        owners = [user_id for user_id, _, _ in runs[0]]
+        self.assertGreater(owners.count(1), owners.count(4))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Índices diferidos solo en SQLite')
+    def test_indexes_and_search_restored(self):
+        before = self.sqlite_objects()
+        self.generate(20, users=2, seed=1)
+        self.assertEqual(self.sqlite_objects(), before)
+        title = Todo.objects.order_by('id').values_list('title', flat=True).first()
+        response = APIClient().get(reverse('todos:todo-list'), {api_settings.SEARCH_PARAM: title})
+        self.assertIn(title, [todo['title'] for todo in response.json()['results']])
+        # Los triggers FTS siguen activos para las escrituras posteriores
+        Todo.objects.create(userId=1, title='Regar las plantillas')
+        response = APIClient().get(reverse('todos:todo-list'), {api_settings.SEARCH_PARAM: 'plantillas'})
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_invalid_arguments(self):
+        for args, options in [((0,), {}), ((10,), {'users': 0}), ((10,), {'completed_ratio': 1.5})]:
+            with self.subTest(args=args, **options), self.assertRaises(CommandError):
+                self.generate(*args, **options)
+        self.assertFalse(Todo.objects.exists())
+
+
+class SearchFilterTests(TodoTestCase):
+    """TodoSearchFilter lee el parámetro de self.search_param, como SearchFilter de DRF"""
+
+    def setUp(self):
+        super().setUp()
+        self.bread = Todo.objects.create(userId=1, title='Comprar pan integral')
+        Todo.objects.create(userId=1, title='Lavar ropa')
+
+    def search(self, backend, query):
+        request = Request(APIRequestFactory().get('/api/todos/', query))
+        return list(backend.filter_queryset(request, Todo.objects.all(), None))
+
+    def test_search_param(self):
+        self.assertEqual(TodoSearchFilter.search_param, api_settings.SEARCH_PARAM)
+        self.assertEqual(self.search(TodoSearchFilter(), {api_settings.SEARCH_PARAM: 'pan'}), [self.bread])
+
+        class QueryFilter(TodoSearchFilter):
+            search_param = 'q'
+
+        self.assertEqual(self.search(QueryFilter(), {'q': 'pan'}), [self.bread])
+        self.assertEqual(len(self.search(QueryFilter(), {'search': 'pan'})), 2)
+        self.assertEqual(QueryFilter().get_schema_operation_parameters(None)[0]['name'], 'q')
+
+
+class HTTPCacheTests(TodoTestCase):
+    """ETag / Last-Modified, 304 y caché de respuestas a través del cliente de pruebas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 10, users=2, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse('todos:todo-list')
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        for headers in [{'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_MODIFIED_SINCE': last_modified}]:
+            with self.subTest(headers=headers), self.assertNumQueries(1):
+                response = self.client.get(self.url, **headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+
+    def test_cache_hit(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Solo la lectura de la versión: la respuesta sale de la caché
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_write_invalidates(self):
+        first = self.client.get(self.url)
+        self.client.post(self.url, {'userId': 1, 'title': 'Invalida la caché'}, format='json')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['count'], first.json()['count'] + 1)
+
+    def test_etag_depends_on_format(self):
+        json_response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        csv_response = self.client.get(self.url, HTTP_ACCEPT='text/csv')
+        format_response = self.client.get(self.url, {'format': 'csv'})
+        self.assertTrue(csv_response['Content-Type'].startswith('text/csv'))
+        self.assertEqual(csv_response['X-Cache'], 'MISS')
+        etags = {json_response['ETag'], csv_response['ETag'], format_response['ETag']}
+        self.assertEqual(len(etags), 3)
+        # El ETag de otro formato no vale para este
+        response = self.client.get(self.url, HTTP_ACCEPT='text/csv', HTTP_IF_NONE_MATCH=json_response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, csv_response.content)
+
+
+class ResponseCacheTests(TodoTestCase):
+    """Caché de respuestas por endpoint: TTL de TODOS_CACHE, qué se guarda y qué escrituras la invalidan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 12, users=2, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.cache = caches[cache_setting('ALIAS')]
+        self.todo = Todo.objects.order_by('id').first()
+
+    def get(self, name='todo-list', params=None, **kwargs):
+        return self.client.get(reverse(f'todos:{name}', kwargs=kwargs), params)
+
+    @override_settings(TODOS_CACHE={'ALIAS': 'todos', 'DEFAULT_TIMEOUT': 5, 'TIMEOUTS': {'detail': 7}})
+    def test_endpoint_timeouts(self):
+        with mock.patch.object(self.cache, 'set', wraps=self.cache.set) as cache_set:
+            self.get('todo-detail', pk=self.todo.id)
+            self.get('api_stats')
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [7, 5])
+
+    @override_settings(TODOS_CACHE={'ALIAS': 'todos', 'TIMEOUTS': {'list': 0}})
+    def test_zero_timeout_disables(self):
+        for _ in range(2):
+            response = self.get()
+            self.assertNotIn('X-Cache', response)
+        self.assertEqual(self.get('todo-detail', pk=self.todo.id)['X-Cache'], 'MISS')
+
+    def test_key_includes_query_string(self):
+        self.assertEqual(self.get(params={'userId': 1})['X-Cache'], 'MISS')
+        self.assertEqual(self.get(params={'userId': 2})['X-Cache'], 'MISS')
+        self.assertEqual(self.get(params={'userId': 1})['X-Cache'], 'HIT')
+
+    def test_only_complete_responses_are_stored(self):
+        with mock.patch.object(self.cache, 'set', wraps=self.cache.set) as cache_set:
+            # Errores, HTML de la API navegable y exportaciones en streaming no se guardan
+            self.assertEqual(self.get('todos_ids_titles', {'cursor': 'x'}).status_code, 404)
+            self.client.get(reverse('todos:todo-list'), HTTP_ACCEPT='text/html')
+            self.get('export_todos')
+            cache_set.assert_not_called()
+            self.get()
+        (_, (status, headers, content), _), _ = cache_set.call_args
+        self.assertEqual(status, 200)
+        # Las cabeceras propias de cada respuesta no se reutilizan
+        self.assertFalse({'x-cache', 'set-cookie'} & {name.lower() for name, _ in headers})
+        self.assertEqual(self.get().content, content)
+
+    def test_every_write_path_invalidates(self):
+        writes = {
+            'guardar': lambda: Todo.objects.create(userId=1, title='Nuevo'),
+            'cambio de estado': lambda: self.client.post(
+                reverse('todos:todo-toggle-status', kwargs={'pk': self.todo.id})
+            ),
+            'lote': lambda: self.client.post(
+                reverse('todos:todo-bulk'), [{'userId': 2, 'title': 'En lote'}], format='json'
+            ),
+            'update()': lambda: Todo.objects.filter(userId=2).update(completed=True),
+            'sincronización': lambda: TodoSyncWriter().write([upstream_record(5000)]),
+            'borrado': lambda: Todo.objects.filter(title='Nuevo').delete(),
+        }
+        for write, apply in writes.items():
+            with self.subTest(write=write):
+                for name in ('todo-list', 'api_stats', 'todos_ids_titles'):
+                    self.get(name)
+                    self.assertEqual(self.get(name)['X-Cache'], 'HIT')
+                with self.captureOnCommitCallbacks(execute=True):
+                    apply()
+                for name in ('todo-list', 'api_stats', 'todos_ids_titles'):
+                    self.assertEqual(self.get(name)['X-Cache'], 'MISS', name)
+
+
+class CounterConsistencyTests(TodoTestCase):
+    """Cada vía de escritura deja TodoCounters igual que rebuild_counters()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 20, users=3, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.ids = list(Todo.objects.order_by('id').values_list('id', flat=True))
+        self.assertCountersMatchRebuild()
+
+    def request(self, method, name, data=None, **kwargs):
+        response = getattr(self.client, method)(reverse(f'todos:{name}', kwargs=kwargs), data, format='json')
+        self.assertLess(response.status_code, 400, response.content[:300])
+        return response
+
+    def test_create(self):
+        self.request('post', 'todo-list', {'userId': 9, 'title': 'Usuario nuevo', 'completed': True})
+        self.assertCountersMatchRebuild()
+
+    def test_update(self):
+        todo = Todo.objects.get(id=self.ids[0])
+        self.request('put', 'todo-detail', {
+            'userId': todo.userId % 3 + 1, 'title': 'Otro usuario', 'completed': not todo.completed
+        }, pk=todo.id)
+        self.request('patch', 'todo-detail', {'completed': todo.completed}, pk=todo.id)
+        self.assertCountersMatchRebuild()
+
+    def test_delete(self):
+        self.request('delete', 'todo-detail', pk=self.ids[0])
+        self.assertCountersMatchRebuild()
+
+    def test_toggle(self):
+        self.request('post', 'todo-toggle-status', pk=self.ids[0])
+        self.request('post', 'todo-bulk-status', {'ids': self.ids[:6], 'completed': True})
+        self.request('post', 'todo-bulk-status', {'ids': self.ids[3:9]})
+        self.assertCountersMatchRebuild()
+
+    def test_bulk(self):
+        created = self.request('post', 'todo-bulk', [
+            {'userId': i % 4 + 1, 'title': f'Lote {i}', 'completed': i % 2 == 0} for i in range(6)
+        ]).json()
+        self.assertCountersMatchRebuild()
+        new_ids = [result['id'] for result in created['results']]
+        self.request('patch', 'todo-bulk', [
+            {'id': todo_id, 'userId': 5, 'completed': True} for todo_id in new_ids[:3]
+        ])
+        self.assertCountersMatchRebuild()
+        self.request('delete', 'todo-bulk', new_ids[2:] + self.ids[:2])
+        self.assertCountersMatchRebuild()
+
+    def test_sync(self):
+        TodoSyncWriter().write([upstream_record(1000 + i, user_id=i % 2 + 1) for i in range(4)])
+        self.assertCountersMatchRebuild()
+        # Sobrescritura: cambia usuario, estado y marca como sincronizados los locales
+        TodoSyncWriter(overwrite=True).write(
+            [upstream_record(todo_id, f'Sobrescrito {todo_id}', True, 7) for todo_id in self.ids[:5]]
+        )
+        self.assertCountersMatchRebuild()
+
+    def test_update_todos(self):
+        update_todos(Todo.objects.filter(userId=1), completed=True)
+        update_todos(Todo.objects.filter(id__in=self.ids[:8]), synced_from_api=False, completed=False)
+        self.assertCountersMatchRebuild()
+
+    def test_queryset_update(self):
+        Todo.objects.filter(id__in=self.ids[:6]).update(completed=True, userId=8)
+        Todo.objects.filter(userId=2).update(synced_from_api=True)
+        self.assertCountersMatchRebuild()
+        # Expresiones: las variaciones no se conocen antes de escribir y se reconstruye
+        Todo.objects.filter(id__in=self.ids[4:12]).update(
+            completed=Case(When(completed=True, then=Value(False)), default=Value(True)),
+            userId=F('userId') + 1,
+        )
+        self.assertCountersMatchRebuild()
+        # Dentro de un lote se descartan las variaciones pendientes ya incluidas en la reconstrucción
+        with transaction.atomic(), batched_counters():
+            Todo.objects.filter(id=self.ids[0]).delete()
+            Todo.objects.filter(id__in=self.ids[1:3]).update(userId=F('userId') + 2)
+            Todo.objects.filter(id=self.ids[3]).update(completed=False)
+        self.assertCountersMatchRebuild()
+
+
+class TransitionTests(TodoTestCase):
+    """Cambios de estado con UPDATE ... RETURNING y con la alternativa de bloqueo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 12, users=3, seed=1, stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        self.ids = list(Todo.objects.order_by('id').values_list('id', flat=True))
+        Todo.objects.filter(id__in=self.ids).update(content_hash='abc')
+
+    def check_transitions(self):
+        self.load_snapshot()
+        before = dict(Todo.objects.values_list('id', 'completed'))
+        version = get_version()[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            toggled = toggle_todos(self.ids[:4] + self.ids[:1])
+        self.assertEqual(sorted(todo.id for todo in toggled), self.ids[:4])
+        for todo in toggled:
+            self.assertEqual(todo.completed, not before[todo.id])
+            self.assertEqual(todo.content_hash, '')
+        self.assertEqual(get_version()[0], version + 1)
+        self.assertIsNotNone(_snapshot.current(get_version()))
+        self.assertCountersMatchRebuild()
+
+        # Fijar el estado solo toca las filas que cambian
+        Todo.objects.filter(id__in=self.ids[:2]).update(completed=True)
+        Todo.objects.filter(id__in=self.ids[2:4]).update(completed=False)
+        self.assertCountersMatchRebuild()
+        self.load_snapshot()
+        version = get_version()[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = change_status(self.ids[:4], completed=True)
+        self.assertEqual(sorted(todo.id for todo in changed), self.ids[2:4])
+        self.assertTrue(all(todo.completed for todo in changed))
+        self.assertEqual(get_version()[0], version + 1)
+        snapshot = _snapshot.current(get_version())
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(
+            snapshot.statistics()['completed'], Todo.objects.filter(completed=True).count()
+        )
+        self.assertCountersMatchRebuild()
+
+        # Sin filas que cambiar no hay escritura ni nueva versión
+        version = get_version()
+        self.assertEqual(change_status(self.ids[:4], completed=True), [])
+        self.assertEqual(get_version(), version)
+
+    def test_chunked_ids(self):
+        for returning in (True, False):
+            if returning and not supports_update_returning():
+                continue
+            with self.subTest(returning=returning), \
+                    mock.patch('todos.transitions.supports_update_returning', return_value=returning):
+                before = dict(Todo.objects.values_list('id', 'completed'))
+                with self.max_query_params(STATUS_PARAMS + 5):
+                    toggled = toggle_todos(self.ids)
+                self.assertEqual(sorted(todo.id for todo in toggled), self.ids)
+                self.assertEqual(
+                    dict(Todo.objects.values_list('id', 'completed')),
+                    {todo_id: not completed for todo_id, completed in before.items()}
+                )
+                self.assertCountersMatchRebuild()
+
+    @skipUnless(supports_update_returning(), 'El motor no admite UPDATE ... RETURNING')
+    def test_returning_update(self):
+        self.check_transitions()
+
+    def test_locked_update(self):
+        with mock.patch('todos.transitions.supports_update_returning', return_value=False):
+            self.check_transitions()
+
+
+class ConcurrentToggleTests(TransactionTestCase):
+    """Alternar en paralelo no pierde cambios: cada toggle ve el estado del anterior"""
+    THREADS = 4
+    TOGGLES = 5
+
+    def run_toggles(self, todo_id):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def toggle():
+            # SQLite en memoria compartida no espera a los bloqueos (SQLITE_LOCKED):
+            # se reintenta la transacción completa, como haría un cliente
+            while True:
+                try:
+                    return toggle_todos([todo_id])
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.TOGGLES):
+                    toggle()
+            except Exception as e:  # pragma: no cover - se informa en la aserción
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(errors, [])
+
+    def check_concurrent_toggles(self):
+        todo = Todo.objects.create(userId=1, title='Alternado concurrente')
+        version = get_version()[0]
+        self.run_toggles(todo.id)
+        toggles = self.THREADS * self.TOGGLES
+        todo.refresh_from_db()
+        self.assertEqual(todo.completed, toggles % 2 == 1)
+        self.assertEqual(get_version()[0], version + toggles)
+        counters = TodoCounters.objects.get(userId=1)
+        self.assertEqual((counters.total, counters.completed), (1, int(todo.completed)))
+
+    @skipUnless(supports_update_returning(), 'El motor no admite UPDATE ... RETURNING')
+    def test_concurrent_returning_toggles(self):
+        self.check_concurrent_toggles()
+
+    def test_concurrent_locked_toggles(self):
+        with mock.patch('todos.transitions.supports_update_returning', return_value=False):
+            self.check_concurrent_toggles()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Solo para SQLite')
+class SQLiteConnectionTests(TestCase):
+    """Los PRAGMA de TODOS_SQLITE_PRAGMAS y BEGIN IMMEDIATE se aplican a cada conexión nueva"""
+    ALIAS = 'sqlite_file'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'todos.sqlite3')
+
+    def new_connection(self):
+        """Conexión nueva a una base de datos en archivo (la de pruebas está en memoria y no admite WAL)"""
+        wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': self.path}, alias=self.ALIAS)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.new_connection()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -65536)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # MEMORY
+        # La conexión de pruebas también los recibió al crearse (salvo WAL, en memoria)
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+
+        with override_settings(TODOS_SQLITE_PRAGMAS={'busy_timeout': 250, 'mmap_size': None}):
+            wrapper = self.new_connection()
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 250)
+            self.assertEqual(self.pragma(wrapper, 'mmap_size'), 0)
+
+    def test_immediate_transactions(self):
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        first = self.new_connection()
+        with override_settings(TODOS_SQLITE_PRAGMAS={'busy_timeout': 0}):
+            second = self.new_connection()
+            second.ensure_connection()
+        connections[self.ALIAS] = first
+        self.addCleanup(connections.__delitem__, self.ALIAS)
+        with CaptureQueriesContext(first) as queries, transaction.atomic(using=self.ALIAS):
+            self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+            # La transacción tiene el bloqueo de escritura desde BEGIN, sin haber escrito
+            with self.assertRaisesMessage(OperationalError, 'locked'):
+                second.cursor().execute('BEGIN IMMEDIATE')
+
+
+def upstream_record(todo_id, title=None, completed=False, user_id=1):
+    return {'id': todo_id, 'userId': user_id, 'title': title or f'Externo {todo_id}', 'completed': completed}
+
+
+class SyncWriterTests(TodoTestCase):
+    """Conteos de TodoSyncWriter: creados, actualizados, omitidos y errores por registro"""
+
+    def write(self, records, **options):
+        writer = TodoSyncWriter(batch_size=3, **options)
+        writer.write(records)
+        return writer.results()
+
+    def test_creates_and_skips_existing(self):
+        results = self.write([upstream_record(i) for i in range(1, 6)])
+        self.assertEqual((results['created'], results['updated'], results['skipped']), (5, 0, 0))
+        self.assertEqual(Todo.objects.filter(synced_from_api=True).count(), 5)
+        todo = Todo.objects.get(id=1)
+        self.assertEqual(todo.content_hash, content_hash(upstream_record(1)))
+
+        # Sin sobrescritura los existentes se omiten aunque hayan cambiado
+        results = self.write([upstream_record(1, 'Cambiado')] + [upstream_record(i) for i in range(6, 8)])
+        self.assertEqual((results['created'], results['updated'], results['skipped']), (2, 0, 1))
+        self.assertEqual(Todo.objects.get(id=1).title, 'Externo 1')
+
+    def test_overwrite_updates_only_changed_records(self):
+        self.write([upstream_record(i) for i in range(1, 6)])
+        records = [upstream_record(i) for i in range(1, 6)]
+        records[1] = upstream_record(2, completed=True)
+        records[3] = upstream_record(4, 'Renombrado')
+        results = self.write(records, overwrite=True)
+        self.assertEqual((results['created'], results['updated'], results['skipped']), (0, 2, 3))
+        self.assertTrue(Todo.objects.get(id=2).completed)
+        self.assertEqual(Todo.objects.get(id=4).title, 'Renombrado')
+
+        results = self.write(records, overwrite=True, full_sync=True)
+        self.assertEqual((results['created'], results['updated'], results['skipped']), (0, 5, 0))
+
+    def test_invalid_records_are_reported(self):
+        results = self.write([
+            upstream_record(1),
+            {'id': 2, 'userId': 1, 'title': 'Sin estado'},
+            upstream_record(3, completed='si'),
+            'no es un objeto',
+            upstream_record(1, 'Repetido'),
+        ])
+        self.assertEqual(results['total_processed'], 5)
+        self.assertEqual(results['errors_count'], 3)
+        self.assertEqual(results['created'], 1)
+        # Un ID repetido en el lote: prevalece el último registro
+        self.assertEqual(Todo.objects.get(id=1).title, 'Repetido')
+
+
+@override_settings(TODOS_SYNC={'PAGE_SIZE': 10, 'MAX_WORKERS': 2, 'RETRY_BACKOFF': 0.1})
+class SyncFetcherTests(TodoTestCase):
+    """Descarga por páginas, peticiones condicionales y reintentos de TodoPageFetcher"""
+
+    def setUp(self):
+        super().setUp()
+        self.upstream = FakeUpstream(rows=25, users=3).start()
+        self.addCleanup(self.upstream.stop)
+
+    def fetch(self, limit=30, **options):
+        fetcher = TodoPageFetcher(self.upstream.url, limit, **options)
+        return fetcher, sorted(fetcher.pages(), key=lambda page: page.start)
+
+    def test_pages_until_exhausted(self):
+        fetcher, pages = self.fetch(limit=100)
+        # Las páginas en vuelo tras el final llegan vacías
+        self.assertEqual(
+            [(page.start, page.count) for page in pages if page.count], [(0, 10), (10, 10), (20, 5)]
+        )
+        self.assertEqual(fetcher.fetched, 25)
+        self.assertEqual([record['id'] for page in pages for record in page.records], list(range(1, 26)))
+
+        fetcher, pages = self.fetch(limit=15)
+        self.assertEqual([(page.start, page.count) for page in pages], [(0, 10), (10, 5)])
+        self.assertEqual(fetcher.fetched, 15)
+
+    def test_conditional_requests(self):
+        _, pages = self.fetch()
+        validators = {page.key: page.validators for page in pages}
+        self.assertTrue(all(value['etag'] for value in validators.values()))
+
+        fetcher, pages = self.fetch(validators=validators)
+        self.assertTrue(all(page.not_modified for page in pages))
+        self.assertEqual([page.count for page in pages], [10, 10, 5])
+        self.assertEqual(fetcher.fetched, 0)
+
+        self.upstream.mutate()
+        _, pages = self.fetch(validators=validators)
+        self.assertFalse(any(page.not_modified for page in pages))
+
+        fetcher = TodoPageFetcher(self.upstream.url, 10, validators={
+            '0:10': {'etag': '"abc"', 'last_modified': 'Sat, 17 Oct 2026 10:00:00 GMT'}
+        })
+        self.assertEqual(fetcher._conditional_headers(0, 10), {
+            'If-None-Match': '"abc"', 'If-Modified-Since': 'Sat, 17 Oct 2026 10:00:00 GMT'
+        })
+        self.assertEqual(fetcher._conditional_headers(10, 10), {})
+
+    def test_retries_with_exponential_backoff(self):
+        self.upstream.fail(10, 503, 502)
+        with mock.patch('todos.sync.time.sleep') as sleep:
+            fetcher, pages = self.fetch()
+        self.assertEqual(fetcher.fetched, 25)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.1, 0.2])
+
+        # Sin reintentos para errores del cliente, ni más allá de MAX_RETRIES
+        for statuses in [(404,), (503,) * 4]:
+            with self.subTest(statuses=statuses):
+                self.upstream.fail(0, *statuses)
+                with mock.patch('todos.sync.time.sleep') as sleep:
+                    with self.assertRaises(requests.HTTPError):
+                        self.fetch(max_retries=3)
+                self.assertEqual(sleep.call_count, len(statuses) - 1)
+                self.upstream.failures.clear()
+
+
+    def test_pages_in_parallel(self):
+        fetch_page = TodoPageFetcher.fetch_page
+        lock = threading.Lock()
+        active = [0]
+        peak = [0]
+
+        def slow_fetch_page(fetcher, start, size):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                time.sleep(0.05)
+                return fetch_page(fetcher, start, size)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        self.upstream.rows = 100
+        with mock.patch.object(TodoPageFetcher, 'fetch_page', slow_fetch_page):
+            fetcher, pages = self.fetch(limit=100, page_size=10, max_workers=3)
+        self.assertEqual(fetcher.fetched, 100)
+        self.assertEqual([page.start for page in pages], list(range(0, 100, 10)))
+        # La primera página va sola; las demás, como máximo max_workers a la vez
+        self.assertEqual(peak[0], 3)
+
+    def test_shared_pooled_session(self):
+        with mock.patch('todos.sync._session', None), \
+                override_settings(TODOS_SYNC={'MAX_WORKERS': 6}):
+            session = get_session()
+            self.assertIs(get_session(), session)
+            self.assertIs(TodoPageFetcher(self.upstream.url, 10).session, session)
+            adapter = session.get_adapter(self.upstream.url)
+            self.assertEqual(adapter._pool_maxsize, 6)
+            self.assertIs(session.get_adapter('https://example.com/'), adapter)
+
+    def test_api_without_pagination(self):
+        # Una API que ignora _start/_limit devuelve todo en la primera página: se recorta al límite
+        records = [upstream_record(todo_id) for todo_id in range(1, 51)]
+        response = mock.Mock(status_code=200, headers={}, json=mock.Mock(return_value=records))
+        session = mock.Mock(get=mock.Mock(return_value=response))
+        fetcher = TodoPageFetcher('http://upstream.invalid/todos', 30, page_size=10, session=session)
+        pages = list(fetcher.pages())
+        self.assertEqual([page.count for page in pages], [30])
+        self.assertEqual([record['id'] for record in pages[0].records], list(range(1, 31)))
+        self.assertEqual(session.get.call_count, 1)
+
+@override_settings(TODOS_SYNC={'JOB_BACKEND': 'command', 'PAGE_SIZE': 10, 'BATCH_SIZE': 10})
+class SyncJobTests(TodoTestCase):
+    """Trabajos de sincronización contra una API externa simulada (benchmarks.upstream)"""
+
+    def setUp(self):
+        super().setUp()
+        self.upstream = FakeUpstream(rows=25, users=3).start()
+        self.addCleanup(self.upstream.stop)
+
+    def sync(self, **options):
+        job, created = enqueue_sync_job(self.upstream.url, 25, **options)
+        self.assertTrue(created)
+        job = run_sync_job(job.pk)
+        self.assertEqual(job.status, SyncJob.STATUS_COMPLETED, job.error)
+        return job
+
+    def test_unchanged_pages_are_skipped(self):
+        first = self.sync(overwrite_existing=True)
+        self.assertEqual((first.created, first.updated, first.skipped), (25, 0, 0))
+        requests = self.upstream.requests
+        second = self.sync(overwrite_existing=True)
+        self.assertEqual((second.created, second.updated, second.skipped), (0, 0, 25))
+        # Tres páginas, todas 304
+        self.assertEqual(self.upstream.requests - requests, 3)
+
+    def test_overwrite_restores_local_edits(self):
+        self.sync(overwrite_existing=True)
+        todo = Todo.objects.get(id=7)
+        todo.title = 'Editado localmente'
+        todo.save()
+        self.assertEqual(todo.content_hash, '')
+
+        # Sin sobrescritura las páginas 304 siguen valiendo
+        kept = self.sync()
+        self.assertEqual(kept.skipped, 25)
+        self.assertEqual(Todo.objects.get(id=7).title, 'Editado localmente')
+
+        restored = self.sync(overwrite_existing=True)
+        self.assertEqual((restored.created, restored.updated, restored.skipped), (0, 1, 24))
+        todo.refresh_from_db()
+        self.assertEqual(todo.title, self.upstream.record(7)['title'])
+        self.assertNotEqual(todo.content_hash, '')
+
+    def test_resync_restores_local_deletes(self):
+        for options in ({}, {'overwrite_existing': True}):
+            with self.subTest(**options):
+                self.sync(**options)
+                Todo.objects.filter(id__in=[7, 21]).delete()
+                job = self.sync(**options)
+                # Las páginas con filas borradas se piden sin validadores; la del medio sigue en 304
+                self.assertEqual((job.created, job.updated, job.skipped), (2, 0, 23))
+                self.assertEqual(
+                    list(Todo.objects.order_by('id').values_list('id', flat=True)), list(range(1, 26))
+                )
+                Todo.objects.all().delete()
+
+    def test_each_page_in_its_own_transaction(self):
+        flush = TodoSyncWriter._flush
+        calls = []
+
+        def failing_second_page(writer, batch):
+            calls.append(batch)
+            flush(writer, batch)
+            if len(calls) == 2:
+                raise RuntimeError('Fallo al escribir la página')
+
+        job, _ = enqueue_sync_job(self.upstream.url, 25)
+        with mock.patch.object(TodoSyncWriter, '_flush', failing_second_page), \
+                self.assertLogs('todos.jobs', 'ERROR'):
+            job = run_sync_job(job.pk)
+        self.assertEqual(job.status, SyncJob.STATUS_FAILED)
+        self.assertIn('Fallo al escribir la página', job.error)
+        # La primera página queda confirmada; la que falló se revierte entera
+        self.assertEqual(list(Todo.objects.order_by('id').values_list('id', flat=True)), list(range(1, 11)))
+
+
+
+@override_settings(TODOS_SYNC={'JOB_BACKEND': 'command', 'PAGE_SIZE': 10})
+class SyncQueueTests(TodoTestCase):
+    """/api/sync/ encola el trabajo sin esperar a la API externa y /api/sync/jobs/{id}/ informa su estado"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.upstream = FakeUpstream(rows=25, users=3).start()
+        self.addCleanup(self.upstream.stop)
+
+    def enqueue(self, **data):
+        response = self.client.post(
+            reverse('todos:sync_from_api'), {'api_url': self.upstream.url, 'limit': 25, **data}, format='json'
+        )
+        self.assertEqual(response.status_code, 202, response.content[:300])
+        return response.json()
+
+    def test_enqueue_and_status(self):
+        body = self.enqueue()
+        self.assertFalse(body['deduplicated'])
+        self.assertEqual(body['job']['status'], SyncJob.STATUS_PENDING)
+        # La petición no descarga ni escribe nada
+        self.assertEqual(self.upstream.requests, 0)
+        self.assertFalse(Todo.objects.exists())
+
+        # Un trabajo activo para la misma URL se reutiliza
+        again = self.enqueue(overwrite_existing=True)
+        self.assertTrue(again['deduplicated'])
+        self.assertEqual(again['job_id'], body['job_id'])
+
+        run_sync_job(body['job_id'])
+        job = self.client.get(body['status_url']).json()
+        self.assertEqual(job['status'], SyncJob.STATUS_COMPLETED)
+        self.assertEqual((job['fetched'], job['created'], job['errors_count']), (25, 25, 0))
+        self.assertIsNotNone(job['duration_seconds'])
+        self.assertFalse(self.enqueue()['deduplicated'])
+
+    def test_failed_job(self):
+        self.upstream.fail(0, 404)
+        body = self.enqueue()
+        run_sync_job(body['job_id'])
+        job = self.client.get(body['status_url']).json()
+        self.assertEqual(job['status'], SyncJob.STATUS_FAILED)
+        self.assertIn('404', job['error'])
+        self.assertEqual(
+            self.client.get(reverse('todos:sync_job_detail', args=[body['job_id'] + 1])).status_code, 404
+        )
+
+    def test_stale_jobs_expire(self):
+        job, _ = enqueue_sync_job(self.upstream.url, 25)
+        SyncJob.objects.filter(pk=job.pk).update(
+            status=SyncJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=2)
+        )
+        new_job, created = enqueue_sync_job(self.upstream.url, 25)
+        self.assertTrue(created)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_FAILED)
+        self.assertIn('expiró', job.error)
+        self.assertNotEqual(new_job.pk, job.pk)
+
+    @override_settings(TODOS_SYNC={'JOB_BACKEND': 'thread'})
+    def test_thread_backend_submits_on_commit(self):
+        executor = mock.Mock()
+        with mock.patch('todos.jobs.get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks() as callbacks:
+                job, _ = enqueue_sync_job(self.upstream.url, 25)
+                executor.submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        executor.submit.assert_called_once_with(run_sync_job_in_thread, job.pk)
+
+
+@override_settings(TODOS_SYNC={'JOB_BACKEND': 'command', 'PAGE_SIZE': 10})
+class SyncWorkerCommandTests(TransactionTestCase):
+    """run_sync_jobs --once ejecuta los trabajos en cola en su pool de hilos y termina"""
+
+    def test_run_sync_jobs_once(self):
+        upstream = FakeUpstream(rows=25, users=3).start()
+        self.addCleanup(upstream.stop)
+        jobs = [enqueue_sync_job(upstream.url, 25)[0], enqueue_sync_job(upstream.url + '?copia=1', 5)[0]]
+        stdout = StringIO()
+        # Un hilo: SQLite en memoria compartida no espera a los bloqueos entre conexiones
+        call_command('run_sync_jobs', '--once', '--workers', '1', stdout=stdout)
+        self.assertEqual(
+            list(SyncJob.objects.order_by('id').values_list('status', flat=True)),
+            [SyncJob.STATUS_COMPLETED] * 2
+        )
+        self.assertEqual(Todo.objects.count(), 25)
+        for job in jobs:
+            self.assertIn(f'Sync #{job.id} completed', stdout.getvalue())
+
+# Sin muestreo de instrumentación: un EXPLAIN de consulta lenta contaría como consulta
+NO_INSTRUMENTATION = override_settings(TODOS_INSTRUMENTATION={'ENABLED': False})
+
+
+@NO_INSTRUMENTATION
+class SmallDatasetQueryBudgetTests(QueryBudgetMixin, TodoTestCase):
+    rows = 10
+    bulk_items = 3
+
+
+@NO_INSTRUMENTATION
+class LargeDatasetQueryBudgetTests(QueryBudgetMixin, TodoTestCase):
+    rows = 3000
+    # Un solo bloque de escritura (ver QUERY_BUDGETS)
+    bulk_items = 90
+
+
+class QueryBudgetCoverageTests(TodoTestCase):
+    def test_every_route_has_budget(self):
+        """Toda ruta de la aplicación declara su presupuesto y no sobran presupuestos"""
+        self.assertEqual(route_names(urls.urlpatterns), set(QUERY_BUDGETS))
+
+
+class SQLInstrumentationTests(TodoTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 50, users=USERS, seed=1, stdout=StringIO())
+
+    @override_settings(TODOS_INSTRUMENTATION={'SAMPLE_RATE': 1.0, 'SLOW_QUERY_MS': 0})
+    def test_server_timing_header(self):
+        response = self.client.get('/api/users/1/todos/')
+        metrics = dict(
+            item.strip().split(';', 1) for item in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(metrics), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="3 consultas"', metrics['db'])
+
+    @override_settings(TODOS_INSTRUMENTATION={'SAMPLE_RATE': 0.0})
+    def test_unsampled_request_has_no_header(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/todos/'))
+
+    @override_settings(TODOS_INSTRUMENTATION={'SAMPLE_RATE': 1.0, 'SLOW_QUERY_MS': 1e-6})
+    def test_slow_queries_logged_with_plan(self):
+        with self.assertLogs('todos.sql', 'WARNING') as logs:
+            self.client.get('/api/todos/')
+        self.assertIn('Plan:', logs.output[0])
+        self.assertEqual(sum('Plan:' in line for line in logs.output), 3)
+
+
+class MetricsTests(TodoTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_requests_recorded_per_url_name(self):
+        Todo.objects.create(userId=1, title='Métricas')
+        self.client.get('/api/users/1/todos/')
+        self.client.get('/api/users/1/todos/')
+        self.client.get('/no-existe/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'todos_http_requests_total{view="todos:user_todos",method="GET",status="200"} 2', text
+        )
+        self.assertIn('todos_http_requests_total{view="<unresolved>",method="GET",status="404"} 1', text)
+        self.assertIn(
+            'todos_http_request_duration_seconds_bucket{view="todos:user_todos",method="GET",le="+Inf"} 2',
+            text
+        )
+        self.assertIn('todos_http_request_duration_seconds_count{view="todos:user_todos",method="GET"} 2', text)
+        self.assertRegex(text, r'todos_http_db_queries_total\{view="todos:user_todos"\} [1-9]')
+        self.assertRegex(text, r'todos_http_response_bytes_total\{view="todos:user_todos"\} [1-9]')
+
+    def test_multiprocess_files_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.MetricsRegistry(metrics.metrics_setting('BUCKETS'))
+            other.record('todos:todo-list', 'GET', 200, 0.02, 0.001, 3, 100)
+            other.flush(directory)
+            os.rename(
+                os.path.join(directory, f'todos-metrics-{os.getpid()}.json'),
+                os.path.join(directory, 'todos-metrics-1.json')
+            )
+            with override_settings(TODOS_METRICS={'MULTIPROCESS_DIR': directory}):
+                self.client.get('/api/todos/')
+                text = self.client.get('/metrics').content.decode()
+        self.assertIn('todos_http_requests_total{view="todos:todo-list",method="GET",status="200"} 2', text)
+        self.assertIn('todos_http_request_duration_seconds_count{view="todos:todo-list",method="GET"} 2', text)
+
+
+    def test_dead_process_files_are_archived(self):
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            for pid in (dead.pid, 1):
+                other = metrics.MetricsRegistry(metrics.metrics_setting('BUCKETS'))
+                other.record('todos:todo-list', 'GET', 200, 0.02, 0.001, 3, 100)
+                metrics._write_state(os.path.join(directory, f'todos-metrics-{pid}.json'), other.state())
+            with override_settings(TODOS_METRICS={'MULTIPROCESS_DIR': directory}):
+                for _ in range(2):
+                    text = self.client.get('/metrics').content.decode()
+                    # Lo del proceso terminado se cuenta una sola vez
+                    self.assertIn(
+                        'todos_http_requests_total{view="todos:todo-list",method="GET",status="200"} 2', text
+                    )
+            files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        self.assertEqual(files, [
+            'todos-metrics-1.json', f'todos-metrics-{os.getpid()}.json', 'todos-metrics-archive.json'
+        ])
+
+    def test_access_restricted(self):
+        url = reverse('todos:metrics')
+        self.assertEqual(self.client.get(url).status_code, 200)  # REMOTE_ADDR 127.0.0.1
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.5').status_code, 403)
+        with override_settings(TODOS_METRICS={'ALLOWED_IPS': ['203.0.113.0/24']}):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.5').status_code, 200)
+            self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(TODOS_METRICS={'ALLOWED_IPS': None}):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.5').status_code, 200)
+
+        self.client.force_login(User.objects.create_user('metricas', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.5').status_code, 200)
+
+
+class ProfilingTests(TodoTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 20, users=USERS, seed=1, stdout=StringIO())
+        cls.staff = User.objects.create_user('perfiles', password='x', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_override = override_settings(TODOS_PROFILING={'DIRECTORY': directory.name})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.directory = directory.name
+
+    def profiled_functions(self, name):
+        stats = pstats.Stats(os.path.join(self.directory, name))
+        return {function for _, _, function in stats.stats}
+
+    def test_signed_header_profiles_view_and_render(self):
+        response = self.client.get(
+            '/api/stats/', HTTP_X_TODOS_PROFILE=profiling.make_token(), HTTP_X_REQUEST_ID='abc-123'
+        )
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Id']
+        self.assertIn('-abc-123-todos_api_stats.prof', name)
+        self.assertTrue({'api_stats', 'render'} <= self.profiled_functions(name))
+
+    @override_settings(TODOS_INSTRUMENTATION={'SAMPLE_RATE': 1.0, 'SLOW_QUERY_MS': None})
+    def test_middleware_hooks_keep_their_order(self):
+        # El perfil envuelve la cadena completa: los hooks del resto de middlewares siguen
+        # ejecutándose como sin perfilado (la respuesta pasa por process_template_response)
+        response = self.client.get('/api/stats/', HTTP_X_TODOS_PROFILE=profiling.make_token())
+        self.assertIn('render;dur=', response['Server-Timing'])
+        functions = self.profiled_functions(response['X-Profile-Id'])
+        self.assertTrue({'process_view', 'process_template_response', 'api_stats', 'render'} <= functions)
+
+    def test_invalid_or_missing_token_is_not_profiled(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/stats/', HTTP_X_TODOS_PROFILE='falso'))
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/users/1/todos/'))
+        self.assertEqual(profiling.recent_profiles(), [])
+
+    def test_allowed_views(self):
+        with override_settings(TODOS_PROFILING={
+            'DIRECTORY': self.directory, 'ALLOWED_VIEWS': ['todos:todo-list', 'todos:user_todos'],
+            'MAX_PROFILES': 2,
+        }):
+            self.client.get('/api/todos/')
+            self.client.get('/api/users/1/todos/')
+            self.client.get('/api/users/2/todos/')
+            self.assertNotIn('X-Profile-Id', self.client.get('/api/stats/'))
+            profiles = profiling.recent_profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertIn('user_todos', self.profiled_functions(profiles[0]['name']))
+
+    def test_index_and_download_are_staff_only(self):
+        name = self.client.get('/api/stats/', HTTP_X_TODOS_PROFILE=profiling.make_token())['X-Profile-Id']
+        download = reverse('todos:profile_download', args=[name])
+        self.assertEqual(self.client.get(reverse('todos:profile_index')).status_code, 302)
+        self.assertEqual(self.client.get(download).status_code, 302)
+
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('todos:profile_index')), name)
+        response = self.client.get(download)
+        self.assertEqual(response.status_code, 200)
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            self.assertEqual(b''.join(response.streaming_content), f.read())
+        response.close()
+        self.assertEqual(self.client.get(reverse('todos:profile_download', args=['x.prof'])).status_code, 404)
+
+
+class BenchmarkTests(TodoTestCase):
+    """benchmarks.endpoints: percentiles, resumen por endpoint, reparto de peticiones y rutas medidas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_todos', 30, users=USERS, seed=1, stdout=StringIO())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([benchmark.percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(benchmark.percentile([7], 99), 7)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_summarize(self):
+        result = benchmark.summarize([0.004, 0.001, 0.003, 0.002], 1, 2.0, queries=3)
+        self.assertEqual(result, {
+            'requests': 4, 'errors': 1, 'throughput_rps': 2.0, 'mean_ms': 2.5, 'max_ms': 4.0,
+            'queries': 3, 'p50_ms': 2.0, 'p95_ms': 4.0, 'p99_ms': 4.0,
+        })
+        empty = benchmark.summarize([], 0, 0)
+        self.assertIsNone(empty['throughput_rps'])
+        self.assertIsNone(empty['p99_ms'])
+
+    def test_expand(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            todo_id, user_id = benchmark.expand('{id}/{user}', rng, 30, USERS).split('/')
+            self.assertTrue(1 <= int(todo_id) <= 30)
+            self.assertTrue(1 <= int(user_id) <= USERS)
+        self.assertEqual(benchmark.expand('/api/stats/', rng, 30, USERS), '/api/stats/')
+
+    def test_endpoints_answer(self):
+        # Las rutas medidas existen y responden 200 sobre datos de generate_todos
+        transport = benchmark.TestClientTransport()
+        rng = random.Random(1)
+        for name, path in benchmark.ENDPOINTS.items():
+            with self.subTest(name):
+                status, content = transport.request('GET', benchmark.expand(path, rng, 30, USERS))
+                self.assertEqual(status, 200)
+                self.assertTrue(content)
+                self.assertGreater(benchmark.count_queries(path, 30, USERS), 0)
+
+    def test_run_endpoint(self):
+        # Cada hilo calienta con su propio transporte y las peticiones medidas se reparten
+        # entre los hilos sin pasarse de args.requests; los >= 400 cuentan como errores
+        paths, transports = [], []
+        lock = threading.Lock()
+
+        class Transport:
+            def __init__(self):
+                self.closed = False
+                transports.append(self)
+
+            def request(self, method, path, body=None):
+                with lock:
+                    paths.append(path)
+                    return (404 if len(paths) % 3 == 0 else 200), b'{}'
+
+            def close(self):
+                self.closed = True
+
+        args = SimpleNamespace(requests=25, concurrency=3, warmup=2, seed=1, rows=30, users=USERS)
+        latencies, errors, elapsed = benchmark.run_endpoint(Transport, '/api/todos/{id}/', args)
+        self.assertEqual(len(latencies), 25)
+        self.assertEqual(len(paths), 25 + 3 * 2)
+        self.assertEqual(len(transports), 3)
+        self.assertTrue(all(transport.closed for transport in transports))
+        self.assertGreater(errors, 0)
+        self.assertGreaterEqual(elapsed, 0)
+
+    def test_print_results_compares(self):
+        results = {'stats': benchmark.summarize([0.002] * 4, 0, 1.0, queries=1)}
+        previous = {'stats': benchmark.summarize([0.004] * 2, 0, 1.0, queries=1)}
+        output = StringIO()
+        with redirect_stdout(output):
+            benchmark.print_results(results, previous)
+        header, line = output.getvalue().splitlines()
+        self.assertIn('Δ p50', header)
+        self.assertTrue(line.startswith('stats'))
+        self.assertIn('-50.0%', line)
+        self.assertIn('+100.0%', line)
@@ -0,0 +1,109 @@
+"""
+Cambios de estado (completado / pendiente) sin lectura previa
+Un solo UPDATE ... SET completed = NOT completed ... RETURNING cambia el estado y
+devuelve las filas resultantes, sin get_object() ni save() de la fila completa, y sin
+carreras entre peticiones concurrentes. En motores sin UPDATE ... RETURNING se bloquean
+las filas, se actualizan y se vuelven a leer dentro de la misma transacción.
+Las filas resultantes se aplican al snapshot en memoria al confirmar (record_rows).
+"""
+from django.db import connection, models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .counters import batched_counters, query_param_chunks
+from .models import Todo
+from .snapshot import record_rows
+
+
+# Parámetros de las sentencias de change_status además de los IDs
+# (completed, updated_at, content_hash y los valores del CASE)
+STATUS_PARAMS = 5
+
+
+def supports_update_returning(conn=None):
+    """True si el motor admite UPDATE ... RETURNING (PostgreSQL y SQLite 3.35+)"""
+    conn = conn or connection
+    if conn.vendor == 'postgresql':
+        return True
+    if conn.vendor == 'sqlite':
+        return conn.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def _returning_update(ids, completed, now):
+    """UPDATE ... RETURNING de todas las columnas; retorna instancias de Todo"""
+    meta = Todo._meta
+    quote = connection.ops.quote_name
+
+    def column(name):
+        return quote(meta.get_field(name).column)
+
+    columns = ', '.join(quote(field.column) for field in meta.concrete_fields)
+    updated_at = meta.get_field('updated_at').get_db_prep_save(now, connection)
+    placeholders = ', '.join(['%s'] * len(ids))
+
+    if completed is None:
+        assignment, condition, params = f'NOT {column("completed")}', '', [updated_at]
+    else:
+        assignment, condition = '%s', f' AND {column("completed")} <> %s'
+        params = [completed, updated_at]
+    sql = (
+        f'UPDATE {quote(meta.db_table)} '
+        f'SET {column("completed")} = {assignment}, {column("updated_at")} = %s, '
+        f"{column('content_hash')} = '' "
+        f'WHERE {quote(meta.pk.column)} IN ({placeholders}){condition} '
+        f'RETURNING {columns}'
+    )
+    params += list(ids)
+    if completed is not None:
+        params.append(completed)
+    # RawQuerySet aplica los conversores de cada campo (fechas en SQLite, etc.)
+    return list(Todo.objects.raw(sql, params))
+
+
+def _locked_update(ids, completed, now):
+    """Alternativa sin RETURNING: bloquear, actualizar y releer en la misma transacción"""
+    queryset = Todo.objects.filter(id__in=ids)
+    if completed is not None:
+        queryset = queryset.exclude(completed=completed)
+    changed = list(queryset.select_for_update().values_list('id', flat=True))
+    if not changed:
+        return []
+    if completed is None:
+        new_value = Case(When(completed=True, then=Value(False)), default=Value(True))
+    else:
+        new_value = Value(completed)
+    # QuerySet.update() base: change_status registra las filas en el snapshot y el
+    # lote de contadores incrementa la versión (TodoQuerySet.update() forzaría una recarga)
+    models.QuerySet.update(
+        Todo.objects.filter(id__in=changed),
+        completed=new_value, updated_at=now, content_hash=''
+    )
+    return list(Todo.objects.filter(id__in=changed))
+
+
+def change_status(ids, completed=None):
+    """
+    Cambia el estado de los todos indicados en una sola sentencia por bloque de IDs
+    (max_query_params). completed=None alterna cada todo; True/False lo fija (solo se tocan las filas que cambian).
+    Mantiene TodoCounters, la versión de la tabla y el snapshot en memoria.
+    Retorna las instancias modificadas, con sus valores ya actualizados
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    now = timezone.now()
+    update = _returning_update if supports_update_returning() else _locked_update
+    todos = []
+    with transaction.atomic(), batched_counters() as delta:
+        for chunk in query_param_chunks(ids, reserved=STATUS_PARAMS):
+            todos += update(chunk, completed, now)
+        for todo in todos:
+            delta.add(todo.userId, completed=1 if todo.completed else -1)
+        record_rows(todos)
+    return todos
+
+
+def toggle_todos(ids):
+    """Alterna el estado de los todos indicados"""
+    return change_status(ids)
@@ -8,7 +8,49 @@ router.register(r'todos', views.TodoViewSet, basename='todo')
 
 app_name = 'todos'
 
+# Presupuesto de consultas SQL por petición de cada ruta (nombre de la URL -> método -> máximo).
+# No depende del tamaño de la tabla; todos/tests.py falla si una vista lo supera.
+# Cuenta el peor caso: caché de respuestas vacía y snapshot en memoria sin cargar (las
+# lecturas se miden también con el snapshot cargado). Ninguna petición recarga el snapshot:
+# la lectura completa de la tabla ocurre en segundo plano y no entra en el presupuesto.
+# No se cuentan SAVEPOINT / RELEASE de los bloques atomic anidados.
+# Las rutas de lote escriben en sentencias de unas 100 filas (límite de parámetros de
+# SQLite que aplica Django): su presupuesto es para lotes de hasta ~100 elementos y
+# cada bloque adicional añade un INSERT o DELETE
+QUERY_BUDGETS = {
+    'api-root': {'GET': 0},
+    'export_todos': {'GET': 1},
+    'todo-list': {'GET': 3, 'POST': 3},
+    'todo-bulk': {'POST': 4, 'PATCH': 4, 'DELETE': 5},
+    'todo-bulk-status': {'POST': 3},
+    'todo-completed': {'GET': 3},
+    'todo-pending': {'GET': 3},
+    'todo-summary': {'GET': 2},
+    'todo-detail': {'GET': 2, 'PUT': 4, 'PATCH': 4, 'DELETE': 4},
+    'todo-toggle-status': {'POST': 3},
+    'todos_ids_only': {'GET': 3},
+    'todos_ids_titles': {'GET': 3},
+    'todos_pending_id_title': {'GET': 3},
+    'todos_completed_id_title': {'GET': 3},
+    'todos_ids_users': {'GET': 3},
+    'todos_completed_id_user': {'GET': 3},
+    'todos_pending_id_user': {'GET': 3},
+    'sync_from_api': {'GET': 0, 'POST': 2},
+    'sync_job_detail': {'GET': 1},
+    'api_stats': {'GET': 2},
+    'user_todos': {'GET': 3},
+    'api_documentation': {'GET': 0},
+    'metrics': {'GET': 0},
+    'profile_index': {'GET': 4},
+    'profile_download': {'GET': 2},
+}
+
 urlpatterns = [
+    # Exportación en streaming (antes del router para que 'export' no se tome como ID)
+    path('api/todos/export/', 
+         views.export_todos, 
+         name='export_todos'),
+    
     # API Router principal (incluye todas las operaciones CRUD)
     path('api/', include(router.urls)),
     
@@ -60,6 +102,11 @@ urlpatterns = [
          views.ApiSyncView.as_view(), 
          name='sync_from_api'),
     
+    # Estado de un trabajo de sincronización
+    path('api/sync/jobs/<int:pk>/', 
+         views.SyncJobDetailView.as_view(), 
+         name='sync_job_detail'),
+    
     # Estadísticas generales de la API
     path('api/stats/', 
          views.api_stats, 
@@ -74,4 +121,17 @@ urlpatterns = [
     path('api/docs/', 
          views.api_documentation, 
          name='api_documentation'),
+    
+    # Perfiles de peticiones (solo staff)
+    path('api/profiles/', 
+         views.profile_index, 
+         name='profile_index'),
+    path('api/profiles/<str:name>', 
+         views.profile_download, 
+         name='profile_download'),
+    
+    # Métricas para Prometheus (sin barra final: la ruta que Prometheus consulta por defecto)
+    path('metrics', 
+         views.prometheus_metrics, 
+         name='metrics'),
 ]
@@ -0,0 +1,69 @@
+"""
+Versión de la tabla de todos y peticiones condicionales (ETag / Last-Modified)
+Cada escritura incrementa DataVersion('todos'); las vistas de lectura derivan
+de ella sus validadores y responden 304 antes de consultar o serializar datos.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+TODOS = 'todos'
+
+
+def bump_version(name=TODOS):
+    """Incrementa atómicamente la versión de un conjunto de datos"""
+    now = timezone.now()
+    updated = DataVersion.objects.filter(name=name).update(
+        version=F('version') + 1,
+        changed_at=now
+    )
+    if not updated:
+        DataVersion.objects.get_or_create(name=name, defaults={'version': 1, 'changed_at': now})
+
+
+def get_version(name=TODOS):
+    """Retorna (versión, fecha del último cambio) de un conjunto de datos"""
+    try:
+        return DataVersion.objects.values_list('version', 'changed_at').get(name=name)
+    except DataVersion.DoesNotExist:
+        version, _ = DataVersion.objects.get_or_create(
+            name=name, defaults={'changed_at': timezone.now()}
+        )
+        return version.version, version.changed_at
+
+
+def request_version(request):
+    """Versión de los todos leída una sola vez por petición"""
+    if not hasattr(request, '_todos_version'):
+        request._todos_version = get_version()
+    return request._todos_version
+
+
+def todos_etag(request, *args, **kwargs):
+    """
+    ETag de una lectura: versión de la tabla + URL completa + tipo aceptado
+    (la misma URL puede devolverse como JSON, CSV o MessagePack)
+    La fecha del cambio distingue versiones iguales tras restaurar la base de datos
+    """
+    version, changed_at = request_version(request)
+    key = '|'.join([
+        str(version),
+        changed_at.isoformat(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def todos_last_modified(request, *args, **kwargs):
+    """Last-Modified de una lectura: fecha del último cambio en la tabla de todos"""
+    _, changed_at = request_version(request)
+    return changed_at
+
+
+# Decorador para vistas de lectura de todos: 304 si el cliente tiene la versión vigente
+todos_condition = condition(etag_func=todos_etag, last_modified_func=todos_last_modified)
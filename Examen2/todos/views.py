@@ -2,16 +2,41 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny
-import requests
+from rest_framework.reverse import reverse
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.settings import api_settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+)
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
 import json
-from .models import Todo
+from .bulk import MAX_BULK_ITEMS, bulk_create_todos, bulk_delete_todos, bulk_update_todos
+from .jobs import enqueue_sync_job
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, collect, exposition, metrics_allowed
+from .filters import filter_todos, parse_bool_param, parse_int_param
+from .models import SyncJob, Todo
+from .parsers import NDJSONParser
+from .profiling import profile_path, profiling_setting, recent_profiles
+from .pagination import TodoKeysetPagination, UserTodosPagination
+from .renderers import todo_renderer_classes
+from .search import TodoSearchFilter
+from .snapshot import SNAPSHOT_FIELDS, current_snapshot
+from .stats import global_statistics, user_statistics
+from .transitions import change_status, toggle_todos
+from .cache import cache_response
+from .versioning import todos_condition
 from .serializers import (
     TodoSerializer, TodoIdOnlySerializer, TodoIdTitleSerializer,
     TodoIdUserSerializer, TodoSummarySerializer, TodoCreateSerializer,
     TodoUpdateSerializer, ApiSyncSerializer, TodoStatsSerializer,
-    UserTodosSerializer
+    UserTodosSerializer, SyncJobSerializer, PROJECTION_SERIALIZERS
 )
 
 class TodoViewSet(viewsets.ModelViewSet):
@@ -22,6 +47,9 @@ class TodoViewSet(viewsets.ModelViewSet):
     queryset = Todo.objects.all()
     serializer_class = TodoSerializer
     permission_classes = [AllowAny]
+    renderer_classes = todo_renderer_classes()
+    # ?search= usa el índice de texto completo y ordena por relevancia
+    filter_backends = [filters.OrderingFilter, TodoSearchFilter]
     ordering = ['id']
     
     def get_serializer_class(self):
@@ -32,6 +60,18 @@ class TodoViewSet(viewsets.ModelViewSet):
             return TodoUpdateSerializer
         return TodoSerializer
     
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('list'))
+    def list(self, request, *args, **kwargs):
+        """Lista paginada; 304 si el cliente ya tiene la versión vigente, o desde la caché de respuestas"""
+        return super().list(request, *args, **kwargs)
+    
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('detail'))
+    def retrieve(self, request, *args, **kwargs):
+        """Detalle de un todo; 304 si el cliente ya tiene la versión vigente, o desde la caché de respuestas"""
+        return super().retrieve(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         """Personaliza la creación de todos"""
         serializer.save()
@@ -41,6 +81,8 @@ class TodoViewSet(viewsets.ModelViewSet):
         serializer.save()
     
     @action(detail=False, methods=['get'])
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('list'))
     def completed(self, request):
         """Endpoint para todos completados"""
         todos = self.get_queryset().filter(completed=True)
@@ -53,6 +95,8 @@ class TodoViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('list'))
     def pending(self, request):
         """Endpoint para todos pendientes"""
         todos = self.get_queryset().filter(completed=False)
@@ -65,25 +109,106 @@ class TodoViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('stats'))
     def summary(self, request):
         """Endpoint para resumen general de todos"""
-        total = self.get_queryset().count()
-        completed = self.get_queryset().filter(completed=True).count()
-        pending = self.get_queryset().filter(completed=False).count()
+        snapshot = current_snapshot(request)
+        stats = snapshot.statistics() if snapshot else global_statistics()
         
         return Response({
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'completion_rate': round((completed / total * 100) if total > 0 else 0, 2)
+            'total': stats['total'],
+            'completed': stats['completed'],
+            'pending': stats['pending'],
+            'completion_rate': stats['completion_rate']
+        })
+    
+    @action(
+        detail=False, methods=['post', 'patch', 'delete'], url_path='bulk',
+        parser_classes=[JSONParser, NDJSONParser]
+    )
+    def bulk(self, request):
+        """
+        Operaciones por lotes: POST crea, PATCH actualiza parcialmente y DELETE elimina
+        El cuerpo es un arreglo JSON o NDJSON (un elemento por línea); la respuesta
+        incluye un resultado por elemento en el mismo orden
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({
+                'success': False,
+                'error': 'Se esperaba un arreglo JSON o NDJSON de elementos'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return Response({
+                'success': False,
+                'error': f'El lote admite como máximo {MAX_BULK_ITEMS} elementos'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        operations = {
+            'POST': bulk_create_todos,
+            'PATCH': bulk_update_todos,
+            'DELETE': bulk_delete_todos,
+        }
+        results = operations[request.method](items)
+        failed = sum(1 for result in results if 'errors' in result)
+        return Response({
+            'success': failed == 0,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'results': results
+        })
+    
+    @action(detail=False, methods=['post'], url_path='bulk/status')
+    def bulk_status(self, request):
+        """
+        Cambia el estado de muchos todos en una sola sentencia
+        Cuerpo: {"ids": [1, 2, ...], "completed": true|false}; sin "completed" (o null) alterna cada uno
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(
+            isinstance(todo_id, int) and not isinstance(todo_id, bool) for todo_id in ids
+        ):
+            return Response({
+                'success': False,
+                'error': 'Se esperaba "ids" como arreglo de enteros'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_ITEMS:
+            return Response({
+                'success': False,
+                'error': f'El lote admite como máximo {MAX_BULK_ITEMS} elementos'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        completed = request.data.get('completed')
+        if completed is not None and not isinstance(completed, bool):
+            return Response({
+                'success': False,
+                'error': '"completed" debe ser true, false o null (alternar)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        todos = change_status(ids, completed)
+        changed = {todo.id for todo in todos}
+        return Response({
+            'success': True,
+            'updated': len(todos),
+            'todos': [{'id': todo.id, 'completed': todo.completed} for todo in todos],
+            # IDs inexistentes o que ya tenían el estado pedido
+            'unchanged': [todo_id for todo_id in dict.fromkeys(ids) if todo_id not in changed]
         })
     
     @action(detail=True, methods=['post'])
     def toggle_status(self, request, pk=None):
-        """Endpoint para cambiar el estado de un todo"""
-        todo = self.get_object()
-        todo.completed = not todo.completed
-        todo.save()
+        """
+        Endpoint para cambiar el estado de un todo
+        Un solo UPDATE ... RETURNING, sin leer antes la fila (ver todos.transitions)
+        """
+        try:
+            todos = toggle_todos([int(pk)])
+        except (TypeError, ValueError):
+            todos = []
+        if not todos:
+            raise NotFound()
+        todo = todos[0]
         
         serializer = self.get_serializer(todo)
         return Response({
@@ -93,72 +218,108 @@ class TodoViewSet(viewsets.ModelViewSet):
 
 # Vistas específicas para cada requerimiento del examen
 
-class TodosIdsOnlyView(ListAPIView):
+class TodoProjectionListView(ListAPIView):
+    """
+    Base de las vistas de proyección del examen
+    Admite los filtros ?completed=true|false y ?userId=N y la paginación
+    keyset opcional con ?cursor= (ver TodoKeysetPagination)
+    Solo se consultan las columnas del serializador (values()) y las filas
+    se emiten como diccionarios (ver ProjectionListSerializer)
+    Las proyecciones de id / userId se responden desde el snapshot en memoria
+    (ver todos.snapshot); completed_filter es el filtro fijo de la vista
+    """
+    queryset = Todo.objects.all()
+    completed_filter = None
+    permission_classes = [AllowAny]
+    pagination_class = TodoKeysetPagination
+    renderer_classes = todo_renderer_classes()
+    
+    @method_decorator(todos_condition)
+    @method_decorator(cache_response('projection'))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        fields = self.get_serializer_class().Meta.fields
+        params = self.request.query_params
+        # ?ordering= y ?search= necesitan la base de datos
+        uses_snapshot = set(fields) <= set(SNAPSHOT_FIELDS) and not (
+            params.get(api_settings.ORDERING_PARAM) or params.get(api_settings.SEARCH_PARAM)
+        )
+        snapshot = current_snapshot(self.request) if uses_snapshot else None
+        if snapshot is None:
+            queryset = filter_todos(super().get_queryset(), self.request.query_params)
+            return queryset.values(*fields)
+        
+        completed = parse_bool_param(params, 'completed')
+        if self.completed_filter is not None and completed not in (None, self.completed_filter):
+            return Todo.objects.none().values(*fields)
+        if completed is None:
+            completed = self.completed_filter
+        return snapshot.rows(fields, completed=completed, user_id=parse_int_param(params, 'userId'))
+
+class TodosIdsOnlyView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes (solo IDs)
     """
     queryset = Todo.objects.all()
     serializer_class = TodoIdOnlySerializer
-    permission_classes = [AllowAny]
 
-class TodosIdsTitlesView(ListAPIView):
+class TodosIdsTitlesView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes (IDs y Titles)
     """
     queryset = Todo.objects.all()
     serializer_class = TodoIdTitleSerializer
-    permission_classes = [AllowAny]
 
-class TodosPendingIdTitleView(ListAPIView):
+class TodosPendingIdTitleView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes sin resolver (ID y Title)
     """
     queryset = Todo.objects.filter(completed=False)
     serializer_class = TodoIdTitleSerializer
-    permission_classes = [AllowAny]
 
-class TodosCompletedIdTitleView(ListAPIView):
+class TodosCompletedIdTitleView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes resueltos (ID y Title)
     """
     queryset = Todo.objects.filter(completed=True)
     serializer_class = TodoIdTitleSerializer
-    permission_classes = [AllowAny]
 
-class TodosIdsUsersView(ListAPIView):
+class TodosIdsUsersView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes (IDs y userID)
     """
     queryset = Todo.objects.all()
     serializer_class = TodoIdUserSerializer
-    permission_classes = [AllowAny]
 
-class TodosCompletedIdUserView(ListAPIView):
+class TodosCompletedIdUserView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes resueltos (ID y userID)
     """
     queryset = Todo.objects.filter(completed=True)
+    completed_filter = True
     serializer_class = TodoIdUserSerializer
-    permission_classes = [AllowAny]
 
-class TodosPendingIdUserView(ListAPIView):
+class TodosPendingIdUserView(TodoProjectionListView):
     """
     REQUERIMIENTO: Lista de todos los pendientes sin resolver (ID y userID)
     """
     queryset = Todo.objects.filter(completed=False)
+    completed_filter = False
     serializer_class = TodoIdUserSerializer
-    permission_classes = [AllowAny]
 
 class ApiSyncView(APIView):
     """
     Vista para sincronizar datos desde la API externa de Parra's Dev
     Integra con APIs externas para obtener datos de todos
+    La sincronización se encola como trabajo en segundo plano (ver todos.jobs)
     """
     permission_classes = [AllowAny]
     
     def post(self, request):
         """
-        Sincroniza datos desde una API externa
+        Encola una sincronización desde una API externa y retorna el ID del trabajo
         """
         serializer = ApiSyncSerializer(data=request.data)
         
@@ -166,84 +327,28 @@ class ApiSyncView(APIView):
             api_url = serializer.validated_data['api_url']
             limit = serializer.validated_data['limit']
             overwrite = serializer.validated_data.get('overwrite_existing', False)
+            batch_size = serializer.validated_data.get('batch_size')
+            full_sync = serializer.validated_data.get('full_sync', False)
             
-            try:
-                # Realizar petición a la API externa
-                response = requests.get(f"{api_url}?_limit={limit}", timeout=10)
-                response.raise_for_status()
-                
-                todos_data = response.json()
-                created_count = 0
-                updated_count = 0
-                errors = []
-                
-                for todo_data in todos_data:
-                    try:
-                        # Validar que los datos requeridos estén presentes
-                        required_fields = ['id', 'userId', 'title', 'completed']
-                        for field in required_fields:
-                            if field not in todo_data:
-                                raise KeyError(f"Campo requerido '{field}' no encontrado")
-                        
-                        # Crear o actualizar el todo
-                        if overwrite:
-                            todo, created = Todo.objects.update_or_create(
-                                id=todo_data['id'],
-                                defaults={
-                                    'userId': todo_data['userId'],
-                                    'title': todo_data['title'],
-                                    'completed': todo_data['completed'],
-                                    'synced_from_api': True
-                                }
-                            )
-                        else:
-                            todo, created = Todo.objects.get_or_create(
-                                id=todo_data['id'],
-                                defaults={
-                                    'userId': todo_data['userId'],
-                                    'title': todo_data['title'],
-                                    'completed': todo_data['completed'],
-                                    'synced_from_api': True
-                                }
-                            )
-                        
-                        if created:
-                            created_count += 1
-                        elif overwrite:
-                            updated_count += 1
-                            
-                    except KeyError as e:
-                        errors.append(f"Registro {todo_data.get('id', 'desconocido')}: Campo faltante {str(e)}")
-                    except Exception as e:
-                        errors.append(f"Registro {todo_data.get('id', 'desconocido')}: {str(e)}")
-                
-                return Response({
-                    'success': True,
-                    'message': f'Sincronización exitosa desde API de Parra\'s Dev',
-                    'results': {
-                        'created': created_count,
-                        'updated': updated_count,
-                        'total_processed': len(todos_data),
-                        'errors_count': len(errors)
-                    },
-                    'errors': errors[:10]  # Limitar errores mostrados
-                }, status=status.HTTP_200_OK)
-                
-            except requests.Timeout:
-                return Response({
-                    'success': False,
-                    'error': 'Timeout al conectar con la API externa'
-                }, status=status.HTTP_408_REQUEST_TIMEOUT)
-            except requests.RequestException as e:
-                return Response({
-                    'success': False,
-                    'error': f'Error al conectar con la API externa: {str(e)}'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            except json.JSONDecodeError:
-                return Response({
-                    'success': False,
-                    'error': 'Error al procesar la respuesta JSON de la API externa'
-                }, status=status.HTTP_400_BAD_REQUEST)
+            job, created = enqueue_sync_job(
+                api_url=api_url,
+                limit=limit,
+                overwrite_existing=overwrite,
+                batch_size=batch_size,
+                full_sync=full_sync
+            )
+
+            return Response({
+                'success': True,
+                'message': (
+                    'Sincronización encolada' if created
+                    else 'Ya existe una sincronización activa para esta URL'
+                ),
+                'job_id': job.id,
+                'deduplicated': not created,
+                'status_url': reverse('todos:sync_job_detail', args=[job.id], request=request),
+                'job': SyncJobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -254,7 +359,10 @@ class ApiSyncView(APIView):
         return Response({
             'info': 'Endpoint para sincronizar datos desde API externa de Parra\'s Dev',
             'method': 'POST',
-            'description': 'Permite sincronizar todos desde una API externa',
+            'description': (
+                'Encola una sincronización de todos desde una API externa. '
+                'Responde 202 con el ID del trabajo; el progreso se consulta en /api/sync/jobs/{id}/'
+            ),
             'parameters': {
                 'api_url': {
                     'type': 'string',
@@ -266,13 +374,25 @@ class ApiSyncView(APIView):
                     'type': 'integer',
                     'required': False,
                     'default': 20,
-                    'description': 'Número máximo de registros a sincronizar (1-200)'
+                    'description': 'Número máximo de registros a sincronizar (1-100000)'
                 },
                 'overwrite_existing': {
                     'type': 'boolean',
                     'required': False,
                     'default': False,
                     'description': 'Si es true, sobrescribe registros existentes'
+                },
+                'full_sync': {
+                    'type': 'boolean',
+                    'required': False,
+                    'default': False,
+                    'description': 'Si es true, ignora ETag/Last-Modified y hashes y reescribe todos los registros'
+                },
+                'batch_size': {
+                    'type': 'integer',
+                    'required': False,
+                    'default': 500,
+                    'description': 'Tamaño de lote para las escrituras en base de datos'
                 }
             },
             'example_request': {
@@ -282,18 +402,27 @@ class ApiSyncView(APIView):
             }
         })
 
+class SyncJobDetailView(RetrieveAPIView):
+    """
+    Estado de un trabajo de sincronización: progreso (fetched, created,
+    updated, errors) y tiempos de cola y ejecución
+    """
+    queryset = SyncJob.objects.all()
+    serializer_class = SyncJobSerializer
+    permission_classes = [AllowAny]
+
+@todos_condition
+@cache_response('stats')
 @api_view(['GET'])
 def api_stats(request):
     """
     Estadísticas generales de la API de todos
     """
-    total = Todo.objects.count()
-    completed = Todo.objects.filter(completed=True).count()
-    pending = Todo.objects.filter(completed=False).count()
-    users = Todo.objects.values('userId').distinct().count()
-    synced = Todo.objects.filter(synced_from_api=True).count()
-    
-    completion_rate = round((completed / total * 100) if total > 0 else 0, 2)
+    snapshot = current_snapshot(request)
+    if snapshot:
+        stats = snapshot.statistics(unique_users=True)
+    else:
+        stats = global_statistics(unique_users=True)
     
     return Response({
         'api_info': {
@@ -302,12 +431,12 @@ def api_stats(request):
             'description': 'API para gestión de lista de pendientes'
         },
         'statistics': {
-            'total_todos': total,
-            'completed_todos': completed,
-            'pending_todos': pending,
-            'unique_users': users,
-            'synced_from_external_api': synced,
-            'completion_rate_percentage': completion_rate
+            'total_todos': stats['total'],
+            'completed_todos': stats['completed'],
+            'pending_todos': stats['pending'],
+            'unique_users': stats['unique_users'],
+            'synced_from_external_api': stats['synced'],
+            'completion_rate_percentage': stats['completion_rate']
         },
         'available_endpoints': {
             'crud_operations': '/api/todos/',
@@ -322,44 +451,178 @@ def api_stats(request):
             },
             'utilities': {
                 'sync_from_external': '/api/sync/',
+                'sync_job_status': '/api/sync/jobs/{job_id}/',
                 'statistics': '/api/stats/',
-                'user_todos': '/api/users/{user_id}/todos/'
+                'user_todos': '/api/users/{user_id}/todos/?cursor=&completed=&fields=ids|ids_titles|ids_users',
+                'export': '/api/todos/export/?format=ndjson|json&fields=ids|ids_titles|ids_users'
             }
         }
     })
 
+@todos_condition
+@cache_response('user_todos')
 @api_view(['GET'])
 def user_todos(request, user_id):
     """
     Todos específicos de un usuario con estadísticas
+    Las estadísticas salen del snapshot en memoria o de la tabla de contadores (una fila,
+    sin exists() ni count(); una agregación si falta la fila del usuario) y la lista se pagina por cursor sobre el índice (userId, completed);
+    ?fields=ids e ?fields=ids_users se responden desde el snapshot.
+    Parámetros: ?cursor=, ?page_size=, ?completed=true|false, ?fields=ids|ids_titles|ids_users
     """
-    todos = Todo.objects.filter(userId=user_id)
+    snapshot = current_snapshot(request)
+    stats = snapshot.statistics(user_id) if snapshot else user_statistics(user_id)
     
-    if not todos.exists():
+    if stats['total'] == 0:
         return Response({
             'error': f'No se encontraron todos para el usuario {user_id}',
             'user_id': user_id,
             'total': 0
         }, status=status.HTTP_404_NOT_FOUND)
     
-    total = todos.count()
-    completed = todos.filter(completed=True).count()
-    pending = todos.filter(completed=False).count()
-    completion_rate = round((completed / total * 100) if total > 0 else 0, 2)
+    projection = request.query_params.get('fields', '')
+    if projection and projection not in PROJECTION_SERIALIZERS:
+        return Response({
+            'error': f'Proyección no soportada: {projection}',
+            'fields': list(PROJECTION_SERIALIZERS)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    todos = Todo.objects.filter(userId=user_id)
+    completed = parse_bool_param(request.query_params, 'completed')
+    if completed is not None:
+        todos = todos.filter(completed=completed)
+    if projection:
+        serializer_class = PROJECTION_SERIALIZERS[projection]
+        fields = serializer_class.Meta.fields
+        if snapshot and set(fields) <= set(SNAPSHOT_FIELDS):
+            todos = snapshot.rows(fields, completed=completed, user_id=user_id)
+        else:
+            todos = todos.values(*fields)
+    else:
+        serializer_class = TodoSerializer
     
-    serializer = TodoSerializer(todos, many=True)
+    paginator = UserTodosPagination()
+    page = paginator.paginate_queryset(todos, request)
+    serializer = serializer_class(page, many=True)
     
     return Response({
         'user_id': user_id,
         'statistics': {
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'completion_rate_percentage': completion_rate
+            'total': stats['total'],
+            'completed': stats['completed'],
+            'pending': stats['pending'],
+            'completion_rate_percentage': stats['completion_rate']
         },
+        'next': paginator.get_next_cursor_link(),
+        'next_cursor': paginator.next_cursor,
         'todos': serializer.data
     })
 
+# Filas leídas de la base de datos por bloque durante la exportación
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+def _export_rows(queryset, fields, export_format):
+    """
+    Genera la exportación por bloques: QuerySet.iterator() mantiene en memoria
+    solo chunk_size filas, sin importar el tamaño de la tabla
+    """
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    separator = '\n' if export_format == 'ndjson' else ','
+    
+    if export_format == 'json':
+        yield '['
+    first = True
+    buffer = []
+    for values in rows:
+        buffer.append(encoder.encode(dict(zip(fields, values))))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ('' if first else separator) + separator.join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else separator) + separator.join(buffer)
+        first = False
+    if export_format == 'json':
+        yield ']'
+    elif not first:
+        yield '\n'
+
+@require_GET
+def export_todos(request):
+    """
+    Exportación completa de todos en streaming (NDJSON o arreglo JSON)
+    Parámetros: ?format=ndjson|json, ?fields=ids|ids_titles|ids_users,
+    ?completed=true|false, ?userId=N
+    Vista de Django (no DRF) para que ?format= no pase por la negociación de contenido
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({
+            'error': f'Formato no soportado: {export_format}',
+            'formats': list(EXPORT_FORMATS)
+        }, status=400)
+    
+    projection = request.GET.get('fields', 'ids_titles')
+    if projection not in PROJECTION_SERIALIZERS:
+        return JsonResponse({
+            'error': f'Proyección no soportada: {projection}',
+            'fields': list(PROJECTION_SERIALIZERS)
+        }, status=400)
+    fields = PROJECTION_SERIALIZERS[projection].Meta.fields
+    
+    try:
+        queryset = filter_todos(Todo.objects.order_by('id'), request.GET)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    
+    response = StreamingHttpResponse(
+        _export_rows(queryset, fields, export_format),
+        content_type=f'{EXPORT_FORMATS[export_format]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="todos.{export_format}"'
+    return response
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Métricas por endpoint en formato de texto de Prometheus (todos.metrics)
+    Con TODOS_METRICS['MULTIPROCESS_DIR'] suma las de todos los procesos WSGI
+    Solo para TODOS_METRICS['ALLOWED_IPS'] y el staff
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden('Acceso a /metrics no permitido', content_type='text/plain')
+    return HttpResponse(exposition(collect()), content_type=METRICS_CONTENT_TYPE)
+
+@staff_member_required
+@require_GET
+def profile_index(request):
+    """
+    Perfiles de peticiones recientes (todos.profiling), solo para staff
+    """
+    return render(request, 'admin/todos/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Perfiles de peticiones',
+        'profiles': recent_profiles(),
+        'header': profiling_setting('HEADER'),
+    })
+
+@staff_member_required
+@require_GET
+def profile_download(request, name):
+    """
+    Descarga un perfil .prof (pstats, snakeviz, flameprof)
+    """
+    path = profile_path(name)
+    if path is None:
+        raise Http404('Perfil no encontrado')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
 @api_view(['GET'])
 def api_documentation(request):
     """
@@ -370,6 +633,13 @@ def api_documentation(request):
         'description': 'API completa para gestión de lista de pendientes según requerimientos del examen',
         'version': '1.0.0',
         'base_url': request.build_absolute_uri('/'),
+        'pagination': {
+            'page': '?page=N (por defecto)',
+            'cursor': (
+                'Vistas de EXAM_REQUIREMENTS: ?cursor= (vacío = primera página) recorre por id '
+                'sin OFFSET; ?ordering= distinto de id responde 400'
+            ),
+        },
         'endpoints': {
             'CRUD_OPERATIONS': {
                 'list_all_todos': {
@@ -396,6 +666,16 @@ def api_documentation(request):
                     'url': '/api/todos/{id}/',
                     'method': 'DELETE',
                     'description': 'Eliminar un pendiente'
+                },
+                'bulk_status': {
+                    'url': '/api/todos/bulk/status/',
+                    'method': 'POST',
+                    'description': 'Fijar o alternar el estado de muchos pendientes en una sola sentencia ({"ids": [...], "completed": true|false|null})'
+                },
+                'bulk_todos': {
+                    'url': '/api/todos/bulk/',
+                    'method': 'POST/PATCH/DELETE',
+                    'description': f'Crear, actualizar o eliminar hasta {MAX_BULK_ITEMS} pendientes por petición (arreglo JSON o NDJSON)'
                 }
             },
             'EXAM_REQUIREMENTS': {
@@ -439,7 +719,12 @@ def api_documentation(request):
                 'sync_from_api': {
                     'url': '/api/sync/',
                     'method': 'POST',
-                    'description': 'Sincronizar datos desde API externa de Parra\'s Dev'
+                    'description': 'Encolar sincronización desde API externa de Parra\'s Dev'
+                },
+                'sync_job_status': {
+                    'url': '/api/sync/jobs/{job_id}/',
+                    'method': 'GET',
+                    'description': 'Progreso y tiempos de un trabajo de sincronización'
                 },
                 'api_stats': {
                     'url': '/api/stats/',
@@ -447,9 +732,19 @@ def api_documentation(request):
                     'description': 'Estadísticas generales de la API'
                 },
                 'user_todos': {
-                    'url': '/api/users/{user_id}/todos/',
+                    'url': '/api/users/{user_id}/todos/?cursor=&page_size=&completed=&fields=ids|ids_titles|ids_users',
+                    'method': 'GET',
+                    'description': 'Todos específicos de un usuario (estadísticas y lista paginada por cursor)'
+                },
+                'export_todos': {
+                    'url': '/api/todos/export/?format=ndjson|json&fields=ids|ids_titles|ids_users&completed=&userId=',
+                    'method': 'GET',
+                    'description': 'Exportación completa en streaming con memoria constante'
+                },
+                'metrics': {
+                    'url': '/metrics',
                     'method': 'GET',
-                    'description': 'Todos específicos de un usuario'
+                    'description': 'Métricas por endpoint (peticiones, latencia, SQL, bytes) para Prometheus'
                 },
                 'documentation': {
                     'url': '/api/docs/',